@@ -0,0 +1,177 @@
+"""
+Divisão de áudios longos em trechos, cortando nos silêncios (ffmpeg).
+
+COMO FUNCIONA:
+1. Uma passada do ffmpeg com o filtro silencedetect informa a duração, o
+   formato e os intervalos de silêncio (só análise, nada é gravado)
+2. O áudio é dividido em tantos trechos quanto as transcrições que podem
+   rodar juntas (no mínimo SEGMENTO_MINIMO segundos cada): uma rodada só
+   de chamadas ao Whisper, e nunca mais requisições que o necessário no
+   rate limit do groq_whisper
+3. Os cortes caem no meio do silêncio mais perto do ponto ideal; sem
+   silêncio por perto, o corte é feito no limite do trecho
+4. Uma segunda passada grava todos os trechos de uma vez (muxer
+   `segment`), num diretório temporário exclusivo. Ogg (nota de voz do
+   WhatsApp) e mp3 são copiados sem recodificar; o resto vira mp3
+"""
+
+import os
+import re
+import subprocess
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FFMPEG = os.getenv('FFMPEG', 'ffmpeg')
+
+SEGMENTO_MINIMO = float(os.getenv('TRANSCRICAO_SEGMENTO_MINIMO', '30'))
+SILENCIO_DB = os.getenv('TRANSCRICAO_SILENCIO_DB', '-35dB')
+SILENCIO_MINIMO = float(os.getenv('TRANSCRICAO_SILENCIO_MINIMO', '0.4'))
+
+# Formatos que o muxer segment corta sem recodificar
+COPIA_DIRETA = {'ogg': 'ogg', 'mp3': 'mp3'}
+
+_FORMATO = re.compile(r'Input #0, ([\w,]+), from')
+_DURACAO = re.compile(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)')
+_INICIO = re.compile(r'silence_start: (-?\d+(?:\.\d+)?)')
+_FIM = re.compile(r'silence_end: (\d+(?:\.\d+)?)')
+
+
+@dataclass
+class Analise:
+    duracao: float
+    silencios: list[tuple[float, float]]
+    formato: str = ''
+
+
+def interpretar_analise(saida: str) -> Analise:
+    """Lê a duração e os silêncios do stderr do ffmpeg."""
+    duracao = 0.0
+    if combinacao := _DURACAO.search(saida):
+        horas, minutos, segundos = combinacao.groups()
+        duracao = int(horas) * 3600 + int(minutos) * 60 + float(segundos)
+
+    inicios = [max(0.0, float(v)) for v in _INICIO.findall(saida)]
+    fins = [float(v) for v in _FIM.findall(saida)]
+
+    # Silêncio que vai até o fim do arquivo não tem silence_end
+    fins += [duracao] * (len(inicios) - len(fins))
+
+    formato = ''
+    if combinacao := _FORMATO.search(saida):
+        formato = combinacao.group(1)
+
+    return Analise(duracao, list(zip(inicios, fins)), formato)
+
+
+def escolher_cortes(
+    duracao: float,
+    silencios: list[tuple[float, float]],
+    alvo: float,
+    maximo: float,
+) -> list[float]:
+    """
+    Instantes de corte (em segundos), em ordem.
+
+    Cada trecho fica entre alvo/2 e `maximo` segundos, cortado no meio do
+    silêncio mais perto de `alvo`. O último trecho pode ser menor.
+    """
+    meios = [(inicio + fim) / 2 for inicio, fim in silencios]
+    cortes = []
+    inicio = 0.0
+
+    while duracao - inicio > maximo:
+        candidatos = [
+            m for m in meios if inicio + alvo / 2 <= m <= inicio + maximo
+        ]
+        if candidatos:
+            corte = min(candidatos, key=lambda m: abs(m - (inicio + alvo)))
+        else:
+            corte = inicio + maximo
+        cortes.append(round(corte, 3))
+        inicio = corte
+
+    return cortes
+
+
+def cortes_para(analise: Analise, partes: int) -> list[float]:
+    """Cortes para dividir o áudio em ~`partes` trechos."""
+    alvo = max(SEGMENTO_MINIMO, analise.duracao / max(partes, 1))
+    return escolher_cortes(
+        analise.duracao, analise.silencios, alvo=alvo, maximo=alvo * 1.25
+    )
+
+
+def _ffmpeg(*argumentos: str):
+    return subprocess.run(
+        [FFMPEG, '-hide_banner', '-nostdin', *argumentos],
+        capture_output=True,
+        check=True,
+    )
+
+
+def analisar(caminho: Path) -> Analise:
+    resultado = _ffmpeg(
+        '-i',
+        str(caminho),
+        '-af',
+        f'silencedetect=noise={SILENCIO_DB}:d={SILENCIO_MINIMO}',
+        '-f',
+        'null',
+        '-',
+    )
+    return interpretar_analise(resultado.stderr.decode(errors='replace'))
+
+
+def dividir_audio(audio: bytes, partes: int) -> list[bytes]:
+    """
+    Divide o áudio em ~`partes` trechos cortados nos silêncios.
+
+    Returns:
+        list[bytes]: trechos em ordem (só o original se o áudio for curto)
+
+    Raises:
+        FileNotFoundError: ffmpeg não instalado
+        subprocess.CalledProcessError: áudio que o ffmpeg não entende
+    """
+    with tempfile.TemporaryDirectory(prefix='audio_') as diretorio:
+        pasta = Path(diretorio)
+        original = pasta / 'original'
+        original.write_bytes(audio)
+
+        analise = analisar(original)
+        cortes = cortes_para(analise, partes)
+        if not cortes:
+            return [audio]
+
+        formato = COPIA_DIRETA.get(analise.formato)
+        if formato:
+            codificacao = ['-c:a', 'copy']
+        else:
+            formato = 'mp3'
+            codificacao = ['-ac', '1', '-ar', '16000']
+            codificacao += ['-c:a', 'libmp3lame', '-b:a', '32k']
+
+        _ffmpeg(
+            '-i',
+            str(original),
+            '-vn',
+            *codificacao,
+            '-f',
+            'segment',
+            '-segment_format',
+            formato,
+            '-segment_times',
+            ','.join(map(str, cortes)),
+            '-reset_timestamps',
+            '1',
+            str(pasta / f'segmento_%03d.{formato}'),
+        )
+
+        return [
+            trecho.read_bytes() for trecho in sorted(pasta.glob('segmento_*'))
+        ]
@@ -1,33 +1,127 @@
 import base64
 import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 from dotenv import load_dotenv
 
+from src.agent.audio_segmentos import dividir_audio
+from src.observability.logs import get_logger
+from src.observability.tracing import (
+    SpanKind,
+    extrair_contexto,
+    injetar_contexto,
+    span,
+)
+from src.redis.rate_limiter import (
+    HTTP_429,
+    limitadores,
+    limitar,
+    retry_after,
+)
+
 load_dotenv()
 bearer = os.getenv('BEARER_AUDIO_TRANSCRIPTION')
 
+logger = get_logger('transcricao')
+
+# Mesma variável que o SDK do Groq usa (permite apontar para um stub local)
+groq_base_url = os.getenv('GROQ_BASE_URL', 'https://api.groq.com')
+url_transcricao = f'{groq_base_url}/openai/v1/audio/transcriptions'
+
+# Transcrição em trechos paralelos para áudios grandes (precisa do ffmpeg).
+# O tamanho decide sem abrir o áudio: nota de voz do WhatsApp (opus)
+# tem ~2 KB por segundo, então 120 KB é cerca de 1 minuto
+TRANSCRICAO_PARALELA = os.getenv('TRANSCRICAO_PARALELA', '1') == '1'
+PARALELA_A_PARTIR_DE = int(os.getenv('TRANSCRICAO_PARALELA_BYTES', '120000'))
+CONCORRENCIA = int(os.getenv('TRANSCRICAO_CONCORRENCIA', '4'))
 
-def audio_transcription(audio_base64: str) -> str:
-    # Decodifica e salva em um arquivo temporário
-    with open('temp_audio.mp3', 'wb') as f:
-        f.write(base64.b64decode(audio_base64))
+MAX_TENTATIVAS_429 = 3
 
-    # Agora envia o arquivo como antes
+
+def _transcrever(audio: bytes, nome: str = 'audio.mp3') -> dict:
+    """Uma chamada ao Whisper (respeita o rate limit compartilhado)."""
     headers = {
         'Authorization': f'Bearer {bearer}',
     }
 
     files = {
-        'file': open('temp_audio.mp3', 'rb'),
+        'file': (nome, audio),
         'model': (None, 'whisper-large-v3-turbo'),
         'language': (None, 'pt'),
     }
 
-    response = requests.post(
-        'https://api.groq.com/openai/v1/audio/transcriptions',
-        headers=headers,
-        files=files,
+    for _ in range(MAX_TENTATIVAS_429):
+        with (
+            limitar('groq_whisper'),
+            span('groq whisper', kind=SpanKind.CLIENT, tamanho=len(audio)),
+        ):
+            response = requests.post(
+                url_transcricao,
+                headers=headers,
+                files=files,
+            )
+
+        # 429: pausa todas as transcrições e tenta de novo na fila do
+        # limitador, como no envio para a Evolution
+        if response.status_code != HTTP_429:
+            break
+
+        limitadores['groq_whisper'].penalizar(retry_after(response))
+
+    response.raise_for_status()
+    return response.json()
+
+
+def _dividir(audio: bytes) -> list[bytes]:
+    try:
+        return dividir_audio(audio, partes=CONCORRENCIA)
+    except (OSError, subprocess.CalledProcessError):
+        # Sem ffmpeg ou áudio que ele não entende: uma chamada só
+        logger.warning(
+            'Divisão do áudio falhou, transcrevendo inteiro', exc_info=True
+        )
+        return [audio]
+
+
+def transcrever_em_trechos(audio: bytes) -> dict:
+    """
+    Divide o áudio nos silêncios, transcreve os trechos em paralelo (no
+    máximo CONCORRENCIA por vez) e junta os textos na ordem original.
+
+    Só a divisão tem alternativa (o áudio inteiro numa chamada): erro do
+    Whisper (429, 5xx) sobe, em vez de virar mais uma chamada grande.
+    """
+    trechos = _dividir(audio)
+    if len(trechos) == 1:
+        return _transcrever(trechos[0])
+
+    # As threads não herdam o contexto: os spans dos trechos ficam
+    # pendurados no span atual (webhook) explicitamente
+    contexto = extrair_contexto(injetar_contexto())
+
+    def transcrever(indice: int) -> str:
+        with span('transcricao.trecho', contexto=contexto, indice=indice):
+            resultado = _transcrever(trechos[indice])
+        return resultado.get('text', '').strip()
+
+    with ThreadPoolExecutor(max_workers=CONCORRENCIA) as executor:
+        textos = list(executor.map(transcrever, range(len(trechos))))
+
+    logger.info(
+        'Áudio transcrito em trechos',
+        extra={'trechos': len(trechos), 'bytes': len(audio)},
     )
-    result = response.json()
-    return result
+    return {'text': ' '.join(filter(None, textos))}
+
+
+def audio_transcription(audio_base64: str) -> dict:
+    # Envia os bytes direto da memória: sem arquivo temporário
+    # compartilhado entre transcrições simultâneas
+    audio = base64.b64decode(audio_base64)
+
+    if TRANSCRICAO_PARALELA and len(audio) >= PARALELA_A_PARTIR_DE:
+        return transcrever_em_trechos(audio)
+
+    return _transcrever(audio)
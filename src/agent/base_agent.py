@@ -1,24 +1,23 @@
-import os
-
 from dotenv import load_dotenv
 from langchain_core.messages import SystemMessage
-from langchain_groq import ChatGroq
+
+from src.agent.model_router import criar_roteador
+from src.observability.logs import get_logger
+from src.prompts.registro import Prompt
 
 load_dotenv()
 
-# CONEXÃO COM A GROQ
-llm_groq = ChatGroq(
-    api_key=os.getenv('GROQ_API_KEY'),
-    model_name='openai/gpt-oss-120b',
-    temperature=0,
-)
+logger = get_logger('agente')
+
+# CONEXÃO COM A GROQ (roteador com hedge/fallback entre modelos)
+llm_router = criar_roteador()
 
 # MODELS
-# openai/gpt-oss-120b
-# llama-3.3-70b-versatile
+# openai/gpt-oss-120b (primário)
+# llama-3.3-70b-versatile (hedge/fallback)
 
 
-def agent_base(state, prompt_ia: str, llm_model, get_historico_func):
+def agent_base(state, prompt_ia: Prompt, llm_model, get_historico_func):
     numero = state['number']
 
     # Recupera histórico com função injetada (agora síncrona)
@@ -27,17 +26,17 @@ def agent_base(state, prompt_ia: str, llm_model, get_historico_func):
     # Junta com mensagens do state (mensagem atual)
     mensagens_historico.extend(state['messages'])
 
-    print('🤖 Agente pensando...')
-
-    system_prompt = (
-        f'{prompt_ia}\n\n'
-        f'IMPORTANTE: O número do usuário é {numero}. '
-        f'Use sempre este número ao chamar ferramentas.'
+    logger.debug(
+        'Agente pensando',
+        extra={'numero': numero, 'prompt_versao': prompt_ia.versao},
     )
 
+    # Conteúdo fixo primeiro, dados do usuário no fim (prefixo reaproveitável)
+    system_prompt = prompt_ia.montar({'Número do usuário': numero})
+
     messages = [SystemMessage(content=system_prompt)] + mensagens_historico
 
-    # Chamada do modelo
+    # Chamada do modelo (o roteador aplica o rate limit por tentativa)
     response = llm_model.invoke(messages)
 
     return {'messages': [response]}
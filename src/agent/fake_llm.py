@@ -0,0 +1,56 @@
+import time
+
+from langchain_core.messages import AIMessage
+
+
+class FakeChatModel:
+    """
+    Provedor local que imita um chat model do LangChain, sem rede.
+
+    Serve para testar o roteador de modelos (hedge/fallback) e para
+    rodar o grafo offline. Aceita o mesmo `invoke(messages)` e
+    `bind_tools(tools)` que o ChatGroq.
+
+    Args:
+        nome (str): Nome do modelo (vai para response_metadata)
+        latencia (float): Segundos que cada chamada demora
+        falha (Exception | None): Se definido, toda chamada levanta esse erro
+        resposta (str): Conteúdo devolvido na AIMessage
+    """
+
+    def __init__(
+        self,
+        nome: str = 'fake',
+        latencia: float = 0,
+        falha: Exception | None = None,
+        resposta: str = 'Resposta do modelo fake.',
+    ):
+        self.nome = nome
+        self.latencia = latencia
+        self.falha = falha
+        self.resposta = resposta
+        self.chamadas = 0
+
+    def invoke(self, messages, config=None, **kwargs) -> AIMessage:
+        self.chamadas += 1
+
+        if self.latencia:
+            time.sleep(self.latencia)
+
+        if self.falha is not None:
+            raise self.falha
+
+        return AIMessage(
+            content=self.resposta,
+            response_metadata={
+                'model_name': self.nome,
+                'token_usage': {
+                    'prompt_tokens': 0,
+                    'completion_tokens': 0,
+                    'total_tokens': 0,
+                },
+            },
+        )
+
+    def bind_tools(self, tools, **kwargs):
+        return self
@@ -0,0 +1,336 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from functools import partial
+
+from dotenv import load_dotenv
+from langchain_groq import ChatGroq
+
+from src.agent.fake_llm import FakeChatModel
+from src.observability.logs import get_logger
+from src.observability.metrics import (
+    llm_latencia,
+    llm_tentativas,
+    registrar_uso_llm,
+)
+from src.observability.tracing import SpanKind, span
+from src.redis.rate_limiter import limitar, penalizar_se_429
+
+load_dotenv()
+
+logger = get_logger('llm')
+
+# Threads compartilhadas para as chamadas (primária + hedge)
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='llm')
+
+# Intervalo para conferir se a chamada já saiu do rate limiter
+ESPERA_LIMITADOR = 0.05
+
+# Função chamada com cada resposta que o roteador descarta (hedge que
+# perdeu, mas gastou tokens); definida por contexto (ex.: por job)
+ao_descartar = contextvars.ContextVar('llm_ao_descartar', default=None)
+
+
+def _recriar_executor():
+    # As threads do pai não existem no processo filho (fork do RQ): um
+    # executor herdado já usado aceitaria tarefas que nunca rodam
+    global _executor  # noqa: PLW0603
+    _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='llm')
+
+
+os.register_at_fork(after_in_child=_recriar_executor)
+
+
+# ============================================================================
+# PROVEDORES (plugáveis)
+# ============================================================================
+
+
+def _criar_groq(modelo: str):
+    return ChatGroq(
+        api_key=os.getenv('GROQ_API_KEY'),
+        model_name=modelo,
+        temperature=0,
+        # Sem retry no SDK: 429/5xx voltam na hora para o roteador, que
+        # aplica o rate limiter, a pausa do 429, o hedge e o fallback
+        max_retries=0,
+    )
+
+
+def _criar_fake(modelo: str):
+    return FakeChatModel(
+        nome=modelo, latencia=float(os.getenv('LLM_FAKE_LATENCIA', '0'))
+    )
+
+
+PROVEDORES = {
+    'groq': _criar_groq,
+    'fake': _criar_fake,
+}
+
+# Provedores que passam pelo rate limiter compartilhado
+LIMITES_PROVEDOR = {'groq': 'groq_chat'}
+
+
+class TentativaCancelada(Exception):
+    """A tentativa perdeu antes de chamar o provedor."""
+
+
+class Tentativa:
+    """
+    Uma chamada disparada pelo roteador.
+
+    `iniciar` é chamado quando a rota sai da fila do rate limiter: só a
+    partir daí o relógio do hedge corre. `cancelada` avisa a rota que
+    outra tentativa já venceu (se ainda não chamou o provedor, desiste).
+    """
+
+    def __init__(self, rota):
+        self.rota = rota
+        self.futuro = None
+        self.inicio = None
+        self.iniciada = threading.Event()
+        self.cancelada = threading.Event()
+
+    def iniciar(self):
+        self.inicio = time.monotonic()
+        self.iniciada.set()
+
+    def espera_hedge(self, hedge_apos: float) -> float | None:
+        """Segundos até o hedge, ou None se ainda está no rate limiter."""
+        if not self.iniciada.is_set():
+            return None
+        return max(0, hedge_apos - (time.monotonic() - self.inicio))
+
+
+class Rota:
+    """
+    Um modelo que o roteador pode usar.
+
+    Args:
+        nome (str): Nome do modelo (ex: 'openai/gpt-oss-120b')
+        modelo: Chat model (qualquer objeto com invoke/bind_tools)
+        limite (str | None): Chave do rate limiter ('groq_chat') ou None
+    """
+
+    def __init__(self, nome: str, modelo, limite: str | None = None):
+        self.nome = nome
+        self.modelo = modelo
+        self.limite = limite
+
+    def chamar(self, messages, tentativa: Tentativa | None = None, **kwargs):
+        with limitar(self.limite) if self.limite else nullcontext():
+            if tentativa:
+                if tentativa.cancelada.is_set():
+                    raise TentativaCancelada(self.nome)
+                tentativa.iniciar()
+
+            with span(
+                f'llm {self.nome}', kind=SpanKind.CLIENT, modelo=self.nome
+            ):
+                inicio = time.perf_counter()
+                resultado = 'erro'
+
+                try:
+                    response = self.modelo.invoke(messages, **kwargs)
+                    resultado = 'sucesso'
+                except Exception as e:
+                    # 429 do provedor pausa todos os workers, não só este
+                    if self.limite:
+                        penalizar_se_429(self.limite, e)
+                    raise
+                finally:
+                    llm_latencia.labels(
+                        modelo=self.nome, resultado=resultado
+                    ).observe(time.perf_counter() - inicio)
+
+        registrar_uso_llm(self.nome, response)
+        return response
+
+
+def _contar_perdedora(rota: Rota, descartada, futuro):
+    """Desfecho de uma tentativa que terminou depois da vencedora."""
+    if futuro.cancelled():
+        resultado = 'cancelada'
+    elif isinstance(futuro.exception(), TentativaCancelada):
+        resultado = 'cancelada'
+    elif futuro.exception() is not None:
+        resultado = 'erro'
+    else:
+        resultado = 'perdedora'
+    llm_tentativas.labels(modelo=rota.nome, resultado=resultado).inc()
+
+    if resultado == 'perdedora' and descartada:
+        try:
+            descartada(futuro.result())
+        except Exception:
+            logger.exception(
+                'Erro ao registrar resposta descartada',
+                extra={'modelo': rota.nome},
+            )
+
+
+class ModelRouter:
+    """
+    Roteador de modelos com hedge e fallback.
+
+    COMO FUNCIONA:
+    1. Envia a requisição para o modelo primário
+    2. Se ele não responder em `hedge_apos` segundos, dispara uma cópia
+       para o próximo modelo (hedge) sem cancelar a primeira. O relógio
+       só corre depois que a chamada sai do rate limiter: com o provedor
+       saturado, esperar na fila não gera requisição duplicada
+    3. Se um modelo falhar, dispara o próximo imediatamente (fallback)
+    4. Usa a primeira resposta que chegar com sucesso; as outras
+       tentativas são canceladas (as que ainda não chamaram o provedor
+       desistem) e contadas em llm_tentativas. Se alguma ainda responder,
+       a resposta vai para `ao_descartar` (os tokens foram gastos)
+    5. Se todos falharem, levanta o último erro
+
+    A resposta recebe `response_metadata['roteador']` com o modelo que
+    venceu e se houve hedge.
+
+    Args:
+        rotas (list[Rota]): Modelos em ordem de preferência
+        hedge_apos (float | None): Segundos até o hedge (None desliga)
+    """
+
+    def __init__(self, rotas: list[Rota], hedge_apos: float | None = None):
+        if not rotas:
+            raise ValueError('ModelRouter precisa de pelo menos uma rota')
+
+        self.rotas = rotas
+        self.hedge_apos = hedge_apos
+
+    def bind_tools(self, tools, **kwargs):
+        return ModelRouter(
+            rotas=[
+                Rota(r.nome, r.modelo.bind_tools(tools, **kwargs), r.limite)
+                for r in self.rotas
+            ],
+            hedge_apos=self.hedge_apos,
+        )
+
+    def invoke(self, messages, config=None, **kwargs):
+        if config is not None:
+            kwargs['config'] = config
+
+        restantes = list(self.rotas)
+        pendentes = {}
+        ultimo_erro = None
+        hedge = False
+
+        def disparar():
+            tentativa = Tentativa(restantes.pop(0))
+            # Copia o contexto para manter callbacks/config do LangChain
+            contexto = contextvars.copy_context()
+            tentativa.futuro = _executor.submit(
+                contexto.run,
+                tentativa.rota.chamar,
+                messages,
+                tentativa=tentativa,
+                **kwargs,
+            )
+            pendentes[tentativa.futuro] = tentativa
+            return tentativa
+
+        ultima = disparar()
+
+        while pendentes:
+            espera = None
+            if restantes and self.hedge_apos is not None:
+                espera = ultima.espera_hedge(self.hedge_apos)
+                if espera is None:
+                    # Ainda na fila do rate limiter: confere de novo logo
+                    espera = ESPERA_LIMITADOR
+
+            prontos, _ = wait(
+                pendentes, timeout=espera, return_when=FIRST_COMPLETED
+            )
+
+            if not prontos:
+                if ultima.espera_hedge(self.hedge_apos) != 0:
+                    continue
+
+                # Modelo lento: dispara hedge no próximo sem cancelar
+                ultima = disparar()
+                hedge = True
+                logger.warning(
+                    'LLM lento, hedge', extra={'modelo': ultima.rota.nome}
+                )
+                continue
+
+            for futuro in prontos:
+                rota = pendentes.pop(futuro).rota
+
+                try:
+                    response = futuro.result()
+                except Exception as e:
+                    # Só o tipo: a mensagem do provedor pode repetir
+                    # trechos da conversa, que não passam pela redação
+                    logger.warning(
+                        'Modelo falhou',
+                        extra={'modelo': rota.nome, 'erro': type(e).__name__},
+                    )
+                    llm_tentativas.labels(
+                        modelo=rota.nome, resultado='erro'
+                    ).inc()
+                    ultimo_erro = e
+                    continue
+
+                llm_tentativas.labels(
+                    modelo=rota.nome, resultado='vencedora'
+                ).inc()
+                self._cancelar(pendentes.values())
+
+                response.response_metadata['roteador'] = {
+                    'modelo': rota.nome,
+                    'hedge': hedge,
+                }
+                return response
+
+            # Quem terminou falhou: fallback imediato para o próximo
+            if restantes:
+                ultima = disparar()
+                logger.warning('Fallback', extra={'modelo': ultima.rota.nome})
+
+        raise ultimo_erro
+
+    @staticmethod
+    def _cancelar(tentativas):
+        # Lido aqui: o callback roda na thread da tentativa, fora do
+        # contexto de quem chamou o roteador
+        descartada = ao_descartar.get()
+        for tentativa in tentativas:
+            tentativa.cancelada.set()
+            tentativa.futuro.cancel()
+            tentativa.futuro.add_done_callback(
+                partial(_contar_perdedora, tentativa.rota, descartada)
+            )
+
+
+def criar_roteador() -> ModelRouter:
+    """
+    Monta o roteador a partir das variáveis de ambiente.
+
+    - LLM_PROVEDOR: 'groq' (padrão) ou 'fake'
+    - LLM_MODELO_PRIMARIO: padrão 'openai/gpt-oss-120b'
+    - LLM_MODELO_SECUNDARIO: padrão 'llama-3.3-70b-versatile' ('' desliga)
+    - LLM_HEDGE_APOS: segundos até o hedge (padrão 8)
+    """
+    provedor = os.getenv('LLM_PROVEDOR', 'groq')
+    criar = PROVEDORES[provedor]
+    limite = LIMITES_PROVEDOR.get(provedor)
+
+    nomes = [
+        os.getenv('LLM_MODELO_PRIMARIO', 'openai/gpt-oss-120b'),
+        os.getenv('LLM_MODELO_SECUNDARIO', 'llama-3.3-70b-versatile'),
+    ]
+
+    return ModelRouter(
+        rotas=[Rota(nome, criar(nome), limite) for nome in nomes if nome],
+        hedge_apos=float(os.getenv('LLM_HEDGE_APOS', '8')),
+    )
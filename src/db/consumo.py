@@ -0,0 +1,265 @@
+"""
+Rollup do consumo do LLM no Postgres e consultas de uso e custo.
+
+COMO FUNCIONA:
+- Os contadores do Redis (src/redis/consumo.py) são descarregados em
+  lote na tabela consumo_diario (migração 0004): um upsert que soma
+- Depois do commit, o que foi gravado é subtraído dos contadores (Lua):
+  incrementos que chegaram no meio tempo ficam para o próximo lote. Se
+  o processo cair entre o commit e a subtração, o lote é somado de novo
+  (pelo menos uma vez, nunca perdido)
+- A descarga roda no fim dos jobs do worker, no máximo uma vez a cada
+  DESCARGA_SEGUNDOS entre todos os workers (lock no Redis), e na rotina
+  diária de manutenção
+- Custo calculado na consulta com PRECOS (US$ por milhão de tokens):
+  corrigir um preço vale para todo o histórico. CONSUMO_PRECOS (JSON
+  {"modelo": [entrada, saida]}) sobrescreve a tabela
+
+COMO USAR:
+    python -m src.db.consumo descarregar
+    python -m src.db.consumo consultar --agrupar numero --dias 7
+    python -m src.db.consumo consultar --agrupar prompt --numero 5511...
+"""
+
+import argparse
+import json
+import os
+from datetime import date, timedelta
+
+import psycopg2.extras
+from dotenv import load_dotenv
+
+from src.db.conection import get_vector_conn
+from src.observability.logs import (
+    configurar_logs,
+    descarregar_logs,
+    get_logger,
+)
+from src.redis.client_redis import redis_client
+from src.redis.consumo import (
+    CAMPOS,
+    CHAVE_PENDENTES,
+    hoje,
+    ler_chave,
+    subtrair,
+)
+
+load_dotenv()
+
+logger = get_logger('consumo')
+
+LOTE = 500
+DESCARGA_SEGUNDOS = int(os.getenv('CONSUMO_DESCARGA_SEGUNDOS', '60'))
+CHAVE_DESCARGA = 'consumo:descarga'
+
+# Referência da tabela pública da Groq (US$ por 1M tokens: entrada, saída)
+PRECOS = {
+    'openai/gpt-oss-120b': (0.15, 0.60),
+    'llama-3.3-70b-versatile': (0.59, 0.79),
+    **{
+        modelo: tuple(preco)
+        for modelo, preco in json.loads(
+            os.getenv('CONSUMO_PRECOS', '{}')
+        ).items()
+    },
+}
+
+AGRUPAMENTOS = {
+    'numero': 'c.numero',
+    'prompt': 'c.prompt',
+    'modelo': 'c.modelo',
+    'dia': 'c.dia',
+}
+
+
+# ============================================================================
+# DESCARGA (Redis -> Postgres)
+# ============================================================================
+
+
+_SOMAS = ', '.join(f'{c} = consumo_diario.{c} + EXCLUDED.{c}' for c in CAMPOS)
+
+UPSERT = f"""
+    INSERT INTO consumo_diario
+        (dia, numero, prompt, modelo, {', '.join(CAMPOS)})
+    VALUES %s
+    ON CONFLICT (dia, numero, prompt, modelo) DO UPDATE SET
+        {_SOMAS},
+        atualizado_em = NOW() AT TIME ZONE 'America/Sao_Paulo'
+"""
+
+
+def _linha(chave: str, valores: dict) -> tuple:
+    return (*ler_chave(chave), *(int(valores.get(c, 0)) for c in CAMPOS))
+
+
+def descarregar(client=redis_client, lote: int = LOTE) -> int:
+    """
+    Grava um lote de contadores pendentes no rollup.
+
+    Returns:
+        int: quantidade de chaves gravadas
+    """
+    chaves = client.srandmember(CHAVE_PENDENTES, lote)
+    if not chaves:
+        return 0
+
+    with client.pipeline(transaction=False) as pipe:
+        for chave in chaves:
+            pipe.hgetall(chave)
+        lidos = dict(zip(chaves, pipe.execute()))
+
+    # Hash expirado sem descarga: só tira do set
+    vazias = [chave for chave, valores in lidos.items() if not valores]
+    if vazias:
+        client.srem(CHAVE_PENDENTES, *vazias)
+
+    lidos = {chave: valores for chave, valores in lidos.items() if valores}
+    if not lidos:
+        return 0
+
+    conn = get_vector_conn()
+    try:
+        with conn.cursor() as cursor:
+            psycopg2.extras.execute_values(
+                cursor,
+                UPSERT,
+                [_linha(chave, valores) for chave, valores in lidos.items()],
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+    for chave, valores in lidos.items():
+        subtrair(
+            keys=[chave, CHAVE_PENDENTES],
+            args=[item for par in valores.items() for item in par],
+            client=client,
+        )
+
+    return len(lidos)
+
+
+def descarregar_tudo(client=redis_client) -> int:
+    total = 0
+    while gravadas := descarregar(client):
+        total += gravadas
+        if gravadas < LOTE:
+            break
+
+    if total:
+        logger.info('Consumo descarregado', extra={'chaves': total})
+    return total
+
+
+def descarregar_se_vencido(client=redis_client):
+    """
+    Descarga periódica chamada no fim dos jobs: só um worker por
+    intervalo faz o trabalho. Falhas são registradas, nunca propagadas.
+    """
+    try:
+        if client.set(CHAVE_DESCARGA, 1, nx=True, ex=DESCARGA_SEGUNDOS):
+            descarregar_tudo(client)
+    except Exception:
+        logger.exception('Erro ao descarregar o consumo')
+
+
+# ============================================================================
+# CONSULTA
+# ============================================================================
+
+
+def consultar(
+    desde: date,
+    ate: date,
+    agrupar: str = 'numero',
+    numero: str | None = None,
+    limite: int = 50,
+) -> list[dict]:
+    """
+    Uso e custo agregados no período, do maior custo para o menor.
+
+    Args:
+        agrupar (str): 'numero', 'prompt', 'modelo' ou 'dia'
+        numero (str | None): restringe a um número
+    """
+    if agrupar not in AGRUPAMENTOS:
+        raise ValueError(f'Agrupamento inválido: {agrupar}')
+
+    precos = [
+        {'modelo': modelo, 'entrada': entrada, 'saida': saida}
+        for modelo, (entrada, saida) in PRECOS.items()
+    ]
+
+    conn = get_vector_conn()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT {AGRUPAMENTOS[agrupar]}::TEXT AS chave,
+                       SUM(c.turnos)::BIGINT AS turnos,
+                       SUM(c.chamadas)::BIGINT AS chamadas,
+                       SUM(c.tokens_entrada)::BIGINT AS tokens_entrada,
+                       SUM(c.tokens_saida)::BIGINT AS tokens_saida,
+                       SUM(c.rodadas_ferramenta)::BIGINT
+                           AS rodadas_ferramenta,
+                       (SUM(c.latencia_ms) / NULLIF(SUM(c.turnos), 0))::BIGINT
+                           AS latencia_media_ms,
+                       ROUND(SUM(
+                           c.tokens_entrada * COALESCE(p.entrada, 0)
+                           + c.tokens_saida * COALESCE(p.saida, 0)
+                       ) / 1e6, 6)::FLOAT AS custo_usd
+                FROM consumo_diario c
+                LEFT JOIN jsonb_to_recordset(%(precos)s::JSONB)
+                    AS p(modelo TEXT, entrada NUMERIC, saida NUMERIC)
+                    ON p.modelo = c.modelo
+                WHERE c.dia BETWEEN %(desde)s AND %(ate)s
+                  AND (%(numero)s::TEXT IS NULL OR c.numero = %(numero)s)
+                GROUP BY 1
+                ORDER BY custo_usd DESC,
+                         SUM(c.tokens_entrada + c.tokens_saida) DESC
+                LIMIT %(limite)s
+            """,
+                {
+                    'precos': json.dumps(precos),
+                    'desde': desde,
+                    'ate': ate,
+                    'numero': numero,
+                    'limite': limite,
+                },
+            )
+            return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('comando', choices=['descarregar', 'consultar'])
+    parser.add_argument('--agrupar', choices=list(AGRUPAMENTOS))
+    parser.add_argument('--numero')
+    parser.add_argument('--dias', type=int, default=7)
+    parser.add_argument('--limite', type=int, default=50)
+    args = parser.parse_args()
+
+    if args.comando == 'descarregar':
+        configurar_logs('manutencao')
+        try:
+            descarregar_tudo()
+        finally:
+            descarregar_logs()
+        return
+
+    ate = date.fromisoformat(hoje())
+    linhas = consultar(
+        ate - timedelta(days=args.dias - 1),
+        ate,
+        agrupar=args.agrupar or 'numero',
+        numero=args.numero,
+        limite=args.limite,
+    )
+    print(json.dumps(linhas, indent=2, default=str))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,19 @@
 import json
-
-from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+import os
 
 from src.db.conection import get_vector_conn
+from src.observability.logs import get_logger
+from src.observability.metrics import medir_db
+
+logger = get_logger('db')
+
+# Janela do histórico enviado ao agente (últimas 20 mensagens nela)
+HISTORICO_DIAS = int(os.getenv('HISTORICO_DIAS', '30'))
 
 
 class PostgreSQL:
     @staticmethod
+    @medir_db('verify_user')
     def verify_user(number: str) -> bool:
         conn = get_vector_conn()
         cursor = conn.cursor()
@@ -24,8 +31,8 @@ class PostgreSQL:
             row = cursor.fetchone()
             return row is not None
 
-        except Exception as e:
-            print(f'❌ Erro ao verificar usuário: {e}')
+        except Exception:
+            logger.exception('Erro ao verificar usuário')
             return False
 
         finally:
@@ -33,6 +40,7 @@ class PostgreSQL:
             conn.close()
 
     @staticmethod
+    @medir_db('create_user')
     def create_user(
         numero: str,
         nome: str,
@@ -62,16 +70,17 @@ class PostgreSQL:
                 ),
             )
             conn.commit()
-            print(f'✅ Usuário {numero} salvo com sucesso')
+            logger.info('Usuário salvo', extra={'numero': numero})
 
-        except Exception as e:
-            print(f'❌ Erro ao salvar usuário: {e}')
+        except Exception:
+            logger.exception('Erro ao salvar usuário')
 
         finally:
             cursor.close()
             conn.close()
 
     @staticmethod
+    @medir_db('update_user')
     def update_user(
         numero: str,
         nome: str | None,
@@ -96,16 +105,17 @@ class PostgreSQL:
             )
 
             conn.commit()
-            print(f'🔄 Usuário {numero} atualizado com sucesso')
+            logger.info('Usuário atualizado', extra={'numero': numero})
 
-        except Exception as e:
-            print(f'❌ Erro ao atualizar usuário: {e}')
+        except Exception:
+            logger.exception('Erro ao atualizar usuário')
 
         finally:
             cursor.close()  # ← fechar cursor
             conn.close()
 
     @staticmethod
+    @medir_db('save_message')
     def save_message(session_id: str, message: dict):
 
         conn = get_vector_conn()
@@ -121,31 +131,48 @@ class PostgreSQL:
             )
 
             conn.commit()
-            print('✅ Mensagem salva com sucesso')
+            logger.debug('Mensagem salva', extra={'numero': session_id})
 
-        except Exception as e:
+        except Exception:
             conn.rollback()
-            print(f'❌ Erro ao salvar mensagem no banco: {e}')
+            logger.exception('Erro ao salvar mensagem no banco')
+            # Propaga: a etapa não pode ser marcada como concluída
+            raise
 
         finally:
             cursor.close()
             conn.close()
 
     @staticmethod
+    @medir_db('get_historico')
     def get_historico(number: str):
+        # Import local: a API usa o PostgreSQL sem carregar o LangChain
+        from langchain_core.messages import (  # noqa: PLC0415
+            AIMessage,
+            HumanMessage,
+            ToolMessage,
+        )
+
         conn = get_vector_conn()
         cursor = conn.cursor()
 
         try:
+            # Só as partições da janela recente são lidas (o filtro em
+            # created_at permite ao Postgres descartar as outras)
             cursor.execute(
                 """
-                SELECT message 
-                FROM chat_ia
-                WHERE session_id = %s
+                SELECT message
+                FROM (
+                    SELECT id, message
+                    FROM chat_ia
+                    WHERE session_id = %s
+                      AND created_at >= NOW() - make_interval(days => %s)
+                    ORDER BY id DESC
+                    LIMIT 20
+                ) recentes
                 ORDER BY id ASC
-                LIMIT 20
             """,
-                (number,),
+                (number, HISTORICO_DIAS),
             )
 
             rows = cursor.fetchall()
@@ -170,8 +197,8 @@ class PostgreSQL:
 
             return historico
 
-        except Exception as e:
-            print(f'❌ Erro ao recuperar histórico: {e}')
+        except Exception:
+            logger.exception('Erro ao recuperar histórico')
             return []
 
         finally:
@@ -179,6 +206,7 @@ class PostgreSQL:
             conn.close()
 
     @staticmethod
+    @medir_db('get_file')
     def get_file(categoria: str):
 
         try:
@@ -0,0 +1,247 @@
+"""
+Exportação em massa do chat_ia e do users para análise.
+
+COMO FUNCIONA:
+- As linhas são lidas com cursor no servidor (LOTE_CURSOR por vez):
+  memória constante, seja qual for o tamanho da tabela
+- A leitura roda numa transação REPEATABLE READ somente leitura: o
+  arquivo é um retrato consistente e nada é bloqueado além do
+  ACCESS SHARE de qualquer SELECT
+- Saída em JSONL comprimido (zstd ou gzip), uma linha por registro; o
+  arquivo só aparece com o nome final depois de completo
+- chat_ia é incremental: o maior id exportado fica em
+  <saida>/chat_ia.watermark e a próxima execução continua dele. Para
+  não pular mensagens de transações ainda abertas, a exportação para
+  na primeira mensagem mais nova que MARGEM_SEGUNDOS
+- users é pequena e é exportada inteira a cada execução
+
+COMO USAR:
+    python -m src.db.exportacao chat_ia --saida exportacao/
+    python -m src.db.exportacao chat_ia --desde-id 0       # do zero
+    python -m src.db.exportacao users --compressao gzip
+"""
+
+import argparse
+import gzip
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import orjson
+import zstandard
+from dotenv import load_dotenv
+
+from src.db.conection import get_vector_conn
+from src.observability.logs import (
+    configurar_logs,
+    descarregar_logs,
+    get_logger,
+)
+
+load_dotenv()
+
+logger = get_logger('exportacao')
+
+LOTE_CURSOR = 5000
+NIVEL_ZSTD = 10
+MARGEM_SEGUNDOS = 60
+
+EXTENSOES = {'zstd': '.jsonl.zst', 'gzip': '.jsonl.gz'}
+
+
+# ============================================================================
+# ESCRITA
+# ============================================================================
+
+
+def escrever_jsonl(linhas, caminho: Path, compressao: str = 'zstd') -> int:
+    """
+    Grava um iterável de dicts em JSONL comprimido, sem montar nada em
+    memória. Escreve em <caminho>.tmp e renomeia no fim (com fsync).
+
+    Returns:
+        int: quantidade de linhas gravadas
+    """
+    temporario = caminho.with_name(caminho.name + '.tmp')
+    total = 0
+
+    try:
+        with temporario.open('wb') as arquivo:
+            if compressao == 'zstd':
+                compressor = zstandard.ZstdCompressor(level=NIVEL_ZSTD)
+                saida = compressor.stream_writer(arquivo, closefd=False)
+            else:
+                saida = gzip.GzipFile(fileobj=arquivo, mode='wb')
+
+            with saida:
+                for linha in linhas:
+                    saida.write(orjson.dumps(linha, default=str) + b'\n')
+                    total += 1
+
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+    except BaseException:
+        temporario.unlink(missing_ok=True)
+        raise
+
+    temporario.rename(caminho)
+    return total
+
+
+def ler_em_lotes(conn, nome: str, sql: str, parametros=()):
+    """Itera as linhas de um SELECT com cursor no servidor."""
+    with conn.cursor(name=nome) as cursor:
+        cursor.itersize = LOTE_CURSOR
+        cursor.execute(sql, parametros)
+        yield from cursor
+
+
+# ============================================================================
+# TABELAS
+# ============================================================================
+
+
+def _ler_watermark(saida: Path) -> int:
+    arquivo = saida / 'chat_ia.watermark'
+    if not arquivo.exists():
+        return 0
+    return json.loads(arquivo.read_text())['ultimo_id']
+
+
+def _gravar_watermark(saida: Path, ultimo_id: int):
+    arquivo = saida / 'chat_ia.watermark'
+    temporario = arquivo.with_name(arquivo.name + '.tmp')
+    temporario.write_text(json.dumps({'ultimo_id': ultimo_id}))
+    temporario.rename(arquivo)
+
+
+def exportar_chat_ia(
+    saida: Path, desde_id: int | None = None, compressao: str = 'zstd'
+) -> dict:
+    """
+    Exporta as mensagens com id > desde_id (ou > watermark salvo).
+
+    Returns:
+        dict: arquivo, linhas, desde_id e ultimo_id
+    """
+    saida.mkdir(parents=True, exist_ok=True)
+    inicio = _ler_watermark(saida) if desde_id is None else desde_id
+    ultimo = inicio
+
+    conn = get_vector_conn()
+    conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+
+    try:
+        with conn.cursor() as cursor:
+            # Mesma expressão do DEFAULT de created_at, convertida para
+            # timestamptz como no INSERT: volta com fuso e dá para
+            # comparar com o created_at das linhas
+            cursor.execute(
+                """
+                SELECT (NOW() AT TIME ZONE 'America/Sao_Paulo')::TIMESTAMPTZ
+                       - make_interval(secs => %s) AS corte
+            """,
+                (MARGEM_SEGUNDOS,),
+            )
+            corte = cursor.fetchone()['corte']
+
+        def linhas():
+            nonlocal ultimo
+            for row in ler_em_lotes(
+                conn,
+                'exportar_chat_ia',
+                """
+                SELECT id, session_id, message, created_at
+                FROM chat_ia
+                WHERE id > %s
+                ORDER BY id
+            """,
+                (inicio,),
+            ):
+                if row['created_at'] >= corte:
+                    break
+                ultimo = row['id']
+                yield row
+
+        data = datetime.now().strftime('%Y%m%dT%H%M%S')
+        nome = f'chat_ia_{data}_{inicio + 1}'
+        caminho = saida / (nome + EXTENSOES[compressao])
+        total = escrever_jsonl(linhas(), caminho, compressao)
+        conn.commit()
+
+    finally:
+        conn.close()
+
+    if total:
+        _gravar_watermark(saida, ultimo)
+    else:
+        caminho.unlink()
+        caminho = None
+
+    resultado = {
+        'arquivo': str(caminho) if caminho else None,
+        'linhas': total,
+        'desde_id': inicio,
+        'ultimo_id': ultimo,
+    }
+    logger.info('chat_ia exportado', extra=resultado)
+    return resultado
+
+
+def exportar_users(saida: Path, compressao: str = 'zstd') -> dict:
+    """Exporta a tabela users inteira."""
+    saida.mkdir(parents=True, exist_ok=True)
+
+    conn = get_vector_conn()
+    conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+
+    try:
+        data = datetime.now().strftime('%Y%m%dT%H%M%S')
+        caminho = saida / f'users_{data}{EXTENSOES[compressao]}'
+        total = escrever_jsonl(
+            ler_em_lotes(
+                conn, 'exportar_users', 'SELECT * FROM users ORDER BY numero'
+            ),
+            caminho,
+            compressao,
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    resultado = {'arquivo': str(caminho), 'linhas': total}
+    logger.info('users exportado', extra=resultado)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('tabela', choices=['chat_ia', 'users'])
+    parser.add_argument('--saida', type=Path, default=Path('exportacao'))
+    parser.add_argument(
+        '--desde-id',
+        type=int,
+        help='chat_ia: exporta ids maiores que este (ignora o watermark)',
+    )
+    parser.add_argument(
+        '--compressao', choices=list(EXTENSOES), default='zstd'
+    )
+    args = parser.parse_args()
+
+    configurar_logs('exportacao')
+    try:
+        if args.tabela == 'chat_ia':
+            resultado = exportar_chat_ia(
+                args.saida, args.desde_id, args.compressao
+            )
+        else:
+            resultado = exportar_users(args.saida, args.compressao)
+    finally:
+        descarregar_logs()
+
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,320 @@
+"""
+Migrações versionadas do banco.
+
+COMO FUNCIONA:
+- Cada arquivo em src/db/migrations/ é uma versão: NNNN_descricao.sql
+- A tabela schema_migrations guarda as versões já aplicadas; com o
+  esquema em dia, nenhum DDL é executado
+- Um advisory lock garante um único migrador por vez (várias réplicas
+  podem chamar o comando juntas sem corrida)
+- Migrações normais rodam numa transação só (aplica tudo ou nada)
+- Arquivos com a linha `-- migracao: sem-transacao` rodam comando a
+  comando fora de transação: é o caso de CREATE INDEX CONCURRENTLY,
+  que não bloqueia escrita nas tabelas em uso, e de blocos DO que fazem
+  COMMIT entre lotes (cópias grandes sem segurar lock); cada comando
+  precisa poder rodar de novo se a migração cair no meio
+- lock_timeout curto: se uma tabela estiver ocupada, a migração falha
+  (e pode ser repetida) em vez de enfileirar o tráfego atrás dela
+
+COMO USAR (comando único, antes de subir API e worker):
+    python -m src.db.migracoes            # aplica as pendentes
+    python -m src.db.migracoes --status   # versão atual x disponível
+"""
+
+import json
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from src.db.conection import get_vector_conn
+from src.observability.logs import (
+    configurar_logs,
+    descarregar_logs,
+    get_logger,
+)
+
+load_dotenv()
+
+logger = get_logger('db')
+
+DIRETORIO = Path(__file__).parent / 'migrations'
+
+# Chave do pg_advisory_lock (qualquer inteiro fixo, só usado aqui)
+CHAVE_LOCK = 7_310_041
+
+LOCK_TIMEOUT = os.getenv('MIGRACAO_LOCK_TIMEOUT', '5s')
+
+MARCADOR_SEM_TRANSACAO = '-- migracao: sem-transacao'
+
+_NOME_ARQUIVO = re.compile(r'^(\d{4})_(\w+)\.sql$')
+
+# Delimitador de bloco entre cifrões ($$ ou $tag$)
+_DOLAR = re.compile(r'(\$\w*\$)')
+
+_CRIA_INDICE = re.compile(
+    r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+'
+    r'(?:IF\s+NOT\s+EXISTS\s+)?(?:"(\w+)"|(\w+))',
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class Migracao:
+    versao: int
+    nome: str
+    sql: str
+
+    @property
+    def transacional(self) -> bool:
+        return MARCADOR_SEM_TRANSACAO not in self.sql
+
+    def comandos(self) -> list[str]:
+        """
+        Comandos separados (usado nas migrações sem transação).
+
+        O `;` dentro de um bloco $$ ... $$ (DO, corpo de função) não
+        separa comandos.
+        """
+        sem_comentarios = '\n'.join(
+            linha
+            for linha in self.sql.splitlines()
+            if not linha.lstrip().startswith('--')
+        )
+
+        comandos, atual, delimitador = [], [], None
+        for parte in _DOLAR.split(sem_comentarios):
+            if delimitador or _DOLAR.fullmatch(parte):
+                atual.append(parte)
+                if parte == delimitador:
+                    delimitador = None
+                elif delimitador is None:
+                    delimitador = parte
+                continue
+
+            *completos, resto = parte.split(';')
+            for pedaco in completos:
+                comandos.append(''.join([*atual, pedaco]))
+                atual = []
+            atual.append(resto)
+        comandos.append(''.join(atual))
+
+        return [c.strip() for c in comandos if c.strip()]
+
+    def indices(self) -> list[str]:
+        """
+        Índices criados com CONCURRENTLY por esta migração, como ficam no
+        catálogo (nome sem aspas vira minúsculo no PostgreSQL).
+        """
+        return [
+            entre_aspas or nome.lower()
+            for comando in self.comandos()
+            for entre_aspas, nome in _CRIA_INDICE.findall(comando)
+        ]
+
+
+def carregar_migracoes(diretorio: Path = DIRETORIO) -> list[Migracao]:
+    """Lê as migrações do diretório, em ordem de versão."""
+    migracoes = []
+    for arquivo in diretorio.glob('*.sql'):
+        combinacao = _NOME_ARQUIVO.match(arquivo.name)
+        if not combinacao:
+            raise ValueError(f'Nome de migração inválido: {arquivo.name}')
+        versao, nome = combinacao.groups()
+        migracoes.append(Migracao(int(versao), nome, arquivo.read_text()))
+
+    migracoes.sort(key=lambda m: m.versao)
+
+    versoes = [m.versao for m in migracoes]
+    if len(versoes) != len(set(versoes)):
+        raise ValueError(f'Versões de migração repetidas: {versoes}')
+
+    return migracoes
+
+
+def _conectar(retries: int, delay: float):
+    for attempt in range(1, retries + 1):
+        try:
+            conn = get_vector_conn()
+            conn.autocommit = True
+            return conn
+        except Exception as e:
+            logger.warning(
+                'Banco não disponível',
+                extra={'tentativa': attempt, 'tentativas': retries, 'erro': e},
+            )
+            time.sleep(delay)
+
+    raise RuntimeError(
+        '❌ Não foi possível conectar ao banco após várias tentativas'
+    )
+
+
+def _aplicadas(cursor) -> set[int]:
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            versao INTEGER PRIMARY KEY,
+            nome VARCHAR(200) NOT NULL,
+            aplicada_em TIMESTAMPTZ DEFAULT NOW(),
+            duracao_ms INTEGER
+        )
+    """
+    )
+    cursor.execute('SELECT versao FROM schema_migrations')
+    return {row['versao'] for row in cursor.fetchall()}
+
+
+def _remover_indices_invalidos(cursor, nomes: list[str]):
+    """
+    Um CREATE INDEX CONCURRENTLY interrompido deixa o índice INVALID, e o
+    IF NOT EXISTS da nova tentativa passaria direto por ele.
+
+    Só remove os índices que a própria migração cria: outros inválidos
+    (ex.: um *_ccnew de um REINDEX em andamento) são do DBA.
+    """
+    if not nomes:
+        return
+
+    cursor.execute(
+        """
+        SELECT c.relname AS nome
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE NOT i.indisvalid
+          AND n.nspname = current_schema()
+          AND c.relname = ANY(%s)
+    """,
+        (nomes,),
+    )
+    for row in cursor.fetchall():
+        logger.warning(
+            'Removendo índice inválido', extra={'indice': row['nome']}
+        )
+        cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{row["nome"]}"')
+
+
+def _aplicar(cursor, migracao: Migracao):
+    inicio = time.perf_counter()
+
+    if migracao.transacional:
+        cursor.execute('BEGIN')
+        try:
+            cursor.execute(migracao.sql)
+            _registrar(cursor, migracao, inicio)
+            cursor.execute('COMMIT')
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+    else:
+        _remover_indices_invalidos(cursor, migracao.indices())
+        for comando in migracao.comandos():
+            cursor.execute(comando)
+        _registrar(cursor, migracao, inicio)
+
+    logger.info(
+        'Migração aplicada',
+        extra={
+            'versao': migracao.versao,
+            'nome': migracao.nome,
+            'segundos': round(time.perf_counter() - inicio, 2),
+        },
+    )
+
+
+def _registrar(cursor, migracao: Migracao, inicio: float):
+    cursor.execute(
+        """
+        INSERT INTO schema_migrations (versao, nome, duracao_ms)
+        VALUES (%s, %s, %s)
+    """,
+        (
+            migracao.versao,
+            migracao.nome,
+            int((time.perf_counter() - inicio) * 1000),
+        ),
+    )
+
+
+def migrar(retries=10, delay=3) -> list[int]:
+    """
+    Aplica as migrações pendentes.
+
+    Returns:
+        list[int]: versões aplicadas agora (vazia se o esquema já estava
+        em dia)
+    """
+    migracoes = carregar_migracoes()
+    conn = _conectar(retries, delay)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute('SELECT pg_advisory_lock(%s)', (CHAVE_LOCK,))
+        cursor.execute('SET lock_timeout = %s', (LOCK_TIMEOUT,))
+
+        aplicadas = _aplicadas(cursor)
+        pendentes = [m for m in migracoes if m.versao not in aplicadas]
+
+        if not pendentes:
+            logger.info(
+                'Esquema em dia', extra={'versao': max(aplicadas, default=0)}
+            )
+            return []
+
+        for migracao in pendentes:
+            _aplicar(cursor, migracao)
+
+        return [m.versao for m in pendentes]
+
+    finally:
+        cursor.execute('SELECT pg_advisory_unlock(%s)', (CHAVE_LOCK,))
+        cursor.close()
+        conn.close()
+
+
+def status() -> dict:
+    """Versão aplicada no banco x versão disponível no código."""
+    migracoes = carregar_migracoes()
+    conn = _conectar(retries=1, delay=0)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT to_regclass('schema_migrations') AS tabela")
+        aplicadas = set()
+        if cursor.fetchone()['tabela']:
+            cursor.execute('SELECT versao FROM schema_migrations')
+            aplicadas = {row['versao'] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+        conn.close()
+
+    return {
+        'versao_banco': max(aplicadas, default=0),
+        'versao_codigo': migracoes[-1].versao if migracoes else 0,
+        'pendentes': [
+            f'{m.versao:04d}_{m.nome}'
+            for m in migracoes
+            if m.versao not in aplicadas
+        ],
+    }
+
+
+def main():
+    if '--status' in sys.argv:
+        print(json.dumps(status(), indent=2))
+        return
+
+    configurar_logs('migracoes')
+    try:
+        migrar()
+    finally:
+        descarregar_logs()
+
+
+if __name__ == '__main__':
+    main()
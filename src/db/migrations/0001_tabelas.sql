@@ -0,0 +1,40 @@
+-- Esquema inicial (o mesmo que o create_tables criava a cada startup).
+-- Tudo com IF NOT EXISTS: num banco que já tinha as tabelas, esta
+-- versão só é registrada.
+
+CREATE EXTENSION IF NOT EXISTS vector;
+CREATE EXTENSION IF NOT EXISTS pgcrypto;
+
+CREATE TABLE IF NOT EXISTS users (
+    numero VARCHAR(20) PRIMARY KEY,
+    nome VARCHAR(200),
+    tipo_usuario VARCHAR(20),
+    turma_serie VARCHAR(50),
+    metadata JSONB DEFAULT '{}',
+    created_at TIMESTAMPTZ DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo'),
+    updated_at TIMESTAMPTZ DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo')
+);
+
+CREATE TABLE IF NOT EXISTS chat_ia (
+    id SERIAL PRIMARY KEY,
+    session_id VARCHAR(20),
+    message JSONB NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo')
+);
+
+CREATE TABLE IF NOT EXISTS rag_embeddings (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    content TEXT NOT NULL,
+    categoria VARCHAR(100),
+    embedding VECTOR(768),
+    created_at TIMESTAMPTZ DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo')
+);
+
+CREATE TABLE IF NOT EXISTS arquivos (
+    id SERIAL PRIMARY KEY,
+    categoria VARCHAR(100) NOT NULL,
+    fileName VARCHAR(255) NOT NULL,
+    mediaType VARCHAR(20) NOT NULL,
+    caminho VARCHAR NOT NULL,
+    criado_em TIMESTAMPTZ DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo')
+);
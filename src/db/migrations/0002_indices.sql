@@ -0,0 +1,19 @@
+-- migracao: sem-transacao
+-- Índices criados sem bloquear escrita (CONCURRENTLY não roda dentro
+-- de transação: cada comando é executado sozinho).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS rag_embedding_idx
+ON rag_embeddings
+USING hnsw (embedding vector_cosine_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS rag_categoria_idx
+ON rag_embeddings (categoria);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS arquivos_categoria_idx
+ON arquivos (categoria);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS arquivos_mediaType_idx
+ON arquivos (mediaType);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS arquivos_fileName_idx
+ON arquivos (fileName);
@@ -0,0 +1,182 @@
+-- migracao: sem-transacao
+-- chat_ia particionada por mês de created_at.
+--
+-- A cópia não trava a tabela em uso: a nova (chat_ia_nova) é montada
+-- ao lado e preenchida em lotes por id, cada lote na sua transação,
+-- enquanto o chat_ia antigo continua recebendo mensagens. Só a troca
+-- final (copiar o que chegou no meio e renomear) segura a escrita, por
+-- pouco tempo. A sequência de id é a mesma, então os ids continuam de
+-- onde estavam. Cada passo pode rodar de novo se a migração cair no
+-- meio.
+
+-- Tabela nova ao lado da antiga (pulado se a troca já aconteceu)
+DO $$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'chat_ia'::regclass) = 'p'
+    THEN
+        RETURN;
+    END IF;
+
+    CREATE TABLE IF NOT EXISTS chat_ia_nova (
+        id BIGINT NOT NULL DEFAULT nextval('chat_ia_id_seq'),
+        session_id VARCHAR(20),
+        message JSONB NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL
+            DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo'),
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+
+    -- Histórico de uma sessão: cada partição tem o seu pedaço do índice
+    CREATE INDEX IF NOT EXISTS chat_ia_nova_session_idx
+    ON chat_ia_nova (session_id, id);
+
+    -- Rede de segurança: linhas fora das partições existentes caem aqui
+    -- (criar_particao_chat_ia move para a partição certa quando ela é
+    -- criada)
+    CREATE TABLE IF NOT EXISTS chat_ia_padrao
+    PARTITION OF chat_ia_nova DEFAULT;
+END;
+$$;
+
+-- Partições dos meses que já têm mensagens, do mês atual e dos próximos
+DO $$
+DECLARE
+    mes TIMESTAMPTZ;
+    nome TEXT;
+BEGIN
+    IF to_regclass('chat_ia_nova') IS NULL THEN
+        RETURN;
+    END IF;
+
+    FOR mes IN
+        SELECT generate_series(
+            date_trunc(
+                'month',
+                COALESCE((SELECT MIN(created_at) FROM chat_ia), NOW())
+            ),
+            date_trunc('month', NOW()) + INTERVAL '2 months',
+            INTERVAL '1 month'
+        )
+    LOOP
+        nome := 'chat_ia_' || to_char(mes, 'YYYY_MM');
+        IF to_regclass(nome) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF chat_ia_nova '
+                'FOR VALUES FROM (%L) TO (%L)',
+                nome, mes, mes + INTERVAL '1 month'
+            );
+        END IF;
+    END LOOP;
+END;
+$$;
+
+-- Cópia em lotes por id: cada COMMIT solta os locks e deixa o vacuum
+-- andar. Recomeça do maior id já copiado.
+DO $$
+DECLARE
+    lote CONSTANT INTEGER := 5000;
+    ultimo BIGINT;
+    copiadas INTEGER;
+BEGIN
+    IF to_regclass('chat_ia_nova') IS NULL THEN
+        RETURN;
+    END IF;
+
+    SELECT COALESCE(MAX(id), 0) INTO ultimo FROM chat_ia_nova;
+
+    LOOP
+        INSERT INTO chat_ia_nova (id, session_id, message, created_at)
+        SELECT id, session_id, message, COALESCE(created_at, NOW())
+        FROM chat_ia
+        WHERE id > ultimo
+        ORDER BY id
+        LIMIT lote;
+
+        GET DIAGNOSTICS copiadas = ROW_COUNT;
+        EXIT WHEN copiadas = 0;
+
+        SELECT MAX(id) INTO ultimo FROM chat_ia_nova;
+        COMMIT;
+    END LOOP;
+END;
+$$;
+
+-- Mensagens com id menor que o do lote, mas que só confirmaram depois
+-- dele ter passado (ainda sem travar a escrita)
+DO $$
+BEGIN
+    IF to_regclass('chat_ia_nova') IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO chat_ia_nova (id, session_id, message, created_at)
+    SELECT l.id, l.session_id, l.message, COALESCE(l.created_at, NOW())
+    FROM chat_ia l
+    WHERE NOT EXISTS (SELECT 1 FROM chat_ia_nova n WHERE n.id = l.id);
+END;
+$$;
+
+-- Troca: bloqueia a escrita (leitura segue), copia tudo o que ainda
+-- falta e renomeia. A conferência é pela tabela inteira, sem corte por
+-- id: uma linha que confirmou fora da ordem dos ids também entra. Com o
+-- passo anterior já feito, sobra pouco para inserir; o custo sob o lock
+-- é a leitura do chat_ia antigo. A sequência passa a ser da tabela nova
+-- antes da antiga ser apagada (senão iria junto).
+DO $$
+BEGIN
+    IF to_regclass('chat_ia_nova') IS NULL THEN
+        RETURN;
+    END IF;
+
+    LOCK TABLE chat_ia IN EXCLUSIVE MODE;
+
+    INSERT INTO chat_ia_nova (id, session_id, message, created_at)
+    SELECT l.id, l.session_id, l.message, COALESCE(l.created_at, NOW())
+    FROM chat_ia l
+    WHERE NOT EXISTS (SELECT 1 FROM chat_ia_nova n WHERE n.id = l.id);
+
+    ALTER SEQUENCE chat_ia_id_seq OWNED BY NONE;
+    ALTER TABLE chat_ia RENAME TO chat_ia_legado;
+    ALTER TABLE chat_ia_nova RENAME TO chat_ia;
+    ALTER INDEX chat_ia_nova_session_idx RENAME TO chat_ia_session_idx;
+    ALTER SEQUENCE chat_ia_id_seq OWNED BY chat_ia.id;
+END;
+$$;
+
+DROP TABLE IF EXISTS chat_ia_legado;
+
+-- Cria a partição do mês (idempotente). Retorna o nome ou NULL se já
+-- existia.
+CREATE OR REPLACE FUNCTION criar_particao_chat_ia(mes DATE)
+RETURNS TEXT AS $$
+DECLARE
+    inicio TIMESTAMPTZ := date_trunc('month', mes);
+    fim TIMESTAMPTZ := date_trunc('month', mes) + INTERVAL '1 month';
+    nome TEXT := 'chat_ia_' || to_char(mes, 'YYYY_MM');
+BEGIN
+    IF to_regclass(nome) IS NOT NULL THEN
+        RETURN NULL;
+    END IF;
+
+    -- Linhas do mês que caíram na partição padrão saem de lá antes
+    -- (senão a criação da partição falha)
+    LOCK TABLE chat_ia_padrao IN SHARE ROW EXCLUSIVE MODE;
+
+    CREATE TEMP TABLE _chat_ia_movidas (LIKE chat_ia) ON COMMIT DROP;
+    INSERT INTO _chat_ia_movidas
+        SELECT * FROM chat_ia_padrao
+        WHERE created_at >= inicio AND created_at < fim;
+    DELETE FROM chat_ia_padrao
+        WHERE created_at >= inicio AND created_at < fim;
+
+    EXECUTE format(
+        'CREATE TABLE %I PARTITION OF chat_ia FOR VALUES FROM (%L) TO (%L)',
+        nome, inicio, fim
+    );
+
+    INSERT INTO chat_ia SELECT * FROM _chat_ia_movidas;
+    DROP TABLE _chat_ia_movidas;
+
+    RETURN nome;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,22 @@
+-- Rollup diário do uso do LLM por número, versão do prompt e modelo.
+-- Alimentado em lote a partir dos contadores do Redis
+-- (src/redis/consumo.py -> src/db/consumo.py); custo calculado na
+-- consulta, com a tabela de preços do código.
+
+CREATE TABLE IF NOT EXISTS consumo_diario (
+    dia DATE NOT NULL,
+    numero VARCHAR(20) NOT NULL,
+    prompt VARCHAR(20) NOT NULL,
+    modelo VARCHAR(100) NOT NULL,
+    turnos INTEGER NOT NULL DEFAULT 0,
+    chamadas INTEGER NOT NULL DEFAULT 0,
+    tokens_entrada BIGINT NOT NULL DEFAULT 0,
+    tokens_saida BIGINT NOT NULL DEFAULT 0,
+    rodadas_ferramenta INTEGER NOT NULL DEFAULT 0,
+    latencia_ms BIGINT NOT NULL DEFAULT 0,
+    atualizado_em TIMESTAMPTZ DEFAULT (NOW() AT TIME ZONE 'America/Sao_Paulo'),
+    PRIMARY KEY (dia, numero, prompt, modelo)
+);
+
+CREATE INDEX IF NOT EXISTS consumo_diario_numero_idx
+ON consumo_diario (numero, dia);
@@ -0,0 +1,206 @@
+"""
+Manutenção das partições mensais do chat_ia.
+
+COMO FUNCIONA:
+- Garante as partições do mês atual e dos próximos PARTICOES_A_FRENTE
+  meses (a função criar_particao_chat_ia, da migração 0003, faz o
+  trabalho no banco)
+- Partições mais antigas que RETENCAO_MESES são arquivadas: as linhas
+  são lidas com cursor no servidor (memória constante) e gravadas em
+  JSONL comprimido com zstd em ARQUIVO_DIR (ver src/db/exportacao.py);
+  só depois de conferir a contagem a partição é desanexada e apagada
+- Arquivo já existente não é sobrescrito (rodar de novo é seguro)
+
+COMO USAR (uma vez por dia, ver serviço `manutencao` no compose):
+    python -m src.db.particoes            # cria partições + retenção
+    python -m src.db.particoes --status   # partições e tamanhos
+"""
+
+import json
+import os
+import sys
+from datetime import date
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from src.db.conection import get_vector_conn
+from src.db.exportacao import escrever_jsonl, ler_em_lotes
+from src.observability.logs import (
+    configurar_logs,
+    descarregar_logs,
+    get_logger,
+)
+
+load_dotenv()
+
+logger = get_logger('db')
+
+PARTICOES_A_FRENTE = int(os.getenv('PARTICOES_A_FRENTE', '2'))
+# 0 desliga a retenção (nada é arquivado)
+RETENCAO_MESES = int(os.getenv('RETENCAO_MESES', '12'))
+ARQUIVO_DIR = Path(os.getenv('ARQUIVO_DIR', 'arquivo'))
+
+
+def _somar_meses(mes: date, meses: int) -> date:
+    total = mes.year * 12 + mes.month - 1 + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def particoes_vencidas(
+    particoes: list[str], hoje: date, retencao_meses: int
+) -> list[str]:
+    """
+    Partições mensais (chat_ia_AAAA_MM) inteiramente fora da retenção.
+
+    A partição padrão e nomes fora do formato nunca entram.
+    """
+    if retencao_meses <= 0:
+        return []
+
+    limite = _somar_meses(hoje.replace(day=1), -retencao_meses)
+    vencidas = []
+
+    for nome in particoes:
+        try:
+            ano, mes = nome.removeprefix('chat_ia_').split('_')
+            inicio = date(int(ano), int(mes), 1)
+        except ValueError:
+            continue
+        if inicio < limite:
+            vencidas.append(nome)
+
+    return sorted(vencidas)
+
+
+def garantir_particoes(conn, hoje: date | None = None) -> list[str]:
+    """Cria as partições que faltam (mês atual + próximos)."""
+    hoje = hoje or date.today()
+    criadas = []
+
+    with conn.cursor() as cursor:
+        for i in range(PARTICOES_A_FRENTE + 1):
+            mes = _somar_meses(hoje.replace(day=1), i)
+            cursor.execute('SELECT criar_particao_chat_ia(%s) AS nome', (mes,))
+            nome = cursor.fetchone()['nome']
+            if nome:
+                criadas.append(nome)
+    conn.commit()
+
+    if criadas:
+        logger.info('Partições criadas', extra={'particoes': criadas})
+    return criadas
+
+
+def listar_particoes(conn) -> list[dict]:
+    with conn.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname AS nome,
+                   pg_total_relation_size(c.oid) AS bytes,
+                   c.reltuples::BIGINT AS linhas_estimadas
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'chat_ia'::regclass
+            ORDER BY c.relname
+        """
+        )
+        return cursor.fetchall()
+
+
+def arquivar_particao(conn, nome: str, diretorio: Path = ARQUIVO_DIR):
+    """
+    Grava a partição em <diretorio>/<nome>.jsonl.zst e a remove do banco.
+
+    Returns:
+        Path | None: arquivo gravado (None se já existia e nada foi feito)
+    """
+    destino = diretorio / f'{nome}.jsonl.zst'
+    if destino.exists():
+        logger.warning(
+            'Arquivo da partição já existe, pulando',
+            extra={'particao': nome, 'arquivo': str(destino)},
+        )
+        return None
+
+    diretorio.mkdir(parents=True, exist_ok=True)
+
+    linhas = escrever_jsonl(
+        ler_em_lotes(
+            conn,
+            f'arquivar_{nome}',
+            f'SELECT id, session_id, message, created_at FROM "{nome}" '
+            'ORDER BY id',
+        ),
+        destino,
+    )
+    conn.commit()
+
+    with conn.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) AS total FROM "{nome}"')
+        total = cursor.fetchone()['total']
+
+    if total != linhas:
+        destino.unlink()
+        raise RuntimeError(
+            f'Contagem divergente ao arquivar {nome}: {linhas} != {total}'
+        )
+
+    # DETACH bloqueia o chat_ia por um instante: desiste se não conseguir
+    with conn.cursor() as cursor:
+        cursor.execute("SET LOCAL lock_timeout = '5s'")
+        cursor.execute(f'ALTER TABLE chat_ia DETACH PARTITION "{nome}"')
+        cursor.execute(f'DROP TABLE "{nome}"')
+    conn.commit()
+
+    logger.info(
+        'Partição arquivada',
+        extra={'particao': nome, 'linhas': linhas, 'arquivo': str(destino)},
+    )
+    return destino
+
+
+def aplicar_retencao(conn, hoje: date | None = None) -> list[str]:
+    """Arquiva as partições fora da retenção."""
+    nomes = [p['nome'] for p in listar_particoes(conn)]
+    vencidas = particoes_vencidas(nomes, hoje or date.today(), RETENCAO_MESES)
+
+    for nome in vencidas:
+        arquivar_particao(conn, nome)
+
+    return vencidas
+
+
+def manter():
+    """Rotina diária: partições novas e retenção."""
+    conn = get_vector_conn()
+    try:
+        garantir_particoes(conn)
+        aplicar_retencao(conn)
+    except Exception:
+        conn.rollback()
+        logger.exception('Erro na manutenção das partições')
+        raise
+    finally:
+        conn.close()
+
+
+def main():
+    if '--status' in sys.argv:
+        conn = get_vector_conn()
+        try:
+            particoes = listar_particoes(conn)
+        finally:
+            conn.close()
+        print(json.dumps(particoes, indent=2))
+        return
+
+    configurar_logs('manutencao')
+    try:
+        manter()
+    finally:
+        descarregar_logs()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,14 @@
 import os
+import time
 
 import requests
 from dotenv import load_dotenv
 
+from src.observability.metrics import evolution_duracao
+from src.observability.tracing import SpanKind, injetar_contexto, span
+from src.redis.idempotencia import executar_uma_vez
+from src.redis.rate_limiter import HTTP_429, limitadores, retry_after
+
 load_dotenv()
 
 
@@ -15,6 +21,21 @@ url_sendText = f'{base_url_evo}/message/sendText/{instance_name}'
 url_sendMedia = f'{base_url_evo}/message/sendMedia/{instance_name}'
 headers = {'Content-Type': 'application/json', 'apikey': instance_token}
 
+MAX_TENTATIVAS_429 = 3
+
+# Sessão HTTP do processo: as partes de uma resposta reaproveitam a mesma
+# conexão (keep-alive) em vez de abrir uma por envio
+sessao = requests.Session()
+
+
+def _nova_sessao():
+    # Conexões abertas no pai não podem ser usadas pelo filho (fork do RQ)
+    global sessao  # noqa: PLW0603
+    sessao = requests.Session()
+
+
+os.register_at_fork(after_in_child=_nova_sessao)
+
 
 class EvolutionAPI:
     def __init__(self):
@@ -24,12 +45,37 @@ class EvolutionAPI:
 
     def _post(self, endpoint: str, payload: dict) -> dict:
         url = f'{self.base_url_evo}{endpoint}/{self.instance_name}'
-        response = requests.post(url=url, headers=self.headers, json=payload)
+        limitador = limitadores['evolution']
+
+        for _ in range(MAX_TENTATIVAS_429):
+            with (
+                limitador.reservar(),
+                span(f'evolution {endpoint}', kind=SpanKind.CLIENT) as atual,
+            ):
+                inicio = time.perf_counter()
+                response = sessao.post(
+                    url=url,
+                    headers={**self.headers, **injetar_contexto()},
+                    json=payload,
+                )
+                evolution_duracao.labels(
+                    endpoint=endpoint, status=response.status_code
+                ).observe(time.perf_counter() - inicio)
+                atual.set_attribute('http.status_code', response.status_code)
+
+            # 429: pausa todos os workers e tenta de novo na fila,
+            # em vez de falhar e fazer o RQ repetir o grafo inteiro
+            if response.status_code != HTTP_429:
+                break
+
+            limitador.penalizar(retry_after(response))
 
         response.raise_for_status()
         return response.json()
 
-    def sender_text(self, number: str, text: str) -> list[dict]:
+    def sender_text(
+        self, number: str, text: str, chave_idempotencia: str | None = None
+    ) -> list[dict]:
 
         texto = text.replace('\n\n', ' ').replace('\n', ' ').strip()
 
@@ -44,7 +90,7 @@ class EvolutionAPI:
 
         responses = []
 
-        for parte in partes:
+        for i, parte in enumerate(partes):
             payload = {
                 'number': number,
                 'text': parte,
@@ -52,8 +98,13 @@ class EvolutionAPI:
                 'presence': 'composing',
             }
 
-            response = self._post(
-                endpoint='/message/sendText', payload=payload
+            # Cada parte tem sua própria chave: numa nova tentativa do job
+            # só as partes que ainda não foram enviadas saem de novo
+            response = executar_uma_vez(
+                f'{chave_idempotencia}:{i}' if chave_idempotencia else None,
+                self._post,
+                endpoint='/message/sendText',
+                payload=payload,
             )
 
             responses.append(response)
@@ -0,0 +1,227 @@
+"""
+Entrega de arquivos (documentos da escola) pela Evolution API.
+
+COMO FUNCIONA:
+- O arquivo vem do get_file (tabela arquivos: categoria -> caminho)
+- Caminho http(s) vai direto como URL: a Evolution baixa, nada é lido
+  nem codificado aqui
+- Caminho local é lido em blocos e codificado em base64 bloco a bloco
+  (blocos múltiplos de 3 bytes: a concatenação é o base64 do arquivo)
+- O payload codificado fica em cache em duas camadas, as duas LRU
+  limitadas por tamanho:
+  1. memória do processo (CACHE_LOCAL_BYTES)
+  2. Redis (CACHE_REDIS_BYTES), compartilhado entre os jobs do worker
+     (cada job roda num fork, que não herda o que o anterior leu); os
+     payloads expiram em CACHE_REDIS_TTL sem uso
+- A chave inclui tamanho e mtime do arquivo: trocar o documento no
+  disco invalida o cache sozinho (só um stat, sem ler o arquivo)
+
+Arquivos maiores que MAX_BYTES não entram no cache (são enviados mesmo
+assim).
+"""
+
+import base64
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from src.db.crud import PostgreSQL
+from src.evolution.client import EvolutionAPI
+from src.observability.logs import get_logger
+from src.observability.metrics import midia_cache
+from src.redis.client_redis import redis_client
+
+load_dotenv()
+
+logger = get_logger('midia')
+
+CACHE_LOCAL_BYTES = int(os.getenv('MIDIA_CACHE_LOCAL_BYTES', str(64 * 2**20)))
+CACHE_REDIS_BYTES = int(os.getenv('MIDIA_CACHE_REDIS_BYTES', str(256 * 2**20)))
+MAX_BYTES = int(os.getenv('MIDIA_MAX_BYTES', str(16 * 2**20)))
+
+# Múltiplo de 3: cada bloco vira base64 sem padding no meio
+BLOCO = 3 * 2**16
+
+# Payload parado esse tempo sai do Redis mesmo sem pressão de espaço
+CACHE_REDIS_TTL = int(os.getenv('MIDIA_CACHE_REDIS_TTL', str(7 * 86400)))
+
+CHAVE_LRU = 'midia:lru'
+CHAVE_TOTAL = 'midia:bytes'
+CHAVE_TAMANHOS = 'midia:tamanhos'
+
+
+class CacheLRU:
+    """LRU em memória limitada pelo total de bytes dos valores."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total = 0
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave: str) -> str | None:
+        with self._lock:
+            valor = self._itens.get(chave)
+            if valor is not None:
+                self._itens.move_to_end(chave)
+            return valor
+
+    def put(self, chave: str, valor: str):
+        if len(valor) > self.max_bytes:
+            return
+
+        with self._lock:
+            anterior = self._itens.pop(chave, None)
+            if anterior is not None:
+                self.total -= len(anterior)
+
+            self._itens[chave] = valor
+            self.total += len(valor)
+
+            while self.total > self.max_bytes:
+                _, removido = self._itens.popitem(last=False)
+                self.total -= len(removido)
+
+
+# Grava o payload e despeja os menos usados até caber no limite. O
+# tamanho de cada entrada fica guardado (hash tamanhos): o total desconta
+# o que foi gravado, mesmo que o payload já tenha expirado. O script só
+# mexe nas chaves que recebe: as despejadas voltam para quem chamou apagar.
+# KEYS: lru (zset chave -> último uso), total, tamanhos, payload
+# ARGV: payload, agora, limite, ttl
+GRAVAR_LUA = """
+if redis.call('EXISTS', KEYS[4]) == 1 then
+    redis.call('ZADD', KEYS[1], ARGV[2], KEYS[4])
+    redis.call('EXPIRE', KEYS[4], ARGV[4])
+    return {}
+end
+
+-- Entrada que expirou sozinha: o tamanho antigo sai antes de regravar
+local anterior = tonumber(redis.call('HGET', KEYS[3], KEYS[4]) or 0)
+local tamanho = string.len(ARGV[1])
+
+redis.call('SET', KEYS[4], ARGV[1], 'EX', ARGV[4])
+redis.call('ZADD', KEYS[1], ARGV[2], KEYS[4])
+redis.call('HSET', KEYS[3], KEYS[4], tamanho)
+local total = redis.call('INCRBY', KEYS[2], tamanho - anterior)
+
+local removidos = {}
+while total > tonumber(ARGV[3]) do
+    local mais_antigo = redis.call('ZRANGE', KEYS[1], 0, 0)[1]
+    if not mais_antigo then
+        break
+    end
+    redis.call('ZREM', KEYS[1], mais_antigo)
+    local bytes = tonumber(redis.call('HGET', KEYS[3], mais_antigo) or 0)
+    redis.call('HDEL', KEYS[3], mais_antigo)
+    total = redis.call('DECRBY', KEYS[2], bytes)
+    table.insert(removidos, mais_antigo)
+end
+
+if total < 0 then
+    redis.call('SET', KEYS[2], 0)
+end
+return removidos
+"""
+
+_gravar = redis_client.register_script(GRAVAR_LUA)
+
+cache_local = CacheLRU(CACHE_LOCAL_BYTES)
+
+
+def _chave(caminho: str, estado: os.stat_result) -> str:
+    base = f'{caminho}:{estado.st_size}:{estado.st_mtime_ns}'
+    return f'midia:payload:{hashlib.sha1(base.encode()).hexdigest()}'
+
+
+def codificar_arquivo(caminho: str) -> str:
+    """Lê o arquivo em blocos e devolve o base64 completo."""
+    partes = []
+    with open(caminho, 'rb') as arquivo:
+        while bloco := arquivo.read(BLOCO):
+            partes.append(base64.b64encode(bloco).decode('ascii'))
+    return ''.join(partes)
+
+
+def carregar_midia(caminho: str) -> str:
+    """
+    Valor do campo `media` do sendMedia para o caminho (URL ou base64),
+    passando pelas duas camadas de cache.
+    """
+    if caminho.startswith(('http://', 'https://')):
+        midia_cache.labels(camada='url').inc()
+        return caminho
+
+    estado = os.stat(caminho)
+    chave = _chave(caminho, estado)
+
+    payload = cache_local.get(chave)
+    if payload is not None:
+        midia_cache.labels(camada='local').inc()
+        return payload
+
+    payload = redis_client.get(chave)
+    if payload is not None:
+        with redis_client.pipeline(transaction=False) as pipe:
+            pipe.zadd(CHAVE_LRU, {chave: time.time()})
+            pipe.expire(chave, CACHE_REDIS_TTL)
+            pipe.execute()
+        cache_local.put(chave, payload)
+        midia_cache.labels(camada='redis').inc()
+        return payload
+
+    payload = codificar_arquivo(caminho)
+    midia_cache.labels(camada='disco').inc()
+
+    if estado.st_size <= MAX_BYTES:
+        cache_local.put(chave, payload)
+        removidos = _gravar(
+            keys=[CHAVE_LRU, CHAVE_TOTAL, CHAVE_TAMANHOS, chave],
+            args=[payload, time.time(), CACHE_REDIS_BYTES, CACHE_REDIS_TTL],
+            client=redis_client,
+        )
+        if removidos:
+            redis_client.delete(*removidos)
+            logger.info(
+                'Cache de mídia despejou arquivos',
+                extra={'removidos': len(removidos)},
+            )
+
+    return payload
+
+
+def enviar_arquivo(numero: str, categoria: str, legenda: str = '') -> dict:
+    """
+    Procura o arquivo da categoria e envia para o número.
+
+    Returns:
+        dict: {'enviado': bool, 'arquivo': nome ou None, 'motivo': ...}
+    """
+    arquivo = PostgreSQL.get_file(categoria)
+    if not arquivo:
+        return {'enviado': False, 'arquivo': None, 'motivo': 'nao_encontrado'}
+
+    # RealDictCursor devolve as colunas em minúsculas
+    nome = arquivo['filename']
+
+    try:
+        midia = carregar_midia(arquivo['caminho'])
+    except OSError:
+        logger.exception(
+            'Arquivo não pôde ser lido',
+            extra={'categoria': categoria, 'caminho': arquivo['caminho']},
+        )
+        return {'enviado': False, 'arquivo': nome, 'motivo': 'ilegivel'}
+
+    EvolutionAPI().sender_file(
+        numero,
+        media_type=arquivo['mediatype'],
+        file_name=nome,
+        media=midia,
+        caption=legenda,
+    )
+    return {'enviado': True, 'arquivo': nome, 'motivo': None}
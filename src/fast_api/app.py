@@ -1,15 +1,61 @@
+import hmac
+import os
+import time
 from contextlib import asynccontextmanager
-from src.db.table import create_tables
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from datetime import date, timedelta
 
-from src.agent.audio_transcription import audio_transcription
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
+from pydantic import ValidationError
+from starlette.background import BackgroundTask
 
 # Imports do seu projeto
-from src.redis.buffer import adicionar_ao_buffer, iniciar_ouvinte_background
-from src.redis.rq import enqueue_agent_processing
-import requests
-import base64
+from src.agent.audio_transcription import audio_transcription
+from src.db.consumo import AGRUPAMENTOS, consultar
+from src.fast_api.schemas import (
+    ConteudoMensagem,
+    motivo_descarte,
+    validar_evento,
+)
+from src.observability.logs import (
+    configurar_logs,
+    descarregar_logs,
+    get_logger,
+)
+from src.observability.metrics import (
+    gerar_metricas,
+    registrar_fila,
+    webhook_descartados,
+    webhook_latencia,
+)
+from src.observability.tracing import (
+    SpanKind,
+    configurar_tracing,
+    extrair_contexto,
+    span,
+)
+from src.redis.admissao import controle_admissao
+from src.redis.buffer import (
+    adicionar_ao_buffer,
+    iniciar_ouvinte_background,
+    liberar_mensagem,
+    reivindicar_mensagem,
+)
+from src.redis.consumo import hoje, tokens_hoje
+from src.redis.ingestao import (
+    MODO_INGESTAO,
+    garantir_grupo,
+    publicar_evento,
+    status_ingestao,
+)
+from src.redis.rq import enqueue_agent_processing, filas
+
+logger = get_logger('webhook')
+
+# Protege o /consumo (números e custos); vazio desliga a rota
+TOKEN_CONSUMO = os.getenv('CONSUMO_TOKEN', '')
+
 # ============================================================================
 # FUNÇÃO QUE PROCESSA AS MENSAGENS AGRUPADAS (Callback do ouvinte)
 # ============================================================================
@@ -36,14 +82,17 @@ async def processar_mensagens_agrupadas(numero: str, texto_final: str):
         texto_final (str): Mensagens concatenadas com espaço
     """
     try:
-        print(f'📦 Buffer expirado para: {numero}')
-        print(f'💬 Texto agrupado: {texto_final}')
+        logger.info(
+            'Buffer expirado', extra={'numero': numero, 'texto': texto_final}
+        )
 
         # Coloca na fila RQ (não executa agora, apenas enfileira)
         enqueue_agent_processing(numero, texto_final)
 
-    except Exception as e:
-        print(f'❌ Erro ao enfileirar processamento para {numero}: {e}\n')
+    except Exception:
+        logger.exception(
+            'Erro ao enfileirar processamento', extra={'numero': numero}
+        )
 
 
 # ============================================================================
@@ -57,7 +106,6 @@ async def lifespan(app: FastAPI):
     Context manager que gerencia o ciclo de vida da aplicação FastAPI.
 
     STARTUP (yield):
-    - Cria tabelas do banco de dados
     - Inicia o ouvinte de expiração do Redis em background
 
     SHUTDOWN (após yield):
@@ -67,22 +115,31 @@ async def lifespan(app: FastAPI):
     1. Quando a app sobe, o código antes de 'yield' é executado
     2. A app roda normalmente
     3. Quando a app encerra, o código depois de 'yield' é executado
+
+    O esquema do banco não é tocado aqui: as migrações rodam antes, num
+    comando separado (python -m src.db.migracoes).
     """
-    print('🚀 Inicializando aplicação...')
+    configurar_logs('api')
+    configurar_tracing('api')
 
-    # Se quiser criar tabelas automaticamente, descomente:
-    create_tables()
-    print("🟢 Banco pronto!")
+    logger.info('Inicializando aplicação')
 
-    # Inicia o ouvinte em background
-    # Passa a função que será chamada quando buffer expirar
-    iniciar_ouvinte_background(processar_mensagens_agrupadas)
+    if MODO_INGESTAO == 'streams':
+        # O debounce e o despacho rodam nos consumidores da stream
+        # (python -m src.redis.ingestao)
+        garantir_grupo()
+        logger.info('Ingestão por streams pronta')
+    else:
+        # Inicia o ouvinte em background
+        # Passa a função que será chamada quando buffer expirar
+        iniciar_ouvinte_background(processar_mensagens_agrupadas)
 
-    print('✅ Sistema de buffer pronto!\n')
+        logger.info('Sistema de buffer pronto')
 
     yield  # Aplicação roda aqui
 
-    print('🛑 Encerrando aplicação...')
+    logger.info('Encerrando aplicação')
+    descarregar_logs()
 
 
 # ============================================================================
@@ -91,80 +148,188 @@ async def lifespan(app: FastAPI):
 
 app = FastAPI(lifespan=lifespan)
 
+for fila in filas.values():
+    registrar_fila(fila)
+
+
+@app.middleware('http')
+async def medir_webhook(request: Request, call_next):
+    """
+    Registra a latência do /webhook (por status HTTP) e abre o span raiz
+    do trace da conversa.
+    """
+    if request.url.path != '/webhook':
+        return await call_next(request)
+
+    inicio = time.perf_counter()
+
+    with span(
+        'POST /webhook',
+        kind=SpanKind.SERVER,
+        contexto=extrair_contexto(dict(request.headers)),
+    ) as atual:
+        response = await call_next(request)
+        atual.set_attribute('http.status_code', response.status_code)
+
+    webhook_latencia.labels(status=response.status_code).observe(
+        time.perf_counter() - inicio
+    )
+    return response
+
 
 # ============================================================================
 # WEBHOOK: Recebe mensagens do WhatsApp
 # ============================================================================
 
 
+def _ignorar(motivo: str) -> JSONResponse:
+    """Responde 200 (a Evolution não reenvia) sem processar o evento."""
+    webhook_descartados.labels(motivo=motivo).inc()
+    if motivo == 'excesso':
+        controle_admissao.registrar('descarte_excesso')
+    logger.debug('Evento ignorado', extra={'motivo': motivo, 'amostra': 0.1})
+    return JSONResponse(
+        content={'status': 'ignorado', 'motivo': motivo}, status_code=200
+    )
+
+
+async def _transcrever_audio(conteudo: ConteudoMensagem) -> str:
+    """Texto do áudio (ou um marcador, se não deu para transcrever)."""
+    if not conteudo.base64:
+        logger.warning('Base64 do áudio não encontrado')
+        return '[Áudio não processado]'
+
+    logger.debug('Processando áudio')
+    try:
+        # Chamada HTTP bloqueante: fora do event loop
+        result = await run_in_threadpool(
+            audio_transcription, audio_base64=conteudo.base64
+        )
+        return result.get('text', '[Erro na transcrição]')
+    except Exception:
+        logger.exception('Erro ao processar áudio')
+        return '[Erro ao processar áudio]'
+
+
+def _admitir(
+    number: str,
+    message: str,
+    id_mensagem: str | None,
+    reivindicada: bool,
+    estado,
+) -> str | None:
+    """
+    Deduplicação, limite por número e entrada no buffer (ou na stream).
+
+    Returns:
+        str | None: motivo do descarte, ou None se a mensagem entrou
+    """
+    if MODO_INGESTAO == 'streams':
+        # Deduplicação e limite aqui; debounce e despacho no consumidor
+        if not reivindicada:
+            motivo = reivindicar_mensagem(number, id_mensagem)
+            if motivo:
+                return motivo
+        publicar_evento(number, message, estado.debounce)
+        return None
+
+    # Deduplicação, limite por número e append na mesma ida ao Redis
+    return adicionar_ao_buffer(
+        number,
+        message,
+        id_mensagem,
+        janela_minima=estado.debounce,
+        reivindicada=reivindicada,
+    )
+
+
+def _aceitar(number: str, estado) -> JSONResponse:
+    """Resposta de sucesso; sob carga, agenda o aviso de "ocupado"."""
+    # Sobrecarga: avisa o usuário que a resposta vai demorar
+    # (depois de responder a Evolution)
+    aviso = None
+    if estado.nivel == 'critico':
+        aviso = BackgroundTask(controle_admissao.avisar_ocupado, number)
+    if estado.nivel != 'normal':
+        controle_admissao.registrar(f'debounce_{estado.nivel}')
+
+    return JSONResponse(
+        content={'status': 'mensagem adicionada ao buffer'},
+        status_code=200,
+        background=aviso,
+    )
+
+
 @app.post('/webhook')
 async def webhook(request: Request):
     """
     Recebe mensagens do WhatsApp via webhook.
 
     FLUXO:
-    1. Recebe dados do WhatsApp
-    2. Extrai informações úteis (tipo de mensagem, conteúdo, número)
-    3. Adiciona ao buffer Redis
-    4. Timer começa/reinicia
-    5. Retorna sucesso
-
-    O processamento acontece automaticamente no background quando o timer expira.
+    1. Valida o payload com o schema compilado (direto dos bytes)
+    2. Descarta eventos irrelevantes antes de qualquer I/O
+       (fromMe, grupos, status, tipos não suportados, texto vazio)
+    3. Extrai o conteúdo (texto ou transcrição do áudio)
+    4. Adiciona ao buffer Redis (timer começa/reinicia), ignorando
+       reentregas do mesmo data.key.id e números abusivos
+    5. Sob carga nos workers: debounce maior e aviso de "ocupado"
+    6. Retorna sucesso
+
+    O processamento acontece no background quando o timer expira.
     """
     try:
-        data = await request.json()
-        messageType = data['data'].get('messageType')
-
-        if data:
-            # ========== EXTRAI O TIPO DE MENSAGEM ==========
-            if messageType == 'conversation':
-                # Mensagem de texto normal
-                message = data['data']['message'].get('conversation')
-
-            elif messageType == 'audioMessage':
-                
-                audio_base64 = data['data']['message'].get('base64')
-                
-                if not audio_base64:
-                    print("❌ Base64 do áudio não encontrado")
-                    message = "[Áudio não processado]"
-                else:
-                    print('🎤 Processando Audio...')
-                    try:
-                        result = audio_transcription(audio_base64=audio_base64)
-                        message = result.get('text', '[Erro na transcrição]')
-                    except Exception as e:
-                        print(f"❌ Erro ao processar áudio: {e}")
-                        message = "[Erro ao processar áudio]"
-
-            else:
-                # Tipo de mensagem não suportado
-                message = None
-
-            # ========== EXTRAI O NÚMERO DO USUÁRIO ==========
-            remoteJid = data['data']['key'].get('remoteJid')
-            number = remoteJid.split('@')[0]
-
-            # ========== ADICIONA AO BUFFER ==========
-            print(f'📲 Mensagem de: {number}')
-            print(f'💬 Conteúdo: {message}')
-
-            adicionar_ao_buffer(number, message)
-
-            print(f'➕ Mensagem adicionada ao buffer para {number}\n')
-
-            return JSONResponse(
-                content={'status': 'mensagem adicionada ao buffer'},
-                status_code=200,
-            )
-        else:
-            print('⚠️ Payload do webhook não continha os dados esperados.')
-            return JSONResponse(
-                content={'status': 'payload invalido'}, status_code=400
-            )
+        evento = validar_evento(await request.body())
+    except ValidationError:
+        webhook_descartados.labels(motivo='invalido').inc()
+        logger.warning('Payload do webhook sem os dados esperados')
+        return JSONResponse(
+            content={'status': 'payload invalido'}, status_code=400
+        )
+
+    motivo = motivo_descarte(evento)
+    if motivo:
+        return _ignorar(motivo)
+
+    number = evento.numero
+    id_mensagem = evento.data.key.id
+    messageType = evento.data.messageType
+    conteudo = evento.data.message or ConteudoMensagem()
+    reivindicada = False
 
-    except Exception as e:
-        print(f'❌ Erro no webhook: {e}')
+    try:
+        if messageType == 'conversation':
+            message = conteudo.conversation
+        else:
+            # audioMessage: reivindica o ID antes da transcrição, para
+            # uma reentrega não transcrever o mesmo áudio de novo
+            motivo = reivindicar_mensagem(number, id_mensagem)
+            if motivo:
+                return _ignorar(motivo)
+            reivindicada = True
+            message = await _transcrever_audio(conteudo)
+
+        # Sob pressão nos workers a janela do debounce aumenta
+        estado = controle_admissao.atualizar()
+        motivo = _admitir(number, message, id_mensagem, reivindicada, estado)
+        if motivo:
+            return _ignorar(motivo)
+
+        logger.info(
+            'Mensagem adicionada ao buffer',
+            extra={
+                'numero': number,
+                'tipo': messageType,
+                'texto': message,
+                'amostra': 0.1,
+            },
+        )
+        return _aceitar(number, estado)
+
+    except Exception:
+        # Libera o ID para a reentrega da Evolution tentar de novo
+        if reivindicada:
+            liberar_mensagem(id_mensagem)
+        logger.exception('Erro no webhook')
         raise HTTPException(status_code=500, detail='erro interno')
 
 
@@ -178,5 +343,80 @@ async def health_check():
     """
     Rota simples para verificar se a app está rodando.
     Útil para monitoramento.
+
+    Inclui o estado do controle de admissão: nível (normal / elevado /
+    critico), profundidade da fila, atraso dos workers, debounce em uso e
+    as decisões tomadas por este processo. Com INGESTAO=streams, também o
+    backlog da stream de ingestão.
+    """
+    resposta = {
+        'status': 'ok',
+        'message': 'Aplicação rodando com sucesso',
+        'admissao': controle_admissao.resumo(),
+    }
+    if MODO_INGESTAO == 'streams':
+        resposta['ingestao'] = status_ingestao()
+    return resposta
+
+
+# ============================================================================
+# MÉTRICAS (Prometheus)
+# ============================================================================
+
+
+@app.get('/metrics')
+async def metrics():
+    """
+    Métricas no formato do Prometheus: latência do webhook, buffer,
+    profundidade da fila, nós do grafo, LLM, banco e Evolution.
+    """
+    conteudo, content_type = gerar_metricas()
+    return Response(content=conteudo, media_type=content_type)
+
+
+# ============================================================================
+# CONSUMO (tokens e custo por número, prompt, modelo ou dia)
+# ============================================================================
+
+
+@app.get('/consumo')
+async def consumo(
+    request: Request,
+    agrupar: str = 'numero',
+    numero: str | None = None,
+    dias: int = Query(7, ge=1, le=366),
+    limite: int = Query(50, ge=1, le=500),
+):
+    """
+    Uso do LLM nos últimos `dias`, do maior custo para o menor.
+
+    Lê o rollup do Postgres, que fica até CONSUMO_DESCARGA_SEGUNDOS atrás
+    dos contadores. Com `numero`, inclui os tokens de hoje em tempo real
+    (os mesmos da cota). Exige `Authorization: Bearer <CONSUMO_TOKEN>`;
+    sem CONSUMO_TOKEN definido a rota responde 404.
     """
-    return {'status': 'ok', 'message': 'Aplicação rodando com sucesso'}
+    if not TOKEN_CONSUMO:
+        raise HTTPException(status_code=404)
+
+    recebido = request.headers.get('authorization', '')
+    if not hmac.compare_digest(
+        recebido.encode(), f'Bearer {TOKEN_CONSUMO}'.encode()
+    ):
+        raise HTTPException(status_code=401, detail='não autorizado')
+    if agrupar not in AGRUPAMENTOS:
+        raise HTTPException(
+            status_code=422,
+            detail=f'agrupar deve ser um de {sorted(AGRUPAMENTOS)}',
+        )
+
+    ate = date.fromisoformat(hoje())
+    desde = ate - timedelta(days=dias - 1)
+    linhas = await run_in_threadpool(
+        consultar, desde, ate, agrupar=agrupar, numero=numero, limite=limite
+    )
+
+    resposta = {'desde': desde, 'ate': ate, 'agrupar': agrupar}
+    if numero:
+        resposta['tokens_hoje'] = await run_in_threadpool(tokens_hoje, numero)
+    resposta['linhas'] = linhas
+    return resposta
@@ -0,0 +1,93 @@
+from pydantic import BaseModel, TypeAdapter
+
+# Tipos de mensagem que o agente sabe tratar
+TIPOS_SUPORTADOS = {'conversation', 'audioMessage'}
+
+EVENTO_MENSAGEM = 'messages.upsert'
+
+
+class ChaveMensagem(BaseModel):
+    remoteJid: str
+    fromMe: bool = False
+    id: str | None = None
+
+
+class ConteudoMensagem(BaseModel):
+    conversation: str | None = None
+    base64: str | None = None
+
+
+class DadosMensagem(BaseModel):
+    # Outros eventos (connection.update, ...) não têm `key`
+    key: ChaveMensagem | None = None
+    messageType: str | None = None
+    message: ConteudoMensagem | None = None
+
+
+class EventoWebhook(BaseModel):
+    """
+    Payload do webhook da Evolution API (só os campos que usamos).
+
+    Campos extras são ignorados na validação, sem custo de montar
+    dicionários para eles.
+    """
+
+    event: str | None = None
+    data: DadosMensagem
+
+    @property
+    def numero(self) -> str:
+        return self.data.key.remoteJid.split('@')[0]
+
+
+# Schema compilado uma vez: o JSON é lido direto dos bytes (pydantic-core)
+evento_adapter = TypeAdapter(EventoWebhook)
+
+
+def validar_evento(corpo: bytes) -> EventoWebhook:
+    """
+    Decodifica e valida o corpo do webhook.
+
+    Raises:
+        pydantic.ValidationError: JSON inválido ou fora do formato
+    """
+    return evento_adapter.validate_json(corpo)
+
+
+# Motivos de descarte de uma mensagem, na ordem em que são conferidos
+REGRAS_DESCARTE = (
+    ('propria', lambda dados: dados.key.fromMe),
+    ('grupo', lambda dados: dados.key.remoteJid.endswith('@g.us')),
+    ('broadcast', lambda dados: dados.key.remoteJid.endswith('@broadcast')),
+    ('tipo', lambda dados: dados.messageType not in TIPOS_SUPORTADOS),
+    (
+        'vazia',
+        lambda dados: (
+            dados.messageType == 'conversation'
+            and not (dados.message and dados.message.conversation)
+        ),
+    ),
+)
+
+
+def motivo_descarte(evento: EventoWebhook) -> str | None:
+    """
+    Diz por que o evento deve ser ignorado (ou None se deve ser processado).
+
+    MOTIVOS:
+    - evento: não é uma mensagem nova (messages.upsert)
+    - propria: mensagem enviada pela própria instância (fromMe)
+    - grupo: mensagem de grupo (@g.us)
+    - broadcast: status/listas de transmissão (@broadcast)
+    - tipo: messageType que o agente não trata
+    - vazia: texto sem conteúdo (nada entraria no buffer)
+    """
+    dados = evento.data
+
+    nome = (evento.event or EVENTO_MENSAGEM).lower().replace('_', '.')
+    if nome != EVENTO_MENSAGEM or dados.key is None:
+        return 'evento'
+
+    return next(
+        (motivo for motivo, regra in REGRAS_DESCARTE if regra(dados)), None
+    )
@@ -1,30 +1,41 @@
+from langchain_core.runnables import RunnableConfig
+
 from src.agent.base_agent import agent_base
 from src.db.crud import PostgreSQL
 from src.evolution.client import EvolutionAPI
 from src.graph.state import State
 from src.graph.tools import Tools
-from src.prompts.get_prompt import get_prompt
+from src.observability.logs import get_logger
+from src.observability.tracing import rastrear_no
+from src.prompts.registro import registro
+from src.redis.idempotencia import chave_idempotencia, executar_uma_vez
+from src.redis.rq import marcar_conhecido
+
+logger = get_logger('grafo')
 
-prompt_ai = get_prompt(prompt_name='prompt_01')
+NOME_PROMPT = 'prompt_01'
 
 evo = EvolutionAPI()
 
 
 class Nodes:
     @staticmethod
+    @rastrear_no('verify_user')
     def node_verify_user(state: State):
         number = state['number']
 
         exist = PostgreSQL.verify_user(number)
 
         if exist:
-            print(f'✅ Usuário {number} já existe')
+            logger.debug('Usuário já existe', extra={'numero': number})
+            marcar_conhecido(number)
             return 'existent'
         else:
-            print(f'🆕 Novo Usuário {number}')
+            logger.info('Novo usuário', extra={'numero': number})
             return 'new'
 
     @staticmethod
+    @rastrear_no('save_user')
     def node_save_user(state: State):
         number = state['number']
 
@@ -35,11 +46,13 @@ class Nodes:
             turma_serie=None,
             metadata={},
         )
+        marcar_conhecido(number)
 
         return state
 
     @staticmethod
-    def node_save_message_human(state: State):
+    @rastrear_no('save_msg_human')
+    def node_save_message_human(state: State, config: RunnableConfig):
         messages = state['messages']
         number = state['number']
 
@@ -49,23 +62,34 @@ class Nodes:
 
             message_payload = {'type': 'human', 'content': conteudo}
 
-            PostgreSQL.save_message(session_id=number, message=message_payload)
+            executar_uma_vez(
+                chave_idempotencia(config, 'save_msg_human'),
+                PostgreSQL.save_message,
+                session_id=number,
+                message=message_payload,
+            )
 
         return state
 
     @staticmethod
-    def node_sender_message(state):
+    @rastrear_no('sender_message')
+    def node_sender_message(state, config: RunnableConfig):
         messages = state['messages']
         number = state['number']
 
         last_message = messages[-1]
         text = last_message.content
-        evo.sender_text(number=number, text=text)
+        evo.sender_text(
+            number=number,
+            text=text,
+            chave_idempotencia=chave_idempotencia(config, 'sender_message'),
+        )
 
         return state
 
     @staticmethod
-    def node_save_message_ai(state: State):
+    @rastrear_no('save_msg_ai')
+    def node_save_message_ai(state: State, config: RunnableConfig):
 
         message = state['messages']
         number = state['number']
@@ -76,39 +100,54 @@ class Nodes:
 
             message_payload = {'type': 'ai', 'content': conteudo}
 
-            PostgreSQL.save_message(session_id=number, message=message_payload)
+            executar_uma_vez(
+                chave_idempotencia(config, 'save_msg_ai'),
+                PostgreSQL.save_message,
+                session_id=number,
+                message=message_payload,
+            )
 
         return state
 
     @staticmethod
+    @rastrear_no('agente_ai')
     def node_agente_assistente(state: State):
 
         return agent_base(
             state=state,
-            prompt_ia=prompt_ai,
+            prompt_ia=registro.obter(NOME_PROMPT),
             llm_model=Tools.llm_with_tools,
             get_historico_func=PostgreSQL.get_historico,
         )
 
     @staticmethod
+    @rastrear_no('use_tools')
     def node_use_tools(state: State) -> str:
         last_message = state['messages'][-1]
 
         if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
-            print('🔍 Decisão: Chamar ferramentas.')
+            logger.debug('Decisão: chamar ferramentas')
             return 'yes'
         else:
-            print('✅ Decisão: Finalizar e responder.')
+            logger.debug('Decisão: finalizar e responder')
             return 'no'
 
     @staticmethod
+    @rastrear_no('execute_tools')
     def node_execute_tools(state: State):
-        print('🛠️ Executando ferramentas...')
+        logger.debug('Executando ferramentas')
         last_message = state['messages'][-1]
 
-        response = Tools.tool_node.invoke({'messages': [last_message]})
+        # number vai junto para as ferramentas com InjectedState
+        response = Tools.tool_node.invoke({
+            'messages': [last_message],
+            'number': state['number'],
+        })
 
         for msg in response['messages']:
-            print(f'🔧 Resultado da ferramenta: {msg.content}')
+            logger.debug(
+                'Resultado da ferramenta',
+                extra={'ferramenta': msg.name, 'conteudo': msg.content},
+            )
 
-        return {'mensagem': response['messages']}
+        return {'messages': response['messages']}
@@ -1,7 +1,12 @@
 from langchain.tools import tool
-from langgraph.prebuilt import ToolNode
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import InjectedToolCallId
+from langgraph.prebuilt import InjectedState, ToolNode
+from typing_extensions import Annotated
 
-from src.agent.base_agent import llm_groq
+from src.agent.base_agent import llm_router
+from src.evolution.midia import enviar_arquivo
+from src.redis.idempotencia import chave_idempotencia, executar_uma_vez
 
 
 class Tools:
@@ -14,6 +19,39 @@ class Tools:
 
         return 'Agente com tools funcionando'
 
-    tools = [tool_funcionando]
+    @tool(
+        description="""
+        Envia ao usuário um documento da escola (calendário, lista de
+        material, boleto, ...). Use quando o usuário pedir um arquivo.
+        `categoria` é o assunto do documento (ex.: 'calendario').
+        """
+    )
+    def enviar_documento(
+        categoria: str,
+        # Vem do estado do grafo, nunca do modelo: o documento só vai para
+        # quem está na conversa
+        numero: Annotated[str, InjectedState('number')],
+        tool_call_id: Annotated[str, InjectedToolCallId],
+        config: RunnableConfig,
+    ):
+
+        # Uma vez por chamada da ferramenta: nova tentativa do job ou
+        # retomada do checkpoint não reenvia o documento
+        resultado = executar_uma_vez(
+            chave_idempotencia(config, f'documento:{tool_call_id}'),
+            enviar_arquivo,
+            numero,
+            categoria,
+        )
+
+        if resultado is None:
+            return 'Documento já enviado ao usuário.'
+        if resultado['enviado']:
+            return f'Documento {resultado["arquivo"]} enviado ao usuário.'
+        if resultado['motivo'] == 'nao_encontrado':
+            return f'Nenhum documento encontrado para "{categoria}".'
+        return 'Não foi possível enviar o documento agora.'
+
+    tools = [tool_funcionando, enviar_documento]
     tool_node = ToolNode(tools)
-    llm_with_tools = llm_groq.bind_tools(tools)
+    llm_with_tools = llm_router.bind_tools(tools)
@@ -2,6 +2,7 @@ from langgraph.graph import END, StateGraph
 
 from src.graph.nodes import Nodes
 from src.graph.state import State
+from src.redis.checkpoint import checkpointer
 
 workflow = StateGraph(State)
 
@@ -38,4 +39,5 @@ workflow.add_edge('sender_message', 'save_msg_ai')
 workflow.add_edge('save_msg_ai', END)
 
 
-graph = workflow.compile()
+# Checkpoint a cada etapa: uma nova tentativa do RQ retoma de onde parou
+graph = workflow.compile(checkpointer=checkpointer)
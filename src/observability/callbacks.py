@@ -0,0 +1,41 @@
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from src.observability.metrics import no_duracao
+
+# Fica fora de metrics.py para que a API (que não roda o grafo) não
+# precise carregar o LangChain só para expor métricas
+
+
+class MetricasCallbackHandler(BaseCallbackHandler):
+    """
+    Callback do LangChain que mede a duração de cada nó do grafo.
+
+    O LangGraph marca cada execução de nó com `metadata['langgraph_node']`.
+    Guardamos o início pelo run_id e observamos no fim (ou no erro).
+    """
+
+    def __init__(self):
+        self._inicios = {}
+
+    def on_chain_start(
+        self, serialized, inputs, *, run_id, metadata=None, **kwargs
+    ):
+        no = (metadata or {}).get('langgraph_node')
+
+        # Só a execução do próprio nó (não sub-runs dentro dele)
+        if no and kwargs.get('name') == no:
+            self._inicios[run_id] = (no, time.perf_counter())
+
+    def _finalizar(self, run_id):
+        inicio = self._inicios.pop(run_id, None)
+        if inicio:
+            no, t0 = inicio
+            no_duracao.labels(no=no).observe(time.perf_counter() - t0)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finalizar(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finalizar(run_id)
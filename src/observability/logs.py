@@ -0,0 +1,184 @@
+import logging
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+import orjson
+from dotenv import load_dotenv
+from opentelemetry import trace
+from typing_extensions import override
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# Com LOG_CONTEUDO=1 o texto das conversas aparece nos logs (só debug!)
+LOG_CONTEUDO = os.getenv('LOG_CONTEUDO', '0') == '1'
+LOG_FILA_MAX = int(os.getenv('LOG_FILA_MAX', '10000'))
+
+# Campos com texto da conversa: redigidos por padrão
+CAMPOS_SENSIVEIS = {'texto', 'conteudo', 'resposta', 'mensagem'}
+
+# Atributos padrão do LogRecord (o resto veio do `extra=`)
+_ATRIBUTOS_PADRAO = set(
+    logging.LogRecord('', 0, '', 0, '', (), None).__dict__
+) | {'message', 'asctime', 'amostra', 'otel'}
+
+RAIZ = 'projeto_base'
+
+
+def get_logger(nome: str) -> logging.Logger:
+    """Logger da aplicação (ex: get_logger('webhook'))."""
+    return logging.getLogger(f'{RAIZ}.{nome}')
+
+
+def _redigir(campo: str, valor):
+    if LOG_CONTEUDO or campo not in CAMPOS_SENSIVEIS or valor is None:
+        return valor
+    return f'[redigido {len(str(valor))} chars]'
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formata cada registro como uma linha JSON.
+
+    Inclui os campos passados em `extra=`, o trace_id/span_id do span
+    atual (para cruzar com o tracing) e redige o texto das conversas.
+    """
+
+    def __init__(self, servico: str):
+        super().__init__()
+        self.servico = servico
+
+    def format(self, record: logging.LogRecord) -> str:
+        evento = {
+            'ts': record.created,
+            'nivel': record.levelname,
+            'logger': record.name.removeprefix(f'{RAIZ}.'),
+            'servico': self.servico,
+            'msg': record.getMessage(),
+        }
+
+        for campo, valor in record.__dict__.items():
+            if campo not in _ATRIBUTOS_PADRAO:
+                evento[campo] = _redigir(campo, valor)
+
+        contexto = getattr(record, 'otel', None)
+        if contexto:
+            evento.update(contexto)
+
+        if record.exc_info:
+            evento['erro'] = self.formatException(record.exc_info)
+
+        return orjson.dumps(evento, default=str).decode()
+
+
+class FiltroAmostragem(logging.Filter):
+    """
+    Descarta parte dos eventos de alto volume.
+
+    Use `extra={'amostra': 0.1}` para manter ~10% daquele evento.
+    Avisos e erros nunca são descartados.
+    """
+
+    @override
+    def filter(self, record: logging.LogRecord) -> bool:
+        taxa = getattr(record, 'amostra', 1)
+        if taxa >= 1 or record.levelno >= logging.WARNING:
+            return True
+        return random.random() < taxa
+
+
+class QueueHandlerNaoBloqueante(QueueHandler):
+    """
+    QueueHandler que nunca bloqueia quem está logando.
+
+    A formatação e a escrita no stdout acontecem na thread do
+    QueueListener. Se a fila encher, o evento é descartado e contado.
+    """
+
+    def __init__(self, fila):
+        super().__init__(fila)
+        self.descartados = 0
+
+    @override
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Captura o span atual aqui: na thread do listener ele não existe
+        contexto = trace.get_current_span().get_span_context()
+        if contexto.is_valid:
+            record.otel = {
+                'trace_id': format(contexto.trace_id, '032x'),
+                'span_id': format(contexto.span_id, '016x'),
+            }
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+_estado = {'servico': None, 'listener': None, 'handler': None}
+
+
+def _iniciar(servico: str):
+    fila = queue.Queue(maxsize=LOG_FILA_MAX)
+
+    saida = logging.StreamHandler(sys.stdout)
+    saida.setFormatter(JsonFormatter(servico))
+
+    handler = QueueHandlerNaoBloqueante(fila)
+    handler.addFilter(FiltroAmostragem())
+
+    listener = QueueListener(fila, saida, respect_handler_level=False)
+    listener.start()
+
+    logger = logging.getLogger(RAIZ)
+    if _estado['handler']:
+        logger.removeHandler(_estado['handler'])
+    logger.addHandler(handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+    _estado.update(servico=servico, listener=listener, handler=handler)
+
+
+def _reiniciar_apos_fork():
+    # A thread do listener não existe no processo filho (fork do RQ)
+    if _estado['servico']:
+        _iniciar(_estado['servico'])
+
+
+def configurar_logs(servico: str):
+    """
+    Liga o pipeline de logs estruturados do processo.
+
+    COMO FUNCIONA:
+    - Quem loga só coloca o registro numa fila (não bloqueia)
+    - Uma thread (QueueListener) formata em JSON e escreve no stdout
+    - LOG_LEVEL define o nível mínimo (padrão INFO)
+    - Texto de conversa é redigido, a não ser que LOG_CONTEUDO=1
+
+    Args:
+        servico (str): Nome do processo nos logs ('api', 'worker', ...)
+    """
+    if _estado['servico']:
+        return
+
+    _iniciar(servico)
+    os.register_at_fork(after_in_child=_reiniciar_apos_fork)
+
+
+def descarregar_logs():
+    """
+    Escreve tudo o que está na fila e reinicia o listener.
+
+    Chamado no fim de cada job: o processo filho do RQ sai com os._exit
+    e perderia os registros ainda na fila.
+    """
+    listener = _estado['listener']
+    if listener:
+        listener.stop()
+        listener.start()
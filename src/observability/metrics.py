@@ -0,0 +1,238 @@
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from src.observability.logs import get_logger
+
+logger = get_logger('metricas')
+
+# Buckets pensados para o fluxo: de ms (Redis/DB) até minutos (LLM/buffer)
+BUCKETS_RAPIDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+BUCKETS_LENTOS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120, 300)
+
+# ============================================================================
+# MÉTRICAS
+# ============================================================================
+
+webhook_latencia = Histogram(
+    'webhook_latencia_segundos',
+    'Tempo de resposta do /webhook',
+    ['status'],
+    buckets=BUCKETS_RAPIDOS,
+)
+
+webhook_descartados = Counter(
+    'webhook_descartados',
+    'Eventos do webhook ignorados antes de qualquer I/O',
+    ['motivo'],
+)
+
+admissao_decisoes = Counter(
+    'admissao_decisoes',
+    'Decisões do controle de admissão do webhook',
+    ['decisao'],
+)
+
+buffer_mensagens = Histogram(
+    'buffer_mensagens',
+    'Quantidade de mensagens agrupadas por flush do buffer',
+    buckets=(1, 2, 3, 5, 8, 13, 21),
+)
+
+buffer_espera = Histogram(
+    'buffer_espera_segundos',
+    'Tempo entre a primeira mensagem no buffer e o flush',
+    buckets=BUCKETS_LENTOS,
+)
+
+fila_espera = Histogram(
+    'fila_espera_segundos',
+    'Tempo entre o enfileiramento e o início do job, por fila',
+    ['fila'],
+    buckets=BUCKETS_LENTOS,
+)
+
+job_duracao = Histogram(
+    'job_duracao_segundos',
+    'Duração total do processar_agente no worker',
+    ['status'],
+    buckets=BUCKETS_LENTOS,
+)
+
+job_etapa = Histogram(
+    'job_etapa_segundos',
+    'Etapas do job no worker: preparo (fork até a função) e execução',
+    ['etapa'],
+    buckets=BUCKETS_RAPIDOS + BUCKETS_LENTOS[5:],
+)
+
+no_duracao = Histogram(
+    'grafo_no_duracao_segundos',
+    'Duração de cada nó do LangGraph',
+    ['no'],
+    buckets=BUCKETS_LENTOS,
+)
+
+llm_latencia = Histogram(
+    'llm_latencia_segundos',
+    'Latência de cada chamada ao LLM (inclui hedges)',
+    ['modelo', 'resultado'],
+    buckets=BUCKETS_LENTOS,
+)
+
+llm_tentativas = Counter(
+    'llm_tentativas',
+    'Desfecho de cada tentativa do roteador de modelos '
+    '(vencedora, perdedora, cancelada, erro)',
+    ['modelo', 'resultado'],
+)
+
+llm_tokens = Counter(
+    'llm_tokens',
+    'Tokens consumidos no LLM',
+    ['modelo', 'tipo'],
+)
+
+db_duracao = Histogram(
+    'db_consulta_duracao_segundos',
+    'Duração das operações no PostgreSQL',
+    ['operacao'],
+    buckets=BUCKETS_RAPIDOS,
+)
+
+midia_cache = Counter(
+    'midia_cache',
+    'Origem do payload de arquivos enviados (local, redis, disco, url)',
+    ['camada'],
+)
+
+evolution_duracao = Histogram(
+    'evolution_envio_duracao_segundos',
+    'Duração das chamadas à Evolution API',
+    ['endpoint', 'status'],
+    buckets=BUCKETS_LENTOS,
+)
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+
+@contextmanager
+def cronometrar(histograma, **labels):
+    """Mede o bloco e registra no histograma (com os labels informados)."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        alvo = histograma.labels(**labels) if labels else histograma
+        alvo.observe(time.perf_counter() - inicio)
+
+
+def medir_db(operacao: str):
+    """Decorator para medir métodos do PostgreSQL."""
+
+    def decorator(funcao):
+        @wraps(funcao)
+        def wrapper(*args, **kwargs):
+            with cronometrar(db_duracao, operacao=operacao):
+                return funcao(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def registrar_uso_llm(modelo: str, response):
+    """Registra os tokens de uma resposta do LLM (response_metadata)."""
+    metadata = getattr(response, 'response_metadata', None) or {}
+    uso = metadata.get('token_usage') or {}
+
+    for tipo in ('prompt_tokens', 'completion_tokens'):
+        if uso.get(tipo):
+            llm_tokens.labels(modelo=modelo, tipo=tipo).inc(uso[tipo])
+
+
+# ============================================================================
+# PROFUNDIDADE DAS FILAS (lida do Redis na hora do scrape)
+# ============================================================================
+
+
+class ColetorFilas:
+    """Collector que lê o tamanho das filas do RQ a cada scrape."""
+
+    def __init__(self):
+        self.filas = []
+
+    def collect(self):
+        gauge = GaugeMetricFamily(
+            'fila_profundidade',
+            'Jobs aguardando na fila do RQ',
+            labels=['fila'],
+        )
+        for fila in self.filas:
+            try:
+                gauge.add_metric([fila.name], fila.count)
+            except Exception:
+                logger.exception(
+                    'Falha ao ler tamanho da fila', extra={'fila': fila.name}
+                )
+        yield gauge
+
+
+coletor_filas = ColetorFilas()
+
+if not os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+    REGISTRY.register(coletor_filas)
+
+
+def registrar_fila(fila):
+    """Inclui uma fila do RQ na métrica fila_profundidade."""
+    coletor_filas.filas.append(fila)
+
+
+# ============================================================================
+# EXPOSIÇÃO
+# ============================================================================
+
+
+def _registry():
+    """
+    Registry usado no /metrics.
+
+    Com PROMETHEUS_MULTIPROC_DIR definido (worker do RQ, que faz fork a
+    cada job) as métricas de todos os processos são somadas a partir dos
+    arquivos no diretório.
+    """
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(coletor_filas)
+        return registry
+
+    return REGISTRY
+
+
+def gerar_metricas() -> tuple[bytes, str]:
+    """Retorna (conteúdo, content-type) no formato do Prometheus."""
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+
+def iniciar_servidor_metricas(porta: int):
+    """Sobe um servidor HTTP com /metrics (usado pelo worker)."""
+    start_http_server(porta, registry=_registry())
+    logger.info('Servidor de métricas iniciado', extra={'porta': porta})
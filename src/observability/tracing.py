@@ -0,0 +1,149 @@
+import os
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from dotenv import load_dotenv
+from opentelemetry import propagate, trace
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+    OTLPSpanExporter,
+)
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.trace import SpanKind
+
+from src.observability.logs import get_logger
+
+load_dotenv()
+
+logger = get_logger('tracing')
+
+# Arquivo local (JSON lines, um span por linha) e/ou coletor OTLP/HTTP
+TRACE_ARQUIVO = os.getenv('TRACE_ARQUIVO')
+OTLP_ENDPOINT = os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT')
+
+tracer = trace.get_tracer('projeto_base')
+
+
+class ArquivoSpanExporter(SpanExporter):
+    """
+    Exporter que grava cada span como uma linha JSON num arquivo local.
+
+    Usa o mesmo formato do `ReadableSpan.to_json()` do OpenTelemetry
+    (trace_id, span_id, parent_id, atributos, início/fim), então o arquivo
+    pode ser lido por qualquer ferramenta que entenda esse formato.
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+
+    def export(self, spans) -> SpanExportResult:
+        linhas = ''.join(span.to_json(indent=None) + '\n' for span in spans)
+
+        with self._lock, open(self.caminho, 'a', encoding='utf-8') as f:
+            f.write(linhas)
+
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+
+def configurar_tracing(servico: str):
+    """
+    Configura o provider do OpenTelemetry para o processo.
+
+    Sem TRACE_ARQUIVO nem OTEL_EXPORTER_OTLP_ENDPOINT o tracing fica
+    desligado (spans no-op, custo praticamente zero).
+
+    Args:
+        servico (str): Nome do serviço nos spans ('api', 'worker', ...)
+    """
+    exporters = []
+
+    if TRACE_ARQUIVO:
+        exporters.append(ArquivoSpanExporter(TRACE_ARQUIVO))
+
+    if OTLP_ENDPOINT:
+        exporters.append(OTLPSpanExporter())
+
+    if not exporters:
+        return
+
+    provider = TracerProvider(
+        resource=Resource.create({
+            'service.name': os.getenv('OTEL_SERVICE_NAME', servico)
+        })
+    )
+    for exporter in exporters:
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+
+    trace.set_tracer_provider(provider)
+    logger.info('Tracing ativo', extra={'servico': servico})
+
+
+def forcar_envio():
+    """
+    Envia os spans pendentes.
+
+    Necessário no fim de cada job: o RQ roda o job num processo filho que
+    sai com os._exit, sem dar tempo do BatchSpanProcessor exportar.
+    """
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, 'force_flush'):
+        provider.force_flush()
+
+
+# ============================================================================
+# PROPAGAÇÃO (W3C traceparent) ENTRE WEBHOOK, BUFFER, RQ E WORKER
+# ============================================================================
+
+
+def injetar_contexto() -> dict:
+    """Serializa o contexto atual (traceparent) num dict."""
+    carrier = {}
+    propagate.inject(carrier)
+    return carrier
+
+
+def extrair_contexto(carrier: dict | None):
+    """Reconstrói o contexto a partir do dict salvo no Redis/job."""
+    return propagate.extract(carrier or {})
+
+
+@contextmanager
+def span(nome: str, kind=SpanKind.INTERNAL, contexto=None, **atributos):
+    """
+    Abre um span filho do contexto atual (ou de `contexto`).
+
+    Exceções marcam o span com erro e são relançadas.
+    """
+    with tracer.start_as_current_span(
+        nome,
+        context=contexto,
+        kind=kind,
+        attributes={k: v for k, v in atributos.items() if v is not None},
+        record_exception=True,
+        set_status_on_exception=True,
+    ) as atual:
+        yield atual
+
+
+def rastrear_no(nome: str):
+    """Decorator que envolve um nó do grafo num span `no.<nome>`."""
+
+    def decorator(funcao):
+        @wraps(funcao)
+        def wrapper(*args, **kwargs):
+            with span(f'no.{nome}', no=nome):
+                return funcao(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,248 @@
+"""
+Registro de prompts: cache por versão e recarga sem reiniciar o worker.
+
+COMO FUNCIONA:
+- A versão de um prompt é o hash do texto (12 primeiros hex do sha1)
+- A versão ativa publicada no Redis (prompts:<nome>:ativa) tem
+  prioridade; sem publicação, vale o arquivo src/prompts/<nome>.txt
+- obter() confere se algo mudou no máximo a cada RECARGA_SEGUNDOS: um
+  GET no Redis e um stat no arquivo. O texto só é relido quando a
+  versão muda, e cada versão é montada uma vez só (fica no cache, o que
+  deixa o rollback instantâneo)
+- Redis fora do ar: segue com a última versão conhecida (ou o disco)
+- No worker (um fork por job) o cache do filho morre com ele: quem
+  confere é o processo pai, antes de cada fork (tasks.renovar_prompt)
+- montar() põe o conteúdo fixo primeiro e as variáveis da conversa no
+  fim: todas as chamadas começam com o mesmo prefixo, que o provedor
+  consegue reaproveitar (prefix caching)
+
+COMO USAR:
+    python -m src.prompts.registro publicar prompt_01 novo.txt
+    python -m src.prompts.registro ativar prompt_01 <versao>   # rollback
+    python -m src.prompts.registro despublicar prompt_01     # volta ao .txt
+    python -m src.prompts.registro status prompt_01
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from dotenv import load_dotenv
+from redis.exceptions import RedisError
+
+from src.observability.logs import get_logger
+from src.redis.client_redis import redis_client
+
+load_dotenv()
+
+logger = get_logger('prompts')
+
+DIRETORIO = Path(__file__).parent
+
+RECARGA_SEGUNDOS = float(os.getenv('PROMPT_RECARGA_SEGUNDOS', '5'))
+
+CHAVE_ATIVA = 'prompts:{nome}:ativa'
+CHAVE_VERSOES = 'prompts:{nome}:versoes'
+
+# Separa o conteúdo fixo das variáveis da conversa
+CABECALHO_VARIAVEIS = '\n\n## Dados desta conversa\n'
+
+
+def versao_do_texto(texto: str) -> str:
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()[:12]
+
+
+@dataclass(frozen=True)
+class Prompt:
+    nome: str
+    versao: str
+    origem: str
+    prefixo: str
+
+    def montar(self, variaveis: dict[str, str]) -> str:
+        """Prefixo fixo + variáveis (uma por linha, sempre no fim)."""
+        linhas = [f'- {chave}: {valor}' for chave, valor in variaveis.items()]
+        return self.prefixo + '\n'.join(linhas)
+
+
+class RegistroPrompts:
+    def __init__(
+        self,
+        diretorio: Path = DIRETORIO,
+        client=redis_client,
+        recarga: float = RECARGA_SEGUNDOS,
+    ):
+        self.diretorio = diretorio
+        self.client = client
+        self.recarga = recarga
+        self._compilados: dict[tuple[str, str, str], Prompt] = {}
+        self._atuais: dict[str, Prompt] = {}
+        self._conferido: dict[str, float] = {}
+        self._assinaturas: dict[str, tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def obter(self, nome: str) -> Prompt:
+        """Versão atual do prompt (recarrega se mudou)."""
+        agora = time.monotonic()
+        atual = self._atuais.get(nome)
+        if atual and agora - self._conferido.get(nome, 0) < self.recarga:
+            return atual
+
+        with self._lock:
+            novo = self._carregar(nome, self._atuais.get(nome))
+            self._conferido[nome] = agora
+
+            if novo is not atual:
+                self._atuais[nome] = novo
+                logger.info(
+                    'Prompt carregado',
+                    extra={
+                        'prompt': nome,
+                        'versao': novo.versao,
+                        'origem': novo.origem,
+                        'anterior': atual.versao if atual else None,
+                    },
+                )
+            return novo
+
+    def _carregar(self, nome: str, atual: Prompt | None) -> Prompt:
+        try:
+            versao = self.client.get(CHAVE_ATIVA.format(nome=nome))
+            if versao:
+                return self._do_redis(nome, versao, atual)
+        except RedisError:
+            if atual:
+                return atual
+            logger.warning(
+                'Redis indisponível, prompt lido do disco',
+                extra={'prompt': nome},
+            )
+
+        return self._do_disco(nome, atual)
+
+    def _do_redis(self, nome: str, versao: str, atual: Prompt | None):
+        if atual and (atual.versao, atual.origem) == (versao, 'redis'):
+            return atual
+
+        compilado = self._compilados.get((nome, versao, 'redis'))
+        if compilado:
+            return compilado
+
+        texto = self.client.hget(CHAVE_VERSOES.format(nome=nome), versao)
+        if texto is None:
+            logger.error(
+                'Versão ativa não existe no Redis, usando o disco',
+                extra={'prompt': nome, 'versao': versao},
+            )
+            return self._do_disco(nome, atual)
+
+        return self._compilar(nome, texto, 'redis')
+
+    def _do_disco(self, nome: str, atual: Prompt | None) -> Prompt:
+        caminho = self.diretorio / f'{nome}.txt'
+        if not caminho.exists():
+            raise FileNotFoundError(
+                f"Prompt '{nome}.txt' não encontrado em {self.diretorio}"
+            )
+
+        estado = caminho.stat()
+        assinatura = (estado.st_size, estado.st_mtime_ns)
+        if (
+            atual
+            and atual.origem == 'disco'
+            and self._assinaturas.get(nome) == assinatura
+        ):
+            return atual
+
+        self._assinaturas[nome] = assinatura
+        return self._compilar(
+            nome, caminho.read_text(encoding='utf-8'), 'disco'
+        )
+
+    def _compilar(self, nome: str, texto: str, origem: str) -> Prompt:
+        chave = (nome, versao_do_texto(texto), origem)
+        if chave not in self._compilados:
+            self._compilados[chave] = Prompt(
+                nome=nome,
+                versao=chave[1],
+                origem=origem,
+                prefixo=texto.rstrip() + CABECALHO_VARIAVEIS,
+            )
+        return self._compilados[chave]
+
+
+registro = RegistroPrompts()
+
+
+# ============================================================================
+# PUBLICAÇÃO (linha de comando)
+# ============================================================================
+
+
+def publicar(nome: str, texto: str, client=redis_client) -> str:
+    """Guarda o texto como nova versão e a ativa."""
+    versao = versao_do_texto(texto)
+    with client.pipeline() as pipe:
+        pipe.hset(CHAVE_VERSOES.format(nome=nome), versao, texto)
+        pipe.set(CHAVE_ATIVA.format(nome=nome), versao)
+        pipe.execute()
+    return versao
+
+
+def ativar(nome: str, versao: str, client=redis_client):
+    """Ativa uma versão já publicada (rollback)."""
+    if not client.hexists(CHAVE_VERSOES.format(nome=nome), versao):
+        raise ValueError(f'Versão {versao} de {nome} nunca foi publicada')
+    client.set(CHAVE_ATIVA.format(nome=nome), versao)
+
+
+def despublicar(nome: str, client=redis_client):
+    """Volta a usar o arquivo (as versões publicadas continuam guardadas)."""
+    client.delete(CHAVE_ATIVA.format(nome=nome))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument(
+        'comando', choices=['publicar', 'ativar', 'despublicar', 'status']
+    )
+    parser.add_argument('nome')
+    parser.add_argument(
+        'valor', nargs='?', help='publicar: arquivo; ativar: versão'
+    )
+    args = parser.parse_args()
+
+    if args.comando == 'publicar':
+        caminho = Path(args.valor or DIRETORIO / f'{args.nome}.txt')
+        versao = publicar(args.nome, caminho.read_text(encoding='utf-8'))
+        print(f'{args.nome} publicado na versão {versao}')
+    elif args.comando == 'ativar':
+        ativar(args.nome, args.valor)
+        print(f'{args.nome} ativo na versão {args.valor}')
+    elif args.comando == 'despublicar':
+        despublicar(args.nome)
+        print(f'{args.nome} voltou a ser lido do disco')
+
+    print(
+        json.dumps(
+            {
+                'ativa': redis_client.get(CHAVE_ATIVA.format(nome=args.nome)),
+                'versoes': redis_client.hkeys(
+                    CHAVE_VERSOES.format(nome=args.nome)
+                ),
+                'disco': versao_do_texto(
+                    (DIRETORIO / f'{args.nome}.txt').read_text('utf-8')
+                ),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+
+from dotenv import load_dotenv
+from redis.exceptions import RedisError
+from rq.utils import utcparse
+
+from src.evolution.client import EvolutionAPI
+from src.observability.logs import get_logger
+from src.observability.metrics import admissao_decisoes
+from src.redis.client_redis import redis_client
+from src.redis.rq import filas as filas_agente
+
+load_dotenv()
+
+logger = get_logger('admissao')
+
+# Limites de pressão: profundidade da fila (jobs) e atraso do worker
+# (idade do job mais antigo ainda na fila, em segundos)
+FILA_ELEVADA = int(os.getenv('ADMISSAO_FILA_ELEVADA', '50'))
+FILA_CRITICA = int(os.getenv('ADMISSAO_FILA_CRITICA', '200'))
+LAG_ELEVADO = float(os.getenv('ADMISSAO_LAG_ELEVADO', '30'))
+LAG_CRITICO = float(os.getenv('ADMISSAO_LAG_CRITICO', '120'))
+
+# Sob pressão a janela do debounce ganha um piso (segundos): mais
+# mensagens por job, menos jobs. No normal vale o debounce adaptativo
+DEBOUNCE = {
+    'normal': 0,
+    'elevado': int(os.getenv('ADMISSAO_DEBOUNCE_ELEVADO', '20')),
+    'critico': int(os.getenv('ADMISSAO_DEBOUNCE_CRITICO', '40')),
+}
+
+# O estado é lido do Redis no máximo uma vez por INTERVALO por processo
+INTERVALO = float(os.getenv('ADMISSAO_INTERVALO', '1'))
+
+# Aviso de "estamos ocupados": no máximo um por número a cada intervalo
+AVISO_INTERVALO = int(os.getenv('ADMISSAO_AVISO_INTERVALO', '600'))
+MENSAGEM_OCUPADO = os.getenv(
+    'ADMISSAO_MENSAGEM_OCUPADO',
+    'Recebemos sua mensagem! Estamos com muitas conversas agora, '
+    'então a resposta pode demorar um pouco',
+)
+
+
+@dataclass
+class EstadoAdmissao:
+    nivel: str = 'normal'
+    fila: int = 0
+    lag_segundos: float = 0.0
+    debounce: int = 0
+    atualizado_em: float = 0.0
+
+
+class ControleAdmissao:
+    """
+    Controle de admissão do webhook, baseado na pressão sobre os workers.
+
+    COMO FUNCIONA:
+    - Lê a profundidade das filas do RQ e a idade do job mais antigo
+      (cache local de INTERVALO segundos: não custa I/O por mensagem)
+    - Classifica em normal / elevado / critico pelos limites configurados
+    - elevado: dá um piso à janela do debounce (agrupa mais mensagens)
+    - critico: debounce ainda maior e um aviso barato de "estamos
+      ocupados" para o usuário (um por número a cada AVISO_INTERVALO)
+    - Números abusivos (acima do limite por janela) são descartados no
+      próprio script do buffer (ver src/redis/buffer.py)
+
+    Se o Redis falhar na leitura, mantém o último estado conhecido.
+    """
+
+    def __init__(self, filas=None, client=redis_client):
+        self.filas = filas or tuple(filas_agente.values())
+        self.client = client
+        self.estado = EstadoAdmissao()
+        self.decisoes = Counter()
+        self._lock = threading.Lock()
+
+    def _medir(self) -> tuple[int, float]:
+        """Soma das filas e o maior atraso entre elas."""
+        pipe = self.client.pipeline(transaction=False)
+        for fila in self.filas:
+            pipe.llen(fila.key)
+            pipe.lindex(fila.key, 0)
+        respostas = pipe.execute()
+
+        tamanho = sum(respostas[::2])
+        mais_antigos = [job_id for job_id in respostas[1::2] if job_id]
+
+        lag = 0.0
+        if mais_antigos:
+            pipe = self.client.pipeline(transaction=False)
+            for job_id in mais_antigos:
+                pipe.hget(f'rq:job:{job_id}', 'enqueued_at')
+            agora = time.time()
+            for enfileirado in pipe.execute():
+                if enfileirado:
+                    lag = max(lag, agora - utcparse(enfileirado).timestamp())
+
+        return tamanho, max(lag, 0.0)
+
+    def atualizar(self, forcar: bool = False) -> EstadoAdmissao:
+        """Relê a fila do Redis se o estado em cache estiver vencido."""
+        agora = time.time()
+        if not forcar and agora - self.estado.atualizado_em < INTERVALO:
+            return self.estado
+
+        with self._lock:
+            if not forcar and agora - self.estado.atualizado_em < INTERVALO:
+                return self.estado
+
+            try:
+                tamanho, lag = self._medir()
+            except RedisError:
+                logger.exception('Falha ao medir a fila')
+                self.estado.atualizado_em = agora
+                return self.estado
+
+            if tamanho >= FILA_CRITICA or lag >= LAG_CRITICO:
+                nivel = 'critico'
+            elif tamanho >= FILA_ELEVADA or lag >= LAG_ELEVADO:
+                nivel = 'elevado'
+            else:
+                nivel = 'normal'
+
+            if nivel != self.estado.nivel:
+                logger.warning(
+                    'Nível de admissão mudou',
+                    extra={
+                        'de': self.estado.nivel,
+                        'para': nivel,
+                        'fila': tamanho,
+                        'lag_segundos': round(lag, 1),
+                    },
+                )
+
+            self.estado = EstadoAdmissao(
+                nivel=nivel,
+                fila=tamanho,
+                lag_segundos=round(lag, 1),
+                debounce=DEBOUNCE[nivel],
+                atualizado_em=agora,
+            )
+            return self.estado
+
+    def registrar(self, decisao: str):
+        """Conta uma decisão (aparece no /health e no /metrics)."""
+        self.decisoes[decisao] += 1
+        admissao_decisoes.labels(decisao=decisao).inc()
+
+    def avisar_ocupado(self, numero: str):
+        """
+        Envia o aviso de "estamos ocupados", no máximo um por número a
+        cada AVISO_INTERVALO. Roda fora do request (BackgroundTask).
+        """
+        try:
+            primeiro = self.client.set(
+                f'admissao:aviso:{numero}', 1, nx=True, ex=AVISO_INTERVALO
+            )
+            if not primeiro:
+                return
+
+            EvolutionAPI().sender_text(numero, MENSAGEM_OCUPADO)
+            self.registrar('aviso_ocupado')
+        except Exception:
+            logger.exception(
+                'Falha ao enviar aviso de ocupado', extra={'numero': numero}
+            )
+
+    def resumo(self) -> dict:
+        """Estado atual e contagem de decisões (para o /health)."""
+        return {
+            **asdict(self.atualizar()),
+            'limites': {
+                'fila_elevada': FILA_ELEVADA,
+                'fila_critica': FILA_CRITICA,
+                'lag_elevado': LAG_ELEVADO,
+                'lag_critico': LAG_CRITICO,
+            },
+            'decisoes': dict(self.decisoes),
+        }
+
+
+controle_admissao = ControleAdmissao()
@@ -1,56 +1,434 @@
 import asyncio
 import json
+import os
+import time
 from typing import Awaitable, Callable
 
 from dotenv import load_dotenv
 
+from src.observability.logs import get_logger
+from src.observability.metrics import buffer_espera, buffer_mensagens
+from src.observability.tracing import extrair_contexto, injetar_contexto, span
 from src.redis.client_redis import redis_client
 
 load_dotenv()
 
 # --- Configurações ---
 redis_client = redis_client
+logger = get_logger('buffer')
+
+# --- Debounce adaptativo (segundos) ---
+# Janela da primeira mensagem de um número sem histórico de cadência
+JANELA_INICIAL = float(os.getenv('BUFFER_JANELA_INICIAL', '3'))
+# Janela quando o texto parece uma mensagem completa (flush antecipado)
+JANELA_COMPLETA = float(os.getenv('BUFFER_JANELA_COMPLETA', '1'))
+# Maior janela dada a uma mensagem (o antigo timeout fixo)
+BUFFER_TIMEOUT = float(os.getenv('BUFFER_TIMEOUT', '10'))
+# Teto absoluto desde a primeira mensagem do buffer (usuário que não para)
+ESPERA_MAXIMA = float(os.getenv('BUFFER_ESPERA_MAXIMA', '30'))
+# Janela = intervalo médio do usuário (EWMA) x FATOR_CADENCIA
+FATOR_CADENCIA = float(os.getenv('BUFFER_FATOR_CADENCIA', '1.5'))
+ALFA_CADENCIA = 0.3
+CADENCIA_TTL = 7 * 86400
+
+# Por quanto tempo um data.key.id já recebido é lembrado
+DEDUP_TTL = int(os.getenv('DEDUP_TTL', '86400'))  # segundos
+# Acima de LIMITE_NUMERO mensagens em JANELA_NUMERO segundos, o número é
+# tratado como abusivo e as mensagens seguintes são descartadas
+LIMITE_NUMERO = int(os.getenv('ADMISSAO_LIMITE_NUMERO', '30'))
+JANELA_NUMERO = int(os.getenv('ADMISSAO_JANELA_NUMERO', '60'))  # segundos
+
+# Buffer das versões anteriores (lista JSON numa string). Ainda é lido e
+# apagado no flush para os buffers abertos durante o deploy não se
+# perderem; pode sair na próxima versão
+CHAVE_BUFFER_ANTIGA = 'buffer:content:{numero}'
+
+# Motivos de recusa devolvidos pelo script
+RECUSAS = {-1: 'duplicada', -2: 'excesso'}
+
+# Saudações e respostas curtas: quase sempre vem mais coisa depois
+_SEM_CONTEUDO = {
+    'oi',
+    'ola',
+    'olá',
+    'opa',
+    'bom dia',
+    'boa tarde',
+    'boa noite',
+    'tudo bem',
+    'ok',
+    'sim',
+    'nao',
+    'não',
+}
+_MINIMO_PALAVRAS = 3
+
+
+def parece_completa(texto: str | None) -> bool:
+    """
+    Heurística barata: o texto parece uma mensagem terminada?
+
+    Termina com pontuação final (? ! .) e tem pelo menos algumas palavras,
+    sem ser só uma saudação. Nesses casos o buffer fecha mais cedo.
+    """
+    if not texto:
+        return False
+
+    texto = texto.strip()
+    if not texto.endswith(('?', '!', '.')):
+        return False
+
+    if texto.rstrip('?!. ').lower() in _SEM_CONTEUDO:
+        return False
+
+    return texto.endswith('?') or len(texto.split()) >= _MINIMO_PALAVRAS
+
+
+# ============================================================================
+# SCRIPT LUA (deduplicação + limite por número + append numa ida ao Redis)
+# ============================================================================
+
+# 1. Se a mensagem tem ID e ele já foi visto (reentrega da Evolution), só
+#    o SET NX é executado: retorna -1
+# 2. Conta a mensagem na janela do número: acima do limite retorna -2
+# 3. Sem chave de mensagens (só reivindicar), retorna 0
+# 4. Atualiza a cadência do usuário (EWMA do intervalo entre mensagens),
+#    anexa a mensagem, calcula a janela do debounce e reinicia o timer
+#    (ou o prazo no ZSET de prazos, na ingestão por streams).
+#    Retorna {tamanho do buffer, janela em ms}
+# Chaves vazias ('') pulam a etapa correspondente.
+#
+# Janela: JANELA_COMPLETA se o texto parece completo; senão a cadência do
+# usuário x FATOR (entre JANELA_INICIAL e BUFFER_TIMEOUT), nunca abaixo do
+# piso do controle de admissão. O buffer inteiro nunca passa do teto
+# contado da primeira mensagem: ESPERA_MAXIMA, ou o piso se ele for maior
+# (sob carga crítica o piso padrão, 40 s, passa dos 30 s do teto).
+ENTRADA_LUA = """
+local chave_dedup = KEYS[1]
+local chave_contador = KEYS[2]
+local chave_mensagens = KEYS[3]
+local chave_gatilho = KEYS[4]
+local chave_meta = KEYS[5]
+local chave_cadencia = KEYS[6]
+local chave_prazos = KEYS[7]
+
+if chave_dedup ~= '' then
+    if not redis.call('SET', chave_dedup, 1, 'NX', 'EX', ARGV[5]) then
+        return -1
+    end
+end
+
+if chave_contador ~= '' then
+    local recebidas = redis.call('INCR', chave_contador)
+    if recebidas == 1 then
+        redis.call('EXPIRE', chave_contador, ARGV[7])
+    end
+    if recebidas > tonumber(ARGV[6]) then
+        return -2
+    end
+end
+
+if chave_mensagens == '' then
+    return 0
+end
+
+local agora = tonumber(ARGV[2]) * 1000
+local piso = tonumber(ARGV[4])
+local completa = ARGV[8] == '1'
+local janela_inicial = tonumber(ARGV[9])
+local janela_completa = tonumber(ARGV[10])
+local janela_maxima = tonumber(ARGV[11])
+local espera_maxima = tonumber(ARGV[12])
+local fator = tonumber(ARGV[13])
+local alfa = tonumber(ARGV[14])
+
+-- Cadência: só intervalos de quem ainda está digitando entram na média
+local cadencia = redis.call('HMGET', chave_cadencia, 'ewma', 'ultima')
+local ewma = tonumber(cadencia[1])
+local ultima = tonumber(cadencia[2])
+if ultima then
+    local intervalo = agora - ultima
+    if intervalo > 0 and intervalo <= janela_maxima then
+        if ewma then
+            ewma = alfa * intervalo + (1 - alfa) * ewma
+        else
+            ewma = intervalo
+        end
+    end
+end
+redis.call('HSET', chave_cadencia, 'ultima', tostring(agora))
+if ewma then
+    redis.call('HSET', chave_cadencia, 'ewma', tostring(ewma))
+end
+redis.call('EXPIRE', chave_cadencia, ARGV[15])
+
+redis.call('HSETNX', chave_meta, 'inicio', ARGV[2])
+redis.call('HSETNX', chave_meta, 'trace', ARGV[3])
+local inicio = tonumber(redis.call('HGET', chave_meta, 'inicio')) * 1000
+local total = redis.call('RPUSH', chave_mensagens, ARGV[1])
+
+local janela
+if completa then
+    janela = janela_completa
+elseif ewma then
+    janela = math.min(janela_maxima, math.max(janela_inicial, ewma * fator))
+else
+    janela = janela_inicial
+end
+-- O piso do controle de admissão vale mesmo acima do teto, mas o teto
+-- continua limitando o buffer inteiro (sobe até o piso sob carga)
+local teto = math.max(espera_maxima, piso)
+janela = math.max(janela, piso)
+janela = math.min(janela, inicio + teto - agora)
+janela = math.floor(math.max(janela, 100))
+
+if chave_prazos ~= '' then
+    -- Ingestão por streams: o prazo vai num ZSET em vez de uma chave com TTL
+    redis.call('ZADD', chave_prazos, agora + janela, ARGV[16])
+else
+    redis.call('PSETEX', chave_gatilho, janela, 1)
+end
+return {total, janela}
+"""
+
+_entrada = redis_client.register_script(ENTRADA_LUA)
+
+
+def _chave_dedup(id_mensagem: str) -> str:
+    return f'webhook:msg:{id_mensagem}'
+
+
+def _executar_entrada(  # noqa: PLR0913
+    numero: str,
+    id_mensagem: str | None,
+    *,
+    contar: bool,
+    mensagem: str | None = None,
+    janela_minima: float = 0,
+    chave_prazos: str = '',
+):
+    anexar = mensagem is not None
+    return _entrada(
+        keys=[
+            _chave_dedup(id_mensagem) if id_mensagem else '',
+            f'admissao:numero:{numero}' if contar else '',
+            f'buffer:mensagens:{numero}' if anexar else '',
+            f'buffer:trigger:{numero}',
+            f'buffer:meta:{numero}',
+            f'buffer:cadencia:{numero}',
+            chave_prazos,
+        ],
+        # Início (métrica de espera e teto da janela) e contexto de trace
+        # (liga o flush ao webhook que abriu o buffer) só valem na
+        # primeira mensagem
+        args=[
+            json.dumps(mensagem),
+            time.time(),
+            json.dumps(injetar_contexto()) if anexar else '{}',
+            int(janela_minima * 1000),
+            DEDUP_TTL,
+            LIMITE_NUMERO,
+            JANELA_NUMERO,
+            int(parece_completa(mensagem)),
+            int(JANELA_INICIAL * 1000),
+            int(JANELA_COMPLETA * 1000),
+            int(BUFFER_TIMEOUT * 1000),
+            int(ESPERA_MAXIMA * 1000),
+            FATOR_CADENCIA,
+            ALFA_CADENCIA,
+            CADENCIA_TTL,
+            numero,
+        ],
+    )
+
 
-BUFFER_TIMEOUT = 10  # segundos
+def _recusa(numero: str, id_mensagem: str | None, codigo: int) -> str | None:
+    motivo = RECUSAS.get(codigo)
+    if motivo:
+        logger.info(
+            'Mensagem recusada',
+            extra={
+                'numero': numero,
+                'id_mensagem': id_mensagem,
+                'motivo': motivo,
+            },
+        )
+    return motivo
 
 
-def adicionar_ao_buffer(numero: str, nova_mensagem: str):
+def reivindicar_mensagem(numero: str, id_mensagem: str | None) -> str | None:
     """
-    Adiciona uma mensagem ao buffer de um número específico.
-    Reinicia o timer de timeout a cada nova mensagem.
+    Faz a deduplicação e o limite por número sem anexar nada ao buffer.
 
-    COMO FUNCIONA:
-    - Pega todas as mensagens já armazenadas para esse número
-    - Adiciona a nova mensagem à lista
-    - Salva tudo de volta no Redis
-    - Reinicia o timer de 10 segundos (setex = set with expiration)
+    Usado antes de trabalho caro fora do Redis (ex: transcrição de áudio):
+    só a primeira entrega de cada ID, de um número dentro do limite, segue
+    adiante. Depois chame adicionar_ao_buffer(..., reivindicada=True).
+
+    Returns:
+        str | None: Motivo da recusa ('duplicada', 'excesso') ou None
+    """
+    codigo = _executar_entrada(numero, id_mensagem, contar=True)
+    return _recusa(numero, id_mensagem, codigo)
+
+
+def liberar_mensagem(id_mensagem: str | None):
+    """Desfaz o reivindicar_mensagem (o processamento falhou)."""
+    if id_mensagem:
+        redis_client.delete(_chave_dedup(id_mensagem))
+
+
+def adicionar_ao_buffer(
+    numero: str,
+    nova_mensagem: str,
+    id_mensagem: str | None = None,
+    janela_minima: float = 0,
+    reivindicada: bool = False,
+) -> str | None:
+    """
+    Adiciona uma mensagem ao buffer de um número específico.
+    Reinicia o timer com uma janela adaptada ao usuário.
+
+    COMO FUNCIONA (um único script Lua, uma ida ao Redis):
+    - Se `id_mensagem` já foi visto, é reentrega: não faz mais nada
+    - Se o número passou do limite de mensagens na janela, descarta
+    - Senão anexa a mensagem à lista do número (RPUSH)
+    - Reinicia o timer (debounce adaptativo):
+      - texto que parece completo: JANELA_COMPLETA (flush antecipado)
+      - senão: intervalo médio entre as mensagens do usuário x fator,
+        ou JANELA_INICIAL para quem ainda não tem histórico
+      - nunca além de ESPERA_MAXIMA (ou do piso, se maior) desde a
+        primeira mensagem do buffer
 
     Args:
         numero (str): ID do usuário (número de telefone)
         nova_mensagem (str): A mensagem a ser adicionada
+        id_mensagem (str | None): `data.key.id` da Evolution
+        janela_minima (float): Piso da janela em segundos (o controle de
+            admissão aumenta sob carga para agrupar mais mensagens)
+        reivindicada (bool): A deduplicação e o limite já foram feitos
+            com reivindicar_mensagem
+
+    Returns:
+        str | None: Motivo da recusa ('duplicada', 'excesso') ou None
+    """
+    resultado = _executar_entrada(
+        numero,
+        None if reivindicada else id_mensagem,
+        contar=not reivindicada,
+        mensagem=nova_mensagem,
+        janela_minima=janela_minima,
+    )
+
+    if not isinstance(resultado, list):
+        return _recusa(numero, id_mensagem, resultado)
+
+    total, janela = resultado
+    logger.debug(
+        'Timer resetado',
+        extra={
+            'numero': numero,
+            'mensagens': total,
+            'janela_ms': janela,
+            'amostra': 0.1,
+        },
+    )
+    return None
+
+
+def aplicar_evento(
+    numero: str,
+    mensagem: str,
+    id_evento: str,
+    janela_minima: float,
+    chave_prazos: str,
+) -> bool:
     """
-    chave_conteudo = f'buffer:content:{numero}'
-    chave_gatilho = f'buffer:trigger:{numero}'
+    Anexa ao buffer um evento lido da stream de ingestão.
 
-    # Recupera as mensagens já armazenadas
-    # Se não existir, começa com lista vazia
-    mensagens_json = redis_client.get(chave_conteudo)
-    mensagens = json.loads(mensagens_json) if mensagens_json else []
+    Igual ao adicionar_ao_buffer, mas:
+    - a deduplicação é pelo ID da entrada na stream (reprocessar uma
+      entrada reclamada de um consumidor que caiu não duplica a mensagem)
+    - o limite por número já foi aplicado no webhook
+    - o prazo do flush vai no ZSET `chave_prazos`, não numa chave com TTL
 
-    # Adiciona a nova mensagem
-    mensagens.append(nova_mensagem)
+    Returns:
+        bool: False se a entrada já tinha sido aplicada
+    """
+    resultado = _executar_entrada(
+        numero,
+        id_evento,
+        contar=False,
+        mensagem=mensagem,
+        janela_minima=janela_minima,
+        chave_prazos=chave_prazos,
+    )
+    return isinstance(resultado, list)
 
-    # Salva as mensagens atualizadas
-    redis_client.set(chave_conteudo, json.dumps(mensagens))
 
-    # Reinicia o timer: a chave vai expirar em 10 segundos
-    # O valor "1" é irrelevante, importante é que a chave expira
-    redis_client.setex(chave_gatilho, BUFFER_TIMEOUT, 1)
+async def descarregar_buffer(
+    numero: str,
+    callback: Callable[[str, str], Awaitable[None]],
+) -> bool:
+    """
+    Junta as mensagens do buffer de um número e chama o callback.
 
-    print(
-        f'⏱️ Timer resetado para {numero} ({len(mensagens)} mensagens no buffer)'
+    É o que o ouvinte faz quando o timer de um número expira:
+    - Pega e apaga as mensagens agrupadas numa transação (MULTI), então
+      uma mensagem que chega durante o flush abre um buffer novo em vez
+      de ser apagada junto (inclui o buffer antigo, buffer:content)
+    - Concatena com espaço
+    - Chama a função callback (que enfileira o agente)
+
+    Returns:
+        bool: True se havia mensagens no buffer
+    """
+    chave_mensagens = f'buffer:mensagens:{numero}'
+    chave_meta = f'buffer:meta:{numero}'
+    chave_antiga = CHAVE_BUFFER_ANTIGA.format(numero=numero)
+
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.lrange(chave_mensagens, 0, -1)
+    pipe.hgetall(chave_meta)
+    pipe.get(chave_antiga)
+    pipe.delete(chave_mensagens, chave_meta, chave_antiga)
+    mensagens_json, meta, antigas_json, _ = pipe.execute()
+
+    # Mensagens do buffer antigo vêm antes: chegaram primeiro
+    mensagens_lista = json.loads(antigas_json) if antigas_json else []
+    mensagens_lista += [json.loads(m) for m in mensagens_json]
+
+    if not mensagens_lista:
+        return False
+
+    # Concatena todas as mensagens com espaço
+    # filter(None, ...) remove strings vazias
+    texto_final = ' '.join(filter(None, map(str, mensagens_lista)))
+
+    logger.info(
+        'Timer expirou',
+        extra={
+            'numero': numero,
+            'mensagens': len(mensagens_lista),
+            'texto': texto_final,
+        },
     )
 
+    buffer_mensagens.observe(len(mensagens_lista))
+    if meta.get('inicio'):
+        espera = time.time() - float(meta['inicio'])
+        buffer_espera.observe(espera)
+
+    # Continua o trace do webhook que abriu o buffer
+    with span(
+        'buffer.flush',
+        contexto=extrair_contexto(json.loads(meta.get('trace', '{}'))),
+        mensagens=len(mensagens_lista),
+    ):
+        # Chama a função que invoca o agente
+        await callback(numero, texto_final)
+
+    return True
+
 
 async def ouvinte_de_expiracao(
     callback: Callable[[str, str], Awaitable[None]],
@@ -64,10 +442,7 @@ async def ouvinte_de_expiracao(
     2. Entra em loop infinito aguardando eventos
     3. Quando recebe um evento de uma chave buffer:trigger:
        - Extrai o número do usuário
-       - Pega as mensagens agrupadas do Redis
-       - Concatena com espaço
-       - Chama a função callback (que invoca o agente)
-       - Deleta as mensagens do Redis
+       - Chama descarregar_buffer (junta as mensagens e chama o callback)
 
     IMPORTANTE: Você precisa habilitar no Redis com:
     redis-cli CONFIG SET notify-keyspace-events Ex
@@ -76,7 +451,7 @@ async def ouvinte_de_expiracao(
         callback: Função assíncrona que será chamada quando o timer expirar
                   Recebe (numero: str, texto_final: str)
     """
-    print('🚀 Ouvinte de expiração iniciado...')
+    logger.info('Ouvinte de expiração iniciado')
 
     # Se conecta ao Pub/Sub do Redis
     pubsub = redis_client.pubsub()
@@ -95,39 +470,13 @@ async def ouvinte_de_expiracao(
                 # Extrai o número da chave que expirou
                 # Exemplo: "buffer:trigger:5585987654321" -> "5585987654321"
                 numero = mensagem['data'].split(':')[2]
-                chave_conteudo = f'buffer:content:{numero}'
-
-                # Recupera as mensagens armazenadas
-                mensagens_json = redis_client.get(chave_conteudo)
-
-                if mensagens_json:
-                    # Converte JSON para lista
-                    mensagens_lista = json.loads(mensagens_json)
-
-                    # Concatena todas as mensagens com espaço
-                    # filter(None, ...) remove strings vazias
-                    texto_final = ' '.join(
-                        filter(None, map(str, mensagens_lista))
-                    )
-
-                    print(f'\n⏰ Timer expirou para {numero}')
-                    print(
-                        f'📦 Processando {len(mensagens_lista)} mensagem(ns)'
-                    )
-                    print(f'💬 Texto final: {texto_final}\n')
-
-                    # Chama a função que invoca o agente
-                    await callback(numero, texto_final)
-
-                    # Limpa o buffer do Redis
-                    redis_client.delete(chave_conteudo)
-                    print(f'🗑️ Buffer deletado para {numero}\n')
+                await descarregar_buffer(numero, callback)
 
             # Pequeno delay para não sobrecarregar a CPU
             await asyncio.sleep(0.01)
 
-        except Exception as e:
-            print(f'❌ Erro no ouvinte: {e}')
+        except Exception:
+            logger.exception('Erro no ouvinte')
             await asyncio.sleep(
                 1
             )  # Aguarda um pouco antes de tentar novamente
@@ -164,5 +513,5 @@ def iniciar_ouvinte_background(
     thread = threading.Thread(target=executar_ouvinte, daemon=True)
     thread.start()
 
-    print('✅ Thread do ouvinte iniciada com sucesso!')
+    logger.info('Thread do ouvinte iniciada')
     return thread
@@ -0,0 +1,259 @@
+import base64
+import json
+import os
+from collections.abc import Iterator, Sequence
+from typing import Any
+
+from dotenv import load_dotenv
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+from src.redis.client_redis import redis_client
+
+load_dotenv()
+
+# Checkpoints só servem enquanto o job pode ser re-tentado pelo RQ
+CHECKPOINT_TTL = int(os.getenv('CHECKPOINT_TTL', '86400'))  # segundos
+
+
+def _codificar(tipo_e_bytes: tuple[str, bytes]) -> list[str]:
+    tipo, dados = tipo_e_bytes
+    return [tipo, base64.b64encode(dados).decode()]
+
+
+def _decodificar(valor: list[str]) -> tuple[str, bytes]:
+    tipo, dados = valor
+    return tipo, base64.b64decode(dados)
+
+
+class RedisCheckpointSaver(BaseCheckpointSaver):
+    """
+    Checkpointer do LangGraph guardado no Redis.
+
+    Depois de cada etapa (superstep) do grafo o estado é salvo. Se o job
+    falhar e o RQ tentar de novo com o mesmo `thread_id`, o grafo retoma
+    da última etapa concluída em vez de começar do zero.
+
+    ESTRUTURA NO REDIS (todas as chaves com TTL):
+    - checkpoint:{thread}:{ns}            HASH checkpoint_id -> checkpoint
+    - checkpoint_writes:{thread}:{ns}:{id} HASH task:idx -> write pendente
+    - checkpoint_keys:{thread}            SET com as chaves acima
+    """
+
+    def __init__(self, client=redis_client, ttl: int = CHECKPOINT_TTL):
+        super().__init__()
+        self.client = client
+        self.ttl = ttl
+
+    # ------------------------------------------------------------------
+    # Chaves
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _chave_checkpoints(thread_id: str, ns: str) -> str:
+        return f'checkpoint:{thread_id}:{ns}'
+
+    @staticmethod
+    def _chave_writes(thread_id: str, ns: str, checkpoint_id: str) -> str:
+        return f'checkpoint_writes:{thread_id}:{ns}:{checkpoint_id}'
+
+    def _registrar_chave(self, pipe, thread_id: str, chave: str):
+        chave_indice = f'checkpoint_keys:{thread_id}'
+        pipe.sadd(chave_indice, chave)
+        pipe.expire(chave_indice, self.ttl)
+        pipe.expire(chave, self.ttl)
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+
+    def _montar_tupla(
+        self, thread_id: str, ns: str, checkpoint_id: str, bruto: str
+    ) -> CheckpointTuple:
+        salvo = json.loads(bruto)
+
+        writes = self.client.hgetall(
+            self._chave_writes(thread_id, ns, checkpoint_id)
+        )
+        pending_writes = [
+            (task_id, canal, self.serde.loads_typed(_decodificar(valor)))
+            for task_id, canal, *valor, _ in (
+                json.loads(w) for _, w in sorted(writes.items())
+            )
+        ]
+
+        parent_id = salvo['parent']
+
+        return CheckpointTuple(
+            config={
+                'configurable': {
+                    'thread_id': thread_id,
+                    'checkpoint_ns': ns,
+                    'checkpoint_id': checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed(
+                _decodificar(salvo['checkpoint'])
+            ),
+            metadata=self.serde.loads_typed(_decodificar(salvo['metadata'])),
+            parent_config=(
+                {
+                    'configurable': {
+                        'thread_id': thread_id,
+                        'checkpoint_ns': ns,
+                        'checkpoint_id': parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=pending_writes,
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = config['configurable']['thread_id']
+        ns = config['configurable'].get('checkpoint_ns', '')
+        chave = self._chave_checkpoints(thread_id, ns)
+
+        checkpoint_id = get_checkpoint_id(config)
+
+        if not checkpoint_id:
+            # IDs de checkpoint são ordenáveis: o maior é o mais recente
+            ids = self.client.hkeys(chave)
+            if not ids:
+                return None
+            checkpoint_id = max(ids)
+
+        bruto = self.client.hget(chave, checkpoint_id)
+        if bruto is None:
+            return None
+
+        return self._montar_tupla(thread_id, ns, checkpoint_id, bruto)
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        if config is None:
+            # Listar todas as threads exigiria SCAN no Redis inteiro
+            return
+
+        thread_id = config['configurable']['thread_id']
+        ns = config['configurable'].get('checkpoint_ns', '')
+        checkpoint_id = get_checkpoint_id(config)
+        antes_de = get_checkpoint_id(before) if before else None
+
+        salvos = self.client.hgetall(self._chave_checkpoints(thread_id, ns))
+
+        for cid in sorted(salvos, reverse=True):
+            if checkpoint_id and cid != checkpoint_id:
+                continue
+            if antes_de and cid >= antes_de:
+                continue
+
+            tupla = self._montar_tupla(thread_id, ns, cid, salvos[cid])
+
+            if filter and not all(
+                tupla.metadata.get(k) == v for k, v in filter.items()
+            ):
+                continue
+
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+
+            yield tupla
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config['configurable']['thread_id']
+        ns = config['configurable'].get('checkpoint_ns', '')
+        chave = self._chave_checkpoints(thread_id, ns)
+
+        salvo = {
+            'checkpoint': _codificar(self.serde.dumps_typed(checkpoint)),
+            'metadata': _codificar(
+                self.serde.dumps_typed(
+                    get_checkpoint_metadata(config, metadata)
+                )
+            ),
+            'parent': config['configurable'].get('checkpoint_id'),
+        }
+
+        pipe = self.client.pipeline()
+        pipe.hset(chave, checkpoint['id'], json.dumps(salvo))
+        self._registrar_chave(pipe, thread_id, chave)
+        pipe.execute()
+
+        return {
+            'configurable': {
+                'thread_id': thread_id,
+                'checkpoint_ns': ns,
+                'checkpoint_id': checkpoint['id'],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = '',
+    ) -> None:
+        thread_id = config['configurable']['thread_id']
+        ns = config['configurable'].get('checkpoint_ns', '')
+        checkpoint_id = config['configurable']['checkpoint_id']
+        chave = self._chave_writes(thread_id, ns, checkpoint_id)
+
+        pipe = self.client.pipeline()
+
+        for posicao, (canal, valor) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(canal, posicao)
+            campo = f'{task_id}:{idx:+05d}'
+            registro = json.dumps([
+                task_id,
+                canal,
+                *_codificar(self.serde.dumps_typed(valor)),
+                task_path,
+            ])
+
+            # Writes normais não são sobrescritos; especiais (erro,
+            # interrupção) substituem o anterior, como no InMemorySaver
+            if idx >= 0:
+                pipe.hsetnx(chave, campo, registro)
+            else:
+                pipe.hset(chave, campo, registro)
+
+        self._registrar_chave(pipe, thread_id, chave)
+        pipe.execute()
+
+    def delete_thread(self, thread_id: str) -> None:
+        chave_indice = f'checkpoint_keys:{thread_id}'
+        chaves = self.client.smembers(chave_indice)
+        self.client.delete(chave_indice, *chaves)
+
+
+checkpointer = RedisCheckpointSaver()
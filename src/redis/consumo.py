@@ -0,0 +1,224 @@
+"""
+Contabilidade de tokens por número, dia, prompt e modelo (lado Redis).
+
+COMO FUNCIONA:
+- No fim de cada turno do agente, o uso das respostas do LLM (tokens,
+  chamadas, rodadas de ferramenta) é somado em contadores no Redis:
+  um hash consumo:<dia>:<numero>:<prompt>:<modelo> por combinação
+- O turno e a latência contam para o modelo que deu a resposta final;
+  chamadas de outro modelo que ficaram no estado (fallback depois de
+  uma rodada de ferramenta) entram só com os tokens
+- Respostas que o roteador descarta (hedge que perdeu) não chegam ao
+  estado: o roteador as entrega a registrar_descartada assim que
+  terminam (ver ao_descartar em src/agent/model_router.py). Uma que
+  ainda estiver em andamento quando o job acaba não é contada
+- As chaves alteradas ficam no set consumo:pendentes e são descarregadas
+  em lote numa tabela de rollup no Postgres (ver src/db/consumo.py)
+- Um contador à parte com o total de tokens do dia por número serve à
+  cota diária: conferir é um GET só
+
+Dia no fuso de America/Sao_Paulo, o mesmo das tabelas do banco.
+"""
+
+import os
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from dotenv import load_dotenv
+
+from src.observability.logs import get_logger
+from src.redis.client_redis import redis_client
+
+load_dotenv()
+
+logger = get_logger('consumo')
+
+FUSO = ZoneInfo('America/Sao_Paulo')
+
+# 0 desliga a cota
+COTA_TOKENS_DIA = int(os.getenv('COTA_TOKENS_DIA', '0'))
+
+# Rede de segurança: contadores nunca descarregados somem depois disso
+CONSUMO_TTL = int(os.getenv('CONSUMO_TTL', str(7 * 86400)))
+
+CHAVE_PENDENTES = 'consumo:pendentes'
+PREFIXO = 'consumo'
+
+CAMPOS = (
+    'turnos',
+    'chamadas',
+    'tokens_entrada',
+    'tokens_saida',
+    'rodadas_ferramenta',
+    'latencia_ms',
+)
+
+# Subtrai o que já foi gravado no Postgres. Incrementos feitos nesse
+# meio tempo continuam no hash; sem nada pendente, a chave sai do set.
+# KEYS: hash, pendentes; ARGV: campo1, valor1, campo2, valor2, ...
+SUBTRAIR_LUA = """
+for i = 1, #ARGV, 2 do
+    redis.call('HINCRBY', KEYS[1], ARGV[i], -tonumber(ARGV[i + 1]))
+end
+
+for _, valor in ipairs(redis.call('HVALS', KEYS[1])) do
+    if tonumber(valor) ~= 0 then
+        return 0
+    end
+end
+
+redis.call('DEL', KEYS[1])
+redis.call('SREM', KEYS[2], KEYS[1])
+return 1
+"""
+
+subtrair = redis_client.register_script(SUBTRAIR_LUA)
+
+
+def hoje() -> str:
+    return datetime.now(FUSO).date().isoformat()
+
+
+def chave_consumo(dia: str, numero: str, prompt: str, modelo: str) -> str:
+    return f'{PREFIXO}:{dia}:{numero}:{prompt}:{modelo}'
+
+
+def ler_chave(chave: str) -> tuple[str, str, str, str]:
+    """(dia, numero, prompt, modelo) de uma chave de consumo."""
+    _, dia, numero, prompt, modelo = chave.split(':', 4)
+    return dia, numero, prompt, modelo
+
+
+def _chave_cota(dia: str, numero: str) -> str:
+    return f'{PREFIXO}:cota:{dia}:{numero}'
+
+
+def modelo_da_resposta(mensagem) -> str:
+    metadata = getattr(mensagem, 'response_metadata', None) or {}
+    return metadata.get('model_name') or 'desconhecido'
+
+
+def resumir_turno(mensagens) -> dict[str, dict[str, int]]:
+    """
+    Uso do LLM num turno, por modelo, a partir das mensagens do estado
+    do grafo (só o turno atual: o histórico não fica no estado).
+    """
+    resumo = {}
+
+    for mensagem in mensagens:
+        if getattr(mensagem, 'type', None) != 'ai':
+            continue
+
+        metadata = getattr(mensagem, 'response_metadata', None) or {}
+        uso = metadata.get('token_usage') or {}
+
+        total = resumo.setdefault(
+            modelo_da_resposta(mensagem),
+            {
+                'chamadas': 0,
+                'tokens_entrada': 0,
+                'tokens_saida': 0,
+                'rodadas_ferramenta': 0,
+            },
+        )
+        total['chamadas'] += 1
+        total['tokens_entrada'] += uso.get('prompt_tokens') or 0
+        total['tokens_saida'] += uso.get('completion_tokens') or 0
+        if getattr(mensagem, 'tool_calls', None):
+            total['rodadas_ferramenta'] += 1
+
+    return resumo
+
+
+def registrar_turno(
+    numero: str,
+    prompt: str,
+    mensagens,
+    latencia: float,
+    client=redis_client,
+):
+    """Soma o uso do turno nos contadores (uma ida ao Redis)."""
+    respostas = [m for m in mensagens if getattr(m, 'type', None) == 'ai']
+    if not respostas:
+        return
+
+    # Turno e latência são do modelo da última resposta, não do último
+    # modelo a aparecer no turno (primário -> secundário -> primário)
+    _somar(
+        numero,
+        prompt,
+        resumir_turno(respostas),
+        client,
+        turno=(
+            modelo_da_resposta(respostas[-1]),
+            {'turnos': 1, 'latencia_ms': int(latencia * 1000)},
+        ),
+    )
+
+
+def registrar_descartada(
+    numero: str, prompt: str, mensagem, client=redis_client
+):
+    """
+    Soma uma resposta que o roteador descartou: os tokens foram gastos
+    (e contam na cota), mas não houve turno nem ferramenta executada.
+    """
+    resumo = resumir_turno([mensagem])
+    for uso in resumo.values():
+        uso['rodadas_ferramenta'] = 0
+
+    _somar(numero, prompt, resumo, client)
+
+
+def _somar(
+    numero: str,
+    prompt: str,
+    resumo: dict,
+    client,
+    turno: tuple[str, dict] | None = None,
+):
+    """
+    Uso por modelo. `turno` é (modelo da resposta final, campos que só
+    ele recebe: turnos e latência).
+    """
+    if not resumo:
+        return
+
+    modelo_final, do_turno = turno or (None, {})
+
+    dia = hoje()
+    tokens = 0
+
+    with client.pipeline(transaction=False) as pipe:
+        for modelo, uso in resumo.items():
+            chave = chave_consumo(dia, numero, prompt, modelo)
+            for campo, valor in uso.items():
+                pipe.hincrby(chave, campo, valor)
+            if modelo == modelo_final:
+                for campo, valor in do_turno.items():
+                    pipe.hincrby(chave, campo, valor)
+            pipe.expire(chave, CONSUMO_TTL)
+            pipe.sadd(CHAVE_PENDENTES, chave)
+            tokens += uso['tokens_entrada'] + uso['tokens_saida']
+
+        cota = _chave_cota(dia, numero)
+        pipe.incrby(cota, tokens)
+        pipe.expire(cota, 2 * 86400)
+        pipe.execute()
+
+
+def tokens_hoje(numero: str, client=redis_client) -> int:
+    return int(client.get(_chave_cota(hoje(), numero)) or 0)
+
+
+def cota_excedida(numero: str, client=redis_client) -> bool:
+    """True se o número já gastou a cota de tokens do dia."""
+    if COTA_TOKENS_DIA <= 0:
+        return False
+    return tokens_hoje(numero, client) >= COTA_TOKENS_DIA
+
+
+def primeiro_aviso_cota(numero: str, client=redis_client) -> bool:
+    """True só na primeira vez no dia (o aviso não vira spam)."""
+    chave = f'{PREFIXO}:aviso:{hoje()}:{numero}'
+    return bool(client.set(chave, 1, nx=True, ex=2 * 86400))
@@ -0,0 +1,108 @@
+import os
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+from src.observability.logs import get_logger
+from src.redis.client_redis import redis_client
+
+load_dotenv()
+
+logger = get_logger('idempotencia')
+
+IDEMPOTENCIA_TTL = int(os.getenv('IDEMPOTENCIA_TTL', '86400'))  # segundos
+
+# Validade da reserva de quem está executando a etapa: precisa cobrir a
+# etapa mais longa (um envio na fila do rate limiter). Se o processo
+# morrer no meio, a etapa fica livre de novo depois disso
+RESERVA_TTL = int(os.getenv('IDEMPOTENCIA_RESERVA', '120'))  # segundos
+
+CONCLUIDA = '1'
+
+# Desfaz a reserva só se ela ainda for de quem a criou
+LIBERAR_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+liberar = redis_client.register_script(LIBERAR_LUA)
+
+
+class EtapaEmAndamento(RuntimeError):
+    """Outra execução segurou a etapa por mais que RESERVA_TTL."""
+
+
+def chave_idempotencia(config: dict | None, etapa: str) -> str | None:
+    """
+    Monta a chave de idempotência de uma etapa do grafo.
+
+    A chave é o `thread_id` da execução (o ID do job no RQ, que se mantém
+    entre as tentativas) + o nome da etapa. Sem `thread_id` retorna None
+    e a etapa roda normalmente.
+    """
+    thread_id = (config or {}).get('configurable', {}).get('thread_id')
+    if not thread_id:
+        return None
+    return f'{thread_id}:{etapa}'
+
+
+def _reservar(chave_redis: str, token: str) -> bool:
+    """
+    Reserva a etapa (SET NX). Se outra execução já reservou, espera ela
+    terminar: concluída, devolve False; liberada ou expirada, reserva.
+    """
+    limite = time.monotonic() + RESERVA_TTL
+    intervalo = 0.05
+
+    while not redis_client.set(chave_redis, token, nx=True, ex=RESERVA_TTL):
+        if redis_client.get(chave_redis) == CONCLUIDA:
+            return False
+        if time.monotonic() >= limite:
+            raise EtapaEmAndamento(chave_redis)
+
+        time.sleep(intervalo)
+        intervalo = min(intervalo * 2, 1)
+
+    return True
+
+
+def executar_uma_vez(chave: str | None, funcao, *args, **kwargs):
+    """
+    Executa `funcao` só se a etapa ainda não foi concluída.
+
+    COMO FUNCIONA:
+    - Reserva `idem:{chave}` com SET NX antes de executar: duas execuções
+      simultâneas da mesma etapa (nova tentativa do RQ, despacho em
+      dobro) não fazem o efeito colateral duas vezes
+    - Quem chega com a reserva ocupada espera: se a etapa for concluída,
+      pula; se falhar ou o processo morrer (reserva expira), executa
+    - Ao terminar, a chave vira "concluída" (com TTL); se a função
+      levantar erro, a reserva é desfeita e o erro propaga
+
+    Cobre o caso em que o efeito colateral aconteceu (mensagem salva,
+    WhatsApp enviado) mas o job caiu antes do checkpoint ser gravado.
+
+    Returns:
+        O retorno da função, ou None se a etapa foi pulada
+    """
+    if chave is None:
+        return funcao(*args, **kwargs)
+
+    chave_redis = f'idem:{chave}'
+    token = f'reservada:{uuid.uuid4().hex}'
+
+    if not _reservar(chave_redis, token):
+        logger.info('Etapa já executada, pulando', extra={'chave': chave})
+        return None
+
+    try:
+        resultado = funcao(*args, **kwargs)
+    except BaseException:
+        liberar(keys=[chave_redis], args=[token], client=redis_client)
+        raise
+
+    redis_client.set(chave_redis, CONCLUIDA, ex=IDEMPOTENCIA_TTL)
+    return resultado
@@ -0,0 +1,377 @@
+"""
+Ingestão por Redis Streams (alternativa ao buffer + pub/sub de expiração).
+
+COMO FUNCIONA:
+1. O webhook publica cada mensagem na stream `ingestao:eventos` (XADD)
+2. Processos `python -m src.redis.ingestao` leem a stream num consumer
+   group (XREADGROUP): cada entrada vai para um único consumidor
+3. O consumidor anexa a mensagem ao buffer do número (mesmo debounce
+   adaptativo do buffer) e marca o prazo do flush num ZSET
+   (`ingestao:prazos`, score = instante do flush em ms); só então dá XACK
+4. Quando o prazo vence, um consumidor reivindica o número (lease numa
+   chave própria, com token), enfileira o job no RQ e só depois remove
+   as mensagens que despachou (se ainda tiver o lease)
+5. Entradas entregues a um consumidor que caiu são reclamadas por outro
+   (XAUTOCLAIM) depois de INGESTAO_OCIOSO_MS
+
+Garantia: pelo menos uma vez. Reprocessar uma entrada não duplica a
+mensagem (deduplicação pelo ID da entrada) e reenfileirar um buffer já
+despachado é evitado pela chave de idempotência do despacho.
+
+COMO USAR:
+    INGESTAO=streams (na API e nos consumidores)
+    python -m src.redis.ingestao            # consumidor (um ou vários)
+    python -m src.redis.ingestao --status   # backlog em JSON
+"""
+
+import json
+import os
+import socket
+import sys
+import time
+import uuid
+
+from dotenv import load_dotenv
+from redis.exceptions import ResponseError
+
+from src.observability.logs import configurar_logs, get_logger
+from src.observability.metrics import buffer_espera, buffer_mensagens
+from src.observability.tracing import (
+    configurar_tracing,
+    extrair_contexto,
+    injetar_contexto,
+    span,
+)
+from src.redis.buffer import aplicar_evento
+from src.redis.client_redis import redis_client
+from src.redis.idempotencia import executar_uma_vez
+from src.redis.rq import enqueue_agent_processing
+
+load_dotenv()
+
+logger = get_logger('ingestao')
+
+# 'buffer' (padrão): buffer + expiração via pub/sub dentro da API
+# 'streams': webhook publica na stream e os consumidores fazem o resto
+MODO_INGESTAO = os.getenv('INGESTAO', 'buffer')
+
+STREAM = 'ingestao:eventos'
+GRUPO = 'ingestao'
+PRAZOS = 'ingestao:prazos'
+
+# Teto de segurança da stream (corte aproximado das entradas mais antigas)
+STREAM_MAXLEN = int(os.getenv('INGESTAO_MAXLEN', '500000'))
+# Entradas pendentes há mais que isso são reclamadas de outro consumidor
+OCIOSO_MS = int(os.getenv('INGESTAO_OCIOSO_MS', '60000'))
+# Tempo que um consumidor tem para despachar um número reivindicado
+LEASE_MS = int(os.getenv('INGESTAO_LEASE_MS', '30000'))
+LOTE = int(os.getenv('INGESTAO_LOTE', '100'))
+BLOQUEIO_MS = 200
+RECLAMAR_A_CADA = 10  # segundos
+
+
+# Reivindica o flush de um número: só com o prazo vencido e sem lease de
+# outro consumidor. O lease fica numa chave própria (o ZSET guarda só o
+# prazo do debounce, que uma mensagem nova sobrescreve). O lote
+# despachado (`despachando` = quantas mensagens) é fixado na primeira
+# reivindicação: quem assumir depois de uma queda despacha o mesmo lote.
+# KEYS: prazos, lease, mensagens, meta; ARGV: numero, agora, token, ttl
+# Retorna {mensagens do lote, meta (HGETALL)} ou false
+REIVINDICAR_LUA = """
+local prazo = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not prazo or tonumber(prazo) > tonumber(ARGV[2]) then
+    return false
+end
+if not redis.call('SET', KEYS[2], ARGV[3], 'NX', 'PX', ARGV[4]) then
+    return false
+end
+
+local total = tonumber(redis.call('HGET', KEYS[4], 'despachando'))
+if not total then
+    total = redis.call('LLEN', KEYS[3])
+    if total == 0 then
+        redis.call('ZREM', KEYS[1], ARGV[1])
+        redis.call('DEL', KEYS[2], KEYS[4])
+        return false
+    end
+    redis.call('HSET', KEYS[4], 'despachando', total)
+end
+
+return {
+    redis.call('LRANGE', KEYS[3], 0, total - 1),
+    redis.call('HGETALL', KEYS[4]),
+}
+"""
+
+# Remove só as mensagens despachadas, e só se o lease ainda for de quem
+# despachou. Se chegaram outras durante o despacho, elas ficam (com prazo
+# próprio, já gravado no ZSET) e formam o próximo lote.
+# KEYS: mensagens, meta, prazos, lease; ARGV: token, total, numero, agora
+# Retorna quantas mensagens ficaram, ou -1 se o lease foi perdido
+FINALIZAR_LUA = """
+if redis.call('GET', KEYS[4]) ~= ARGV[1] then
+    return -1
+end
+
+redis.call('LTRIM', KEYS[1], ARGV[2], -1)
+local restantes = redis.call('LLEN', KEYS[1])
+if restantes == 0 then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    redis.call('ZREM', KEYS[3], ARGV[3])
+else
+    redis.call('HSET', KEYS[2], 'inicio', ARGV[4])
+    redis.call('HDEL', KEYS[2], 'despachando')
+end
+redis.call('DEL', KEYS[4])
+return restantes
+"""
+
+_reivindicar = redis_client.register_script(REIVINDICAR_LUA)
+_finalizar = redis_client.register_script(FINALIZAR_LUA)
+
+
+# ============================================================================
+# LADO DO WEBHOOK
+# ============================================================================
+
+
+def publicar_evento(numero: str, mensagem: str, janela_minima: float = 0):
+    """
+    Publica uma mensagem do webhook na stream de ingestão.
+
+    A deduplicação e o limite por número já foram feitos no webhook
+    (reivindicar_mensagem).
+
+    Returns:
+        str: ID da entrada na stream
+    """
+    return redis_client.xadd(
+        STREAM,
+        {
+            'numero': numero,
+            'mensagem': json.dumps(mensagem),
+            'janela_minima': janela_minima,
+            'trace': json.dumps(injetar_contexto()),
+        },
+        maxlen=STREAM_MAXLEN,
+        approximate=True,
+    )
+
+
+def garantir_grupo(client=redis_client):
+    """Cria o consumer group (e a stream) se ainda não existirem."""
+    try:
+        client.xgroup_create(STREAM, GRUPO, id='0', mkstream=True)
+    except ResponseError as erro:
+        if 'BUSYGROUP' not in str(erro):
+            raise
+
+
+def status_ingestao(client=redis_client) -> dict:
+    """
+    Backlog da ingestão (para o /health e o --status).
+
+    - stream: entradas na stream
+    - pendentes: entregues a um consumidor e ainda sem XACK
+    - atraso: entradas ainda não entregues a nenhum consumidor
+    - buffers: números esperando o flush
+    - flush_atrasado_s: quanto o prazo mais antigo já passou
+    """
+    pipe = client.pipeline(transaction=False)
+    pipe.xlen(STREAM)
+    pipe.zcard(PRAZOS)
+    pipe.zrange(PRAZOS, 0, 0, withscores=True)
+    tamanho, buffers, mais_antigo = pipe.execute()
+
+    grupo = {}
+    try:
+        grupos = client.xinfo_groups(STREAM)
+        grupo = next((g for g in grupos if g['name'] == GRUPO), {})
+    except ResponseError:
+        pass
+
+    atrasado = 0.0
+    if mais_antigo:
+        atrasado = max(0.0, time.time() - mais_antigo[0][1] / 1000)
+
+    return {
+        'modo': MODO_INGESTAO,
+        'stream': tamanho,
+        'consumidores': grupo.get('consumers', 0),
+        'pendentes': grupo.get('pending', 0),
+        'atraso': grupo.get('lag'),
+        'buffers': buffers,
+        'flush_atrasado_s': round(atrasado, 1),
+    }
+
+
+# ============================================================================
+# CONSUMIDOR (estágio de debounce, agrupamento e despacho)
+# ============================================================================
+
+
+class ConsumidorIngestao:
+    """
+    Um consumidor do grupo `ingestao`. Rode quantos processos quiser,
+    em quantas máquinas quiser: a stream e o ZSET de prazos distribuem
+    o trabalho.
+    """
+
+    def __init__(self, nome: str | None = None, client=redis_client):
+        self.nome = nome or f'{socket.gethostname()}-{uuid.uuid4().hex[:6]}'
+        self.client = client
+        self._ultima_reclamacao = 0.0
+
+    # --- entradas da stream -> buffer ---
+
+    @staticmethod
+    def _aplicar(id_entrada: str, campos: dict):
+        with span(
+            'ingestao.aplicar',
+            contexto=extrair_contexto(json.loads(campos.get('trace', '{}'))),
+            id_entrada=id_entrada,
+        ):
+            aplicar_evento(
+                campos['numero'],
+                json.loads(campos['mensagem']),
+                f'ingestao:{id_entrada}',
+                float(campos.get('janela_minima') or 0),
+                PRAZOS,
+            )
+
+    def _processar(self, entradas) -> int:
+        for id_entrada, campos in entradas:
+            # Entrada cortada pelo MAXLEN antes de ser lida
+            if not campos:
+                self.client.xack(STREAM, GRUPO, id_entrada)
+                continue
+            self._aplicar(id_entrada, campos)
+            self.client.xack(STREAM, GRUPO, id_entrada)
+        return len(entradas)
+
+    def ler_novas(self, bloqueio_ms: int = BLOQUEIO_MS) -> int:
+        resposta = self.client.xreadgroup(
+            GRUPO,
+            self.nome,
+            {STREAM: '>'},
+            count=LOTE,
+            block=bloqueio_ms,
+        )
+        return sum(self._processar(entradas) for _, entradas in resposta)
+
+    def reclamar_pendentes(self) -> int:
+        """Assume entradas paradas em consumidores que caíram."""
+        inicio, total = '0-0', 0
+        while True:
+            proximo, entradas, *_ = self.client.xautoclaim(
+                STREAM,
+                GRUPO,
+                self.nome,
+                min_idle_time=OCIOSO_MS,
+                start_id=inicio,
+                count=LOTE,
+            )
+            if entradas:
+                logger.warning(
+                    'Entradas reclamadas',
+                    extra={'consumidor': self.nome, 'total': len(entradas)},
+                )
+            total += self._processar(entradas)
+            if proximo in {'0-0', b'0-0'}:
+                return total
+            inicio = proximo
+
+    # --- prazos vencidos -> RQ ---
+
+    def despachar(self, numero: str) -> bool:
+        chave_mensagens = f'buffer:mensagens:{numero}'
+        chave_meta = f'buffer:meta:{numero}'
+        chave_lease = f'ingestao:lease:{numero}'
+        token = uuid.uuid4().hex
+
+        agora_ms = time.time() * 1000
+        reivindicado = _reivindicar(
+            keys=[PRAZOS, chave_lease, chave_mensagens, chave_meta],
+            args=[numero, agora_ms, token, LEASE_MS],
+            client=self.client,
+        )
+        if not reivindicado:
+            return False
+
+        mensagens_json, meta_lista = reivindicado
+        meta = dict(zip(meta_lista[::2], meta_lista[1::2]))
+        mensagens = [json.loads(m) for m in mensagens_json]
+        texto_final = ' '.join(filter(None, map(str, mensagens)))
+
+        buffer_mensagens.observe(len(mensagens))
+        if meta.get('inicio'):
+            buffer_espera.observe(time.time() - float(meta['inicio']))
+
+        with span(
+            'ingestao.despacho',
+            contexto=extrair_contexto(json.loads(meta.get('trace', '{}'))),
+            mensagens=len(mensagens),
+        ):
+            # Se o consumidor cair depois de enfileirar e antes de
+            # finalizar, quem reivindicar de novo pega o mesmo lote (mesmo
+            # início) e não reenfileira
+            executar_uma_vez(
+                f'despacho:{numero}:{meta.get("inicio")}',
+                enqueue_agent_processing,
+                numero,
+                texto_final,
+            )
+
+        restantes = _finalizar(
+            keys=[chave_mensagens, chave_meta, PRAZOS, chave_lease],
+            args=[token, len(mensagens), numero, time.time()],
+            client=self.client,
+        )
+        if restantes < 0:
+            # Outro consumidor assumiu o mesmo lote e finaliza por nós
+            logger.warning(
+                'Lease do despacho expirou',
+                extra={'numero': numero, 'consumidor': self.nome},
+            )
+        return True
+
+    def despachar_vencidos(self) -> int:
+        vencidos = self.client.zrangebyscore(
+            PRAZOS, '-inf', time.time() * 1000, start=0, num=LOTE
+        )
+        return sum(self.despachar(numero) for numero in vencidos)
+
+    # --- loop principal ---
+
+    def executar(self):
+        garantir_grupo(self.client)
+        logger.info(
+            'Consumidor de ingestão iniciado', extra={'nome': self.nome}
+        )
+
+        while True:
+            try:
+                if time.time() - self._ultima_reclamacao > RECLAMAR_A_CADA:
+                    self.reclamar_pendentes()
+                    self._ultima_reclamacao = time.time()
+
+                self.ler_novas()
+                self.despachar_vencidos()
+
+            except Exception:
+                logger.exception('Erro no consumidor de ingestão')
+                time.sleep(1)
+
+
+def main():
+    if '--status' in sys.argv:
+        print(json.dumps(status_ingestao(), indent=2))
+        return
+
+    configurar_logs('ingestao')
+    configurar_tracing('ingestao')
+    ConsumidorIngestao().executar()
+
+
+if __name__ == '__main__':
+    main()
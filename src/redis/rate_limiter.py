@@ -0,0 +1,270 @@
+import os
+import random
+import time
+import uuid
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from redis.exceptions import RedisError
+
+from src.observability.logs import get_logger
+from src.redis.client_redis import redis_client
+
+load_dotenv()
+
+logger = get_logger('rate_limiter')
+
+HTTP_429 = 429
+
+# ============================================================================
+# SCRIPTS LUA (executados de forma atômica no Redis)
+# ============================================================================
+
+# Token bucket com reserva: cada chamada consome 1 token, mesmo que o saldo
+# fique negativo. O retorno é quantos ms o chamador deve esperar antes de
+# usar o token reservado. Assim os workers formam uma fila implícita e
+# ninguém precisa ficar tentando de novo (sem retry storm).
+TOKEN_BUCKET_LUA = """
+local chave = KEYS[1]
+local taxa = tonumber(ARGV[1])
+local capacidade = tonumber(ARGV[2])
+
+local t = redis.call('TIME')
+local agora = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local estado = redis.call('HMGET', chave, 'tokens', 'ts')
+local tokens = tonumber(estado[1]) or capacidade
+local ts = tonumber(estado[2]) or agora
+
+tokens = math.min(capacidade, tokens + (agora - ts) * taxa / 1000)
+tokens = tokens - 1
+
+local espera = 0
+if tokens < 0 then
+    espera = math.ceil(-tokens * 1000 / taxa)
+end
+
+redis.call('HSET', chave, 'tokens', tostring(tokens), 'ts', agora)
+redis.call('PEXPIRE', chave, espera + math.ceil(capacidade * 1000 / taxa))
+return espera
+"""
+
+# Limite de concorrência: cada chamada em andamento é um "lease" num
+# ZSET com score = instante de expiração. Leases de workers que morreram
+# expiram sozinhos e liberam a vaga.
+CONCORRENCIA_LUA = """
+local chave = KEYS[1]
+local limite = tonumber(ARGV[1])
+local lease = ARGV[2]
+local ttl = tonumber(ARGV[3])
+
+local t = redis.call('TIME')
+local agora = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+redis.call('ZREMRANGEBYSCORE', chave, '-inf', agora)
+
+if redis.call('ZCARD', chave) < limite then
+    redis.call('ZADD', chave, agora + ttl, lease)
+    redis.call('PEXPIRE', chave, ttl)
+    return 1
+end
+return 0
+"""
+
+# Penalidade após um 429: zera o balde e coloca o saldo negativo, fazendo
+# todos os workers esperarem o tempo pedido pelo provedor.
+PENALIDADE_LUA = """
+local chave = KEYS[1]
+local taxa = tonumber(ARGV[1])
+local segundos = tonumber(ARGV[2])
+
+local t = redis.call('TIME')
+local agora = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local tokens = tonumber(redis.call('HGET', chave, 'tokens')) or 0
+local penalidade = -segundos * taxa
+if tokens > penalidade then
+    tokens = penalidade
+end
+
+redis.call('HSET', chave, 'tokens', tostring(tokens), 'ts', agora)
+redis.call('PEXPIRE', chave, math.ceil(segundos * 1000) + 60000)
+return 1
+"""
+
+
+class RateLimiter:
+    """
+    Limitador distribuído (token bucket + concorrência) compartilhado por
+    todos os processos que usam o mesmo Redis.
+
+    COMO FUNCIONA:
+    - Antes de chamar o provedor, o worker reserva um token no balde
+    - Se o balde estiver vazio, o Redis devolve quanto tempo esperar
+      e o worker dorme esse tempo (fila implícita, sem falhar)
+    - Depois espera uma vaga de concorrência (lease com TTL)
+    - Ao terminar a chamada, libera a vaga
+
+    Se o Redis estiver fora do ar, o limitador deixa a chamada passar
+    (fail-open) para não derrubar o atendimento.
+
+    Args:
+        provedor (str): Nome do provedor (usado nas chaves do Redis)
+        rpm (float): Requisições por minuto permitidas (todos os workers)
+        concorrencia (int): Máximo de chamadas simultâneas
+        rajada (int): Capacidade do balde (tamanho máximo da rajada)
+        lease_ttl (float): Segundos até uma vaga presa expirar sozinha
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        provedor: str,
+        *,
+        rpm: float,
+        concorrencia: int,
+        rajada: int | None = None,
+        lease_ttl: float = 120,
+        client=redis_client,
+    ):
+        self.provedor = provedor
+        self.taxa = rpm / 60
+        self.capacidade = rajada or max(1, concorrencia)
+        self.concorrencia = concorrencia
+        self.lease_ttl_ms = int(lease_ttl * 1000)
+        self.client = client
+
+        self.chave_balde = f'ratelimit:bucket:{provedor}'
+        self.chave_vagas = f'ratelimit:leases:{provedor}'
+
+        self._token_bucket = client.register_script(TOKEN_BUCKET_LUA)
+        self._concorrencia = client.register_script(CONCORRENCIA_LUA)
+        self._penalidade = client.register_script(PENALIDADE_LUA)
+
+    def aguardar_token(self) -> float:
+        """Reserva um token e dorme até ele ficar válido. Retorna a espera."""
+        espera_ms = self._token_bucket(
+            keys=[self.chave_balde], args=[self.taxa, self.capacidade]
+        )
+        espera = int(espera_ms) / 1000
+
+        if espera > 0:
+            logger.info(
+                'Rate limit: aguardando',
+                extra={'provedor': self.provedor, 'espera': espera},
+            )
+            time.sleep(espera)
+
+        return espera
+
+    def aguardar_vaga(self) -> str:
+        """Espera até conseguir uma vaga de concorrência. Retorna o lease."""
+        lease = uuid.uuid4().hex
+        intervalo = 0.05
+
+        while not self._concorrencia(
+            keys=[self.chave_vagas],
+            args=[self.concorrencia, lease, self.lease_ttl_ms],
+        ):
+            # Jitter evita que todos os workers acordem juntos
+            time.sleep(intervalo + random.uniform(0, intervalo))
+            intervalo = min(intervalo * 2, 1)
+
+        return lease
+
+    def liberar(self, lease: str):
+        self.client.zrem(self.chave_vagas, lease)
+
+    def penalizar(self, segundos: float):
+        """Chamado após um 429: todos os workers esperam `segundos`."""
+        try:
+            self._penalidade(
+                keys=[self.chave_balde], args=[self.taxa, segundos]
+            )
+            logger.warning(
+                '429 recebido, pausando provedor',
+                extra={'provedor': self.provedor, 'segundos': segundos},
+            )
+        except RedisError:
+            logger.exception(
+                'Falha ao registrar penalidade',
+                extra={'provedor': self.provedor},
+            )
+
+    @contextmanager
+    def reservar(self):
+        lease = None
+
+        try:
+            self.aguardar_token()
+            lease = self.aguardar_vaga()
+        except RedisError:
+            logger.exception(
+                'Rate limiter indisponível', extra={'provedor': self.provedor}
+            )
+
+        try:
+            yield self
+        finally:
+            if lease:
+                try:
+                    self.liberar(lease)
+                except RedisError:
+                    logger.exception(
+                        'Falha ao liberar vaga',
+                        extra={'provedor': self.provedor},
+                    )
+
+
+# ============================================================================
+# LIMITES POR PROVEDOR (configuráveis por variável de ambiente)
+# ============================================================================
+
+
+def _limite(nome: str, rpm: float, concorrencia: int) -> RateLimiter:
+    prefixo = f'LIMITE_{nome.upper()}'
+    return RateLimiter(
+        provedor=nome,
+        rpm=float(os.getenv(f'{prefixo}_RPM', rpm)),
+        concorrencia=int(os.getenv(f'{prefixo}_CONCORRENCIA', concorrencia)),
+    )
+
+
+limitadores = {
+    'groq_chat': _limite('groq_chat', rpm=30, concorrencia=8),
+    'groq_whisper': _limite('groq_whisper', rpm=20, concorrencia=4),
+    'evolution': _limite('evolution', rpm=120, concorrencia=10),
+}
+
+
+def limitar(provedor: str):
+    """
+    Context manager para envolver uma chamada a um provedor externo.
+
+    Exemplo:
+        with limitar('groq_chat'):
+            response = llm.invoke(messages)
+    """
+    return limitadores[provedor].reservar()
+
+
+def retry_after(response, padrao: float = 5) -> float:
+    """Extrai o header Retry-After de uma resposta 429 (em segundos)."""
+    try:
+        return float(response.headers.get('Retry-After', padrao))
+    except (TypeError, ValueError):
+        return padrao
+
+
+def penalizar_se_429(provedor: str, erro: Exception) -> bool:
+    """
+    Aplica a penalidade do provedor se o erro for um 429.
+
+    Serve para os erros do requests (HTTPError) e do SDK do Groq
+    (RateLimitError): os dois trazem a resposta em `erro.response`.
+    """
+    response = getattr(erro, 'response', None)
+    if getattr(response, 'status_code', None) != HTTP_429:
+        return False
+
+    limitadores[provedor].penalizar(retry_after(response))
+    return True
@@ -1,14 +1,16 @@
 import os
 
 from dotenv import load_dotenv
-from langchain_core.messages import HumanMessage
 from rq import Queue, Retry
 
 from redis import Redis
-from src.graph.workflow import graph
+from src.observability.logs import get_logger
+from src.observability.tracing import injetar_contexto
 
 load_dotenv()
 
+logger = get_logger('worker')
+
 # ============================================================================
 # CONFIGURAÇÃO DO REDIS PARA RQ
 # ============================================================================
@@ -17,100 +19,83 @@ REDIS_HOST = os.getenv('REDIS_HOST')
 REDIS_PORT = 6379
 REDIS_PASSWORD = os.getenv('SENHA_REDIS')
 
-# Conexão com Redis remoto
+# Conexão com Redis remoto. Sem decode_responses: o RQ grava os jobs em
+# pickle comprimido (bytes), que o worker não consegue ler como texto
 redis_conn = Redis(
     host=REDIS_HOST,
     port=REDIS_PORT,
     password=REDIS_PASSWORD,
     db=0,
-    decode_responses=True,
 )
 
-# Cria a fila de tarefas
-task_queue = Queue(connection=redis_conn)
+# A API enfileira pelo caminho da função: só o worker importa o agente
+# (LangGraph, LLMs, prompt), que fica em src/redis/tasks.py
+PROCESSAR_AGENTE = 'src.redis.tasks.processar_agente'
 
+# Filas por classe de conversa (o worker atende as duas, com prioridade)
+# - interativa: quem já é cadastrado e mandou um texto curto; é onde a
+#   latência da resposta mais pesa
+# - lote: primeiro contato (cadastro, prompts maiores) e textos longos
+#   (em geral áudios transcritos)
+FILA_INTERATIVA = 'interativa'
+FILA_LOTE = 'lote'
 
-# ============================================================================
-# FUNÇÃO QUE SERÁ EXECUTADA PELO WORKER
-# ============================================================================
+filas = {
+    nome: Queue(nome, connection=redis_conn)
+    for nome in (FILA_INTERATIVA, FILA_LOTE)
+}
+
+# Fila principal (mantida com esse nome por compatibilidade)
+task_queue = filas[FILA_INTERATIVA]
+
+# Acima disso (em caracteres) o texto vai para a fila de lote
+LIMITE_INTERATIVO = int(os.getenv('FILA_LIMITE_INTERATIVO', '600'))
+
+# Usuário já cadastrado fica marcado no Redis pelo worker (o grafo já
+# consulta o banco), assim o enfileiramento não faz SELECT nenhum
+CONHECIDO_TTL = int(os.getenv('FILA_CONHECIDO_TTL', '86400'))
 
 
-def processar_agente(numero: str, texto_final: str):
+def __getattr__(nome: str):
     """
-    Função que será executada em background pelo RQ Worker.
+    Mantém o caminho antigo src.redis.rq.processar_agente.
 
-    COMO FUNCIONA:
-    - RQ pega essa função e executa em um processo separado
-    - Se falhar, RQ tenta novamente automaticamente (retry)
-    - Os logs são capturados pelo RQ
-    - O resultado fica armazenado no Redis
+    Jobs enfileirados antes da mudança para src/redis/tasks.py ainda
+    apontam para cá (fila 'default'). O import é tardio para a API não
+    carregar o agente ao importar este módulo.
+    """
+    if nome == 'processar_agente':
+        from src.redis.tasks import processar_agente  # noqa: PLC0415
 
-    Args:
-        numero (str): Número do usuário
-        texto_final (str): Mensagens concatenadas
+        return processar_agente
+    raise AttributeError(f'module {__name__!r} has no attribute {nome!r}')
+
+
+def marcar_conhecido(numero: str):
+    """Marca o número como cadastrado (próximos jobs vão na interativa)."""
+    try:
+        redis_conn.set(f'fila:conhecido:{numero}', 1, ex=CONHECIDO_TTL)
+    except Exception:
+        # Só afeta a escolha da fila do próximo job
+        logger.warning('Falha ao marcar usuário', extra={'numero': numero})
+
+
+def classificar_job(numero: str, texto_final: str) -> str:
+    """
+    Escolhe a fila do job.
 
     Returns:
-        dict: Resultado do agente
+        str: FILA_INTERATIVA ou FILA_LOTE
     """
-    try:
-        print(f'📦 [WORKER] Processando buffer para: {numero}')
-        print(f'💬 [WORKER] Texto agrupado: {texto_final}')
-
-        # Monta a entrada para o agente
-        entrada = {
-            'number': numero,
-            'messages': [HumanMessage(content=texto_final)],
-        }
-
-        # Invoca o agente LangGraph
-        resultado = graph.invoke(entrada)
-
-        # Extrai informações úteis
-        if resultado.get('messages'):
-            ultima_mensagem = resultado['messages'][-1]
-
-            if hasattr(ultima_mensagem, 'content'):
-                resposta_ia = ultima_mensagem.content
-            else:
-                resposta_ia = 'Sem resposta'
-
-            metadata = getattr(ultima_mensagem, 'response_metadata', {})
-            token_usage = metadata.get('token_usage', {})
-
-            print(f'✅ [WORKER] Agente processou com sucesso para {numero}')
-            print(f'\n{"=" * 60}')
-            print(f'📝 Resposta IA: {resposta_ia}')
-            print('\n📊 Métricas:')
-            print(
-                f'   • Tokens entrada: {token_usage.get("prompt_tokens", "N/A")}'
-            )
-            print(
-                f'   • Tokens saída: {token_usage.get("completion_tokens", "N/A")}'
-            )
-            print(
-                f'   • Total tokens: {token_usage.get("total_tokens", "N/A")}'
-            )
-            print(
-                f'   • Tempo total: {metadata.get("total_time", "N/A"):.3f}s'
-                if isinstance(metadata.get('total_time'), (int, float))
-                else f'   • Tempo total: {metadata.get("total_time", "N/A")}'
-            )
-            print(f'   • Modelo: {metadata.get("model_name", "N/A")}')
-            print(
-                f'   • Motivo finalização: {metadata.get("finish_reason", "N/A")}'
-            )
-            print(f'{"=" * 60}\n')
-
-        return {'status': 'sucesso', 'numero': numero, 'resposta': resposta_ia}
-
-    except Exception as e:
-        print(f'❌ [WORKER] Erro ao processar mensagens para {numero}: {e}')
-        print(
-            f'Entrada que causou erro: number={numero}, texto={texto_final}\n'
-        )
+    if len(texto_final) > LIMITE_INTERATIVO:
+        return FILA_LOTE
 
-        # Re-lança a exceção pra RQ saber que falhou e tente novamente
-        raise
+    # Número sem a marca (primeiro contato ou marca expirada) vai para o
+    # lote; o worker remarca ao confirmar o cadastro (marcar_conhecido)
+    if redis_conn.exists(f'fila:conhecido:{numero}'):
+        return FILA_INTERATIVA
+
+    return FILA_LOTE
 
 
 def enqueue_agent_processing(numero: str, texto_final: str):
@@ -119,6 +104,7 @@ def enqueue_agent_processing(numero: str, texto_final: str):
 
     COMO FUNCIONA:
     - É chamada quando o buffer expira
+    - Escolhe a fila (interativa ou lote) com classificar_job
     - Coloca a tarefa na fila do Redis
     - RQ pega a tarefa e executa no worker
     - Não bloqueia a aplicação
@@ -131,20 +117,24 @@ def enqueue_agent_processing(numero: str, texto_final: str):
         Job: Objeto da tarefa (pode ser usado pra rastrear status)
     """
     try:
-        print(f'📤 Colocando tarefa na fila RQ para {numero}')
+        nome_fila = classificar_job(numero, texto_final)
 
         # Coloca na fila com retry automático (max 3 tentativas)
-        job = task_queue.enqueue(
-            processar_agente,
+        job = filas[nome_fila].enqueue(
+            PROCESSAR_AGENTE,
             numero,
             texto_final,
             job_timeout=300,  # 5 minutos de timeout
             retry=Retry(max=3),  # Tenta até 3 vezes se falhar
+            meta={'trace': injetar_contexto()},  # continua o trace
         )
 
-        print(f'✅ Tarefa enfileirada! Job ID: {job.id}\n')
+        logger.info(
+            'Tarefa enfileirada',
+            extra={'numero': numero, 'job_id': job.id, 'fila': nome_fila},
+        )
         return job
 
-    except Exception as e:
-        print(f'❌ Erro ao enfileirar tarefa: {e}\n')
+    except Exception:
+        logger.exception('Erro ao enfileirar tarefa', extra={'numero': numero})
         raise
@@ -0,0 +1,268 @@
+"""
+Jobs executados pelo worker do RQ.
+
+Este módulo carrega o agente inteiro (grafo do LangGraph, LLMs, prompt) e
+só deve ser importado pelo worker. A API enfileira pelo caminho
+'src.redis.tasks.processar_agente' (ver src/redis/rq.py).
+"""
+
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from functools import partial
+
+from langchain_core.messages import HumanMessage
+from rq import get_current_job
+from rq.utils import now
+
+from src.agent.model_router import ao_descartar
+from src.db.consumo import descarregar_se_vencido
+from src.evolution.client import EvolutionAPI
+from src.graph.nodes import NOME_PROMPT
+from src.graph.workflow import graph
+from src.observability.callbacks import MetricasCallbackHandler
+from src.observability.logs import descarregar_logs, get_logger
+from src.observability.metrics import fila_espera, job_duracao
+from src.observability.tracing import (
+    SpanKind,
+    extrair_contexto,
+    forcar_envio,
+    span,
+)
+from src.prompts.registro import registro
+from src.redis.checkpoint import checkpointer
+from src.redis.consumo import (
+    cota_excedida,
+    primeiro_aviso_cota,
+    registrar_descartada,
+    registrar_turno,
+    tokens_hoje,
+)
+from src.redis.idempotencia import chave_idempotencia, executar_uma_vez
+
+logger = get_logger('worker')
+
+# Sem ponto nem exclamação: o sender_text quebraria em várias mensagens
+MENSAGEM_COTA = os.getenv(
+    'COTA_MENSAGEM',
+    'Você atingiu o limite de uso de hoje, amanhã eu volto a responder',
+)
+
+
+def aquecer():
+    """
+    Deixa pronto no processo pai o que todo job usaria (chamado pelo
+    worker antes do primeiro fork): cada filho herda o estado inicializado.
+
+    O import deste módulo já compila o grafo e cria o cliente do LLM (com
+    o contexto TLS) e o ToolNode; aqui entram o prompt e o caminho do
+    checkpointer/LangGraph. Nada chama serviços externos de verdade: a
+    única rede é o Redis, cujo pool o redis-py descarta sozinho no filho
+    (confere o pid). Threads e sessões HTTP são recriadas no filho pelos
+    próprios módulos (os.register_at_fork).
+    """
+    inicio = time.perf_counter()
+
+    prompt = registro.obter(NOME_PROMPT)
+    graph.get_state({'configurable': {'thread_id': 'aquecimento'}})
+
+    logger.info(
+        'Worker aquecido',
+        extra={
+            'segundos': round(time.perf_counter() - inicio, 3),
+            'prompt_versao': prompt.versao,
+        },
+    )
+
+
+def renovar_prompt():
+    """
+    Confere a versão do prompt no processo pai, logo antes de cada fork.
+
+    O filho herda o prompt montado e o instante da conferência: depois de
+    uma publicação só o pai busca e monta a versão nova, uma vez, em vez
+    de cada job repetir GET + HGET + montagem numa cópia que morre junto
+    com ele. Fora da janela de RECARGA_SEGUNDOS não vai ao Redis.
+    """
+    registro.obter(NOME_PROMPT)
+
+
+def processar_agente(numero: str, texto_final: str):
+    """
+    Função que será executada em background pelo RQ Worker.
+
+    COMO FUNCIONA:
+    - RQ pega essa função e executa em um processo separado
+    - Se falhar, RQ tenta novamente automaticamente (retry)
+    - Os logs são capturados pelo RQ
+    - O resultado fica armazenado no Redis
+    - Cada etapa do grafo é salva (checkpoint) usando o ID do job como
+      thread_id: numa nova tentativa o grafo retoma da última etapa
+      concluída em vez de repetir tudo
+    - O trace iniciado no webhook continua aqui (contexto salvo no
+      job.meta), e os spans são enviados antes do processo filho sair
+
+    Args:
+        numero (str): Número do usuário
+        texto_final (str): Mensagens concatenadas
+
+    Returns:
+        dict: Resultado do agente
+    """
+    job = get_current_job()
+    carrier = job.meta.get('trace') if job else None
+
+    if job and job.enqueued_at:
+        fila_espera.labels(fila=job.origin).observe(
+            (now() - job.enqueued_at).total_seconds()
+        )
+
+    try:
+        with span(
+            'processar_agente',
+            kind=SpanKind.CONSUMER,
+            contexto=extrair_contexto(carrier),
+            job_id=job.id if job else None,
+        ):
+            with _contar_descartadas(numero):
+                return _executar_agente(numero, texto_final, job)
+    finally:
+        descarregar_se_vencido()
+        forcar_envio()
+        descarregar_logs()
+
+
+def _executar_agente(numero: str, texto_final: str, job):
+    """Corpo do processar_agente (roda dentro do span do job)."""
+    inicio = time.perf_counter()
+
+    try:
+        logger.info(
+            'Processando buffer',
+            extra={'numero': numero, 'texto': texto_final},
+        )
+
+        # Monta a entrada para o agente
+        entrada = {
+            'number': numero,
+            'messages': [HumanMessage(content=texto_final)],
+        }
+
+        # O ID do job se mantém entre as tentativas do RQ
+        thread_id = f'job:{job.id}' if job else f'local:{uuid.uuid4().hex}'
+        config = {
+            'configurable': {'thread_id': thread_id},
+            'callbacks': [MetricasCallbackHandler()],
+        }
+
+        estado = graph.get_state(config)
+
+        # Só turnos novos são barrados (uma retomada termina o que começou)
+        if not estado.next and not estado.values and cota_excedida(numero):
+            return _recusar_por_cota(numero, inicio)
+
+        if estado.next:
+            # Tentativa anterior parou no meio: retoma do checkpoint
+            logger.warning(
+                'Retomando grafo do checkpoint',
+                extra={'numero': numero, 'proximos': list(estado.next)},
+            )
+            resultado = graph.invoke(None, config)
+        elif estado.values:
+            # Grafo já tinha terminado, só o pós-processamento falhou
+            logger.warning(
+                'Grafo já concluído, reaproveitando resultado',
+                extra={'numero': numero},
+            )
+            resultado = estado.values
+        else:
+            # Invoca o agente LangGraph
+            resultado = graph.invoke(entrada, config)
+
+        # Extrai informações úteis
+        if resultado.get('messages'):
+            ultima_mensagem = resultado['messages'][-1]
+
+            if hasattr(ultima_mensagem, 'content'):
+                resposta_ia = ultima_mensagem.content
+            else:
+                resposta_ia = 'Sem resposta'
+
+            metadata = getattr(ultima_mensagem, 'response_metadata', {})
+            token_usage = metadata.get('token_usage', {})
+
+            logger.info(
+                'Agente processou com sucesso',
+                extra={
+                    'numero': numero,
+                    'resposta': resposta_ia,
+                    'tokens_entrada': token_usage.get('prompt_tokens'),
+                    'tokens_saida': token_usage.get('completion_tokens'),
+                    'tokens_total': token_usage.get('total_tokens'),
+                    'tempo_total': metadata.get('total_time'),
+                    'modelo': metadata.get('model_name'),
+                    'motivo_finalizacao': metadata.get('finish_reason'),
+                },
+            )
+
+        _contabilizar(numero, resultado, config, inicio)
+
+        # Job concluído: os checkpoints não são mais necessários
+        checkpointer.delete_thread(thread_id)
+        job_duracao.labels(status='sucesso').observe(
+            time.perf_counter() - inicio
+        )
+
+        return {'status': 'sucesso', 'numero': numero, 'resposta': resposta_ia}
+
+    except Exception:
+        job_duracao.labels(status='erro').observe(time.perf_counter() - inicio)
+        logger.exception(
+            'Erro ao processar mensagens',
+            extra={'numero': numero, 'texto': texto_final},
+        )
+
+        # Re-lança a exceção pra RQ saber que falhou e tente novamente
+        raise
+
+
+@contextmanager
+def _contar_descartadas(numero: str):
+    """Respostas descartadas pelo roteador entram no consumo do número."""
+    versao = registro.obter(NOME_PROMPT).versao
+    token = ao_descartar.set(partial(registrar_descartada, numero, versao))
+    try:
+        yield
+    finally:
+        ao_descartar.reset(token)
+
+
+def _contabilizar(numero: str, resultado: dict, config: dict, inicio: float):
+    """Soma o uso do turno (uma vez por job, mesmo com novas tentativas)."""
+    try:
+        executar_uma_vez(
+            chave_idempotencia(config, 'consumo'),
+            registrar_turno,
+            numero,
+            registro.obter(NOME_PROMPT).versao,
+            resultado.get('messages', []),
+            time.perf_counter() - inicio,
+        )
+    except Exception:
+        # A resposta já foi enviada: falhar aqui faria o RQ repetir o job
+        logger.exception(
+            'Erro ao contabilizar o consumo', extra={'numero': numero}
+        )
+
+
+def _recusar_por_cota(numero: str, inicio: float) -> dict:
+    logger.warning(
+        'Cota de tokens do dia excedida',
+        extra={'numero': numero, 'tokens': tokens_hoje(numero)},
+    )
+    if primeiro_aviso_cota(numero):
+        EvolutionAPI().sender_text(number=numero, text=MENSAGEM_COTA)
+
+    job_duracao.labels(status='cota').observe(time.perf_counter() - inicio)
+    return {'status': 'cota_excedida', 'numero': numero, 'resposta': None}
@@ -0,0 +1,177 @@
+import os
+import random
+
+from dotenv import load_dotenv
+from rq import Queue, Worker
+from rq.utils import now
+
+from src.observability.logs import (
+    configurar_logs,
+    descarregar_logs,
+    get_logger,
+)
+from src.observability.metrics import (
+    iniciar_servidor_metricas,
+    job_etapa,
+    registrar_fila,
+)
+from src.observability.tracing import configurar_tracing
+
+# Carrega o agente no processo pai: cada fork por job já nasce com o grafo
+# compilado em vez de importar tudo de novo a partir do caminho da função
+from src.redis import tasks
+from src.redis.rq import FILA_INTERATIVA, FILA_LOTE, filas, redis_conn
+
+load_dotenv()
+
+logger = get_logger('worker')
+
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9100'))
+
+# 'ponderada' (padrão) ou 'estrita' (lote só quando a interativa está vazia)
+ESTRATEGIA = os.getenv('FILA_ESTRATEGIA', 'ponderada')
+
+# Na estratégia ponderada, de cada N+1 jobs com as duas filas cheias,
+# N vêm da interativa e 1 do lote (o lote nunca fica parado de vez)
+PESOS = {
+    FILA_INTERATIVA: int(os.getenv('FILA_PESO_INTERATIVA', '4')),
+    FILA_LOTE: int(os.getenv('FILA_PESO_LOTE', '1')),
+}
+
+
+def ordenar_filas(nomes: list[str], pesos: dict, sorteio=random) -> list[str]:
+    """
+    Sorteia a fila que vai na frente (proporcional ao peso) e mantém as
+    outras na ordem de prioridade.
+
+    O worker sempre pega da primeira fila que tiver job, então a ordem só
+    pesa quando há disputa: com a interativa vazia o lote anda livre.
+    """
+    primeira = sorteio.choices(nomes, weights=[pesos[n] for n in nomes])[0]
+    return [primeira, *(nome for nome in nomes if nome != primeira)]
+
+
+class WorkerPonderado(Worker):
+    """Worker do RQ com prioridade ponderada entre as filas."""
+
+    def reorder_queues(self, reference_queue):
+        if ESTRATEGIA != 'ponderada':
+            return
+
+        por_nome = {fila.name: fila for fila in self._ordered_queues}
+        ordem = ordenar_filas(
+            [nome for nome in por_nome if nome in PESOS], PESOS
+        )
+        # Filas sem peso (ex.: default) continuam no fim
+        self._ordered_queues = [por_nome[nome] for nome in ordem] + [
+            fila for fila in self._ordered_queues if fila.name not in PESOS
+        ]
+
+
+class WorkerAgente(WorkerPonderado):
+    """
+    Worker do agente: aquece o processo pai antes do primeiro fork e mede,
+    em cada job, o preparo (do fork até a função começar: fork, reconexão
+    ao Redis, registro do job no RQ) separado da execução da função.
+
+    O custo fixo por job aparece em job_etapa_segundos{etapa="preparo"}.
+
+    Antes de cada fork o pai roda antes_do_fork (por padrão renova o
+    prompt), para o filho herdar o estado já atualizado.
+    """
+
+    def __init__(
+        self,
+        *args,
+        aquecimento=tasks.aquecer,
+        antes_do_fork=tasks.renovar_prompt,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.aquecimento = aquecimento
+        self.antes_do_fork = antes_do_fork
+        self._fork_em = None
+
+    def bootstrap(self, *args, **kwargs):
+        super().bootstrap(*args, **kwargs)
+        try:
+            self.aquecimento()
+        except Exception:
+            # O worker funciona sem aquecimento: só cada job paga a
+            # inicialização que ficou faltando
+            logger.exception('Falha ao aquecer o worker')
+
+    def fork_work_horse(self, job, queue):
+        try:
+            self.antes_do_fork()
+        except Exception:
+            # O filho confere de novo por conta própria
+            logger.exception('Falha ao preparar o fork')
+
+        # Marcado antes do fork: o filho herda o instante
+        self._fork_em = now()
+        super().fork_work_horse(job, queue)
+
+    def perform_job(self, job, queue):
+        # Roda no filho; o RQ marca started_at logo antes de chamar a função
+        try:
+            return super().perform_job(job, queue)
+        finally:
+            self._medir(job)
+
+    def _medir(self, job):
+        if not (self._fork_em and job.started_at):
+            return
+
+        preparo = (job.started_at - self._fork_em).total_seconds()
+        execucao = ((job.ended_at or now()) - job.started_at).total_seconds()
+        job_etapa.labels(etapa='preparo').observe(preparo)
+        job_etapa.labels(etapa='execucao').observe(execucao)
+
+        logger.info(
+            'Etapas do job',
+            extra={
+                'job_id': job.id,
+                'preparo_ms': round(preparo * 1000, 1),
+                'execucao_ms': round(execucao * 1000, 1),
+            },
+        )
+        # O filho sai com os._exit logo depois
+        descarregar_logs()
+
+
+def main():
+    """
+    Sobe o worker do RQ junto com o servidor de métricas.
+
+    COMO USAR:
+        python -m src.redis.worker
+
+    Defina PROMETHEUS_MULTIPROC_DIR (diretório vazio e gravável) para que
+    as métricas registradas nos processos filhos (um fork por job) sejam
+    somadas no /metrics da porta METRICS_PORT. O tracing é ligado com
+    TRACE_ARQUIVO e/ou OTEL_EXPORTER_OTLP_ENDPOINT.
+
+    As filas são atendidas na ordem interativa > lote, com a estratégia
+    de FILA_ESTRATEGIA ('ponderada' ou 'estrita'). O agente é aquecido no
+    processo pai antes do primeiro job (ver tasks.aquecer).
+    """
+    configurar_logs('worker')
+    configurar_tracing('worker')
+    for fila in filas.values():
+        registrar_fila(fila)
+    iniciar_servidor_metricas(METRICS_PORT)
+
+    # A fila 'default' ainda escoa jobs enfileirados antes da separação
+    # (apontam para src.redis.rq.processar_agente, que reexporta o de tasks)
+    antiga = Queue(connection=redis_conn)
+
+    worker = WorkerAgente(
+        [filas[FILA_INTERATIVA], filas[FILA_LOTE], antiga],
+        connection=redis_conn,
+    )
+    worker.work()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+
+def _percentil(ordenados: list[float], p: float) -> float:
+    indice = min(len(ordenados) - 1, round(p / 100 * (len(ordenados) - 1)))
+    return ordenados[indice]
+
+
+def medir(
+    funcao,
+    repeticoes: int = 200,
+    aquecimento: int = 20,
+    preparar=None,
+    depois=None,
+):
+    """
+    Mede o tempo de `funcao` em microssegundos.
+
+    Args:
+        funcao: Recebe o retorno de `preparar(i)` (ou `i`) a cada repetição
+        repeticoes (int): Execuções medidas
+        aquecimento (int): Execuções descartadas antes de medir
+        preparar: Monta a entrada de cada execução (fora da medição)
+        depois: Limpa o que a execução deixou (fora da medição)
+
+    Returns:
+        dict: n, media, p50, p95, p99, min, max (µs) e ops_por_segundo
+    """
+    tempos = []
+
+    for i in range(aquecimento + repeticoes):
+        entrada = preparar(i) if preparar else i
+
+        inicio = time.perf_counter()
+        funcao(entrada)
+        duracao = time.perf_counter() - inicio
+
+        if depois:
+            depois(entrada)
+
+        if i >= aquecimento:
+            tempos.append(duracao * 1e6)
+
+    ordenados = sorted(tempos)
+    media = statistics.fmean(ordenados)
+
+    return {
+        'n': len(ordenados),
+        'media_us': round(media, 1),
+        'p50_us': round(_percentil(ordenados, 50), 1),
+        'p95_us': round(_percentil(ordenados, 95), 1),
+        'p99_us': round(_percentil(ordenados, 99), 1),
+        'min_us': round(ordenados[0], 1),
+        'max_us': round(ordenados[-1], 1),
+        'ops_por_segundo': round(1e6 / media, 1),
+    }
+
+
+def _commit_atual() -> str | None:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def montar_relatorio(resultados: dict) -> dict:
+    """Envolve os resultados com o commit e o ambiente da execução."""
+    return {
+        'commit': _commit_atual(),
+        'data': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'maquina': platform.node(),
+        'resultados': resultados,
+    }
+
+
+def comparar(base: dict, atual: dict, tolerancia: float = 0.10) -> list[str]:
+    """
+    Compara o p50 de cada benchmark com uma execução anterior.
+
+    Returns:
+        list[str]: Nomes dos benchmarks que pioraram mais que `tolerancia`
+    """
+    regressoes = []
+
+    print(f'\n{"benchmark":<36}{"base p50":>12}{"atual p50":>12}{"delta":>9}')
+
+    for nome, medida in atual['resultados'].items():
+        anterior = base['resultados'].get(nome)
+        if not anterior:
+            print(f'{nome:<36}{"-":>12}{medida["p50_us"]:>12}{"novo":>9}')
+            continue
+
+        delta = medida['p50_us'] / anterior['p50_us'] - 1
+        marca = ' !' if delta > tolerancia else ''
+        print(
+            f'{nome:<36}{anterior["p50_us"]:>12}{medida["p50_us"]:>12}'
+            f'{delta:>+8.1%}{marca}'
+        )
+
+        if delta > tolerancia:
+            regressoes.append(nome)
+
+    return regressoes
+
+
+def carregar(caminho: str) -> dict:
+    with open(caminho, encoding='utf-8') as f:
+        return json.load(f)
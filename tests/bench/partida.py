@@ -0,0 +1,96 @@
+"""
+Custo de partida de um processo: tempo de import e memória residente.
+
+COMO USAR:
+    python -m tests.bench.partida
+    python -m tests.bench.partida --modulos src.fast_api.app --repeticoes 10
+
+Cada medição roda num interpretador novo (sem nada em cache no processo),
+importa o módulo e informa o tempo do import, o RSS do processo depois
+dele e quais pacotes pesados (LangChain/LangGraph/LLM) foram carregados.
+Sem acesso ao Redis: a conexão é só criada, não usada.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PACOTES_PESADOS = (
+    'langgraph',
+    'langchain_core',
+    'langchain_groq',
+    'langchain_google_genai',
+    'groq',
+)
+
+# Roda no processo filho: mede o import e devolve JSON na última linha
+SONDA = """
+import json, sys, time
+inicio = time.perf_counter()
+import {modulo}
+segundos = time.perf_counter() - inicio
+rss = 0
+with open('/proc/self/status') as status:
+    for linha in status:
+        if linha.startswith('VmRSS:'):
+            rss = int(linha.split()[1]) * 1024
+carregados = sorted({{
+    nome.split('.')[0] for nome in sys.modules
+    if nome.split('.')[0] in {pesados!r}
+}})
+print(json.dumps({{
+    'segundos': segundos, 'rss': rss, 'modulos': len(sys.modules),
+    'pesados': carregados,
+}}))
+"""
+
+
+def medir_partida(modulo: str, repeticoes: int = 5) -> dict:
+    codigo = SONDA.format(modulo=modulo, pesados=PACOTES_PESADOS)
+    amostras = []
+
+    for _ in range(repeticoes):
+        saida = subprocess.run(
+            [sys.executable, '-c', codigo],
+            capture_output=True,
+            text=True,
+            check=True,
+            env=os.environ,
+        )
+        amostras.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+
+    return {
+        'modulo': modulo,
+        'import_s_p50': round(
+            statistics.median(a['segundos'] for a in amostras), 3
+        ),
+        'rss_mb_p50': round(
+            statistics.median(a['rss'] for a in amostras) / 2**20, 1
+        ),
+        'modulos_carregados': amostras[-1]['modulos'],
+        'pacotes_pesados': amostras[-1]['pesados'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument(
+        '--modulos',
+        default='src.fast_api.app,src.redis.tasks',
+        help='separados por vírgula',
+    )
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    resultados = [
+        medir_partida(modulo.strip(), args.repeticoes)
+        for modulo in args.modulos.split(',')
+    ]
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == '__main__':
+    main()
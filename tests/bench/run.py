@@ -0,0 +1,291 @@
+"""
+Micro-benchmarks do buffer, da fila e da camada de banco.
+
+COMO USAR (Redis e Postgres/pgvector locais, mesmas variáveis do .env):
+    python -m tests.bench.run --saida bench.json
+    python -m tests.bench.run --grupos buffer,fila --comparar bench.json
+
+Cada benchmark mede o tempo de uma chamada em microssegundos (p50, p95,
+p99, ...). A saída é JSON com o commit atual, para comparar execuções
+entre commits: com --comparar, o p50 de cada benchmark é comparado com o
+arquivo base e o processo sai com código 1 se algum piorar mais que
+--tolerancia.
+
+As chaves e linhas criadas usam números com o prefixo `bench` e são
+apagadas no fim.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from fastapi.testclient import TestClient
+from rq import Queue
+
+from src.db.conection import get_vector_conn
+from src.db.crud import PostgreSQL
+from src.db.migracoes import migrar
+from src.fast_api.app import app
+from src.fast_api.schemas import motivo_descarte, validar_evento
+from src.redis import rq as fila
+from src.redis.buffer import adicionar_ao_buffer, descarregar_buffer
+from src.redis.client_redis import redis_client
+from tests.bench.medicao import carregar, comparar, medir, montar_relatorio
+from tests.load.run import payload_audio, payload_texto
+
+PREFIXO = f'bench{os.getpid() % 10**5:05d}'
+
+
+def _numero(i: int) -> str:
+    return f'{PREFIXO}{i:06d}'
+
+
+# ============================================================================
+# WEBHOOK (validação e descarte, sem I/O)
+# ============================================================================
+
+
+def bench_webhook(repeticoes: int) -> dict:
+    texto = json.dumps(payload_texto(_numero(0), 'Oi, tudo bem?')).encode()
+    audio = json.dumps(payload_audio(_numero(0), tamanho=75_000)).encode()
+
+    propria = payload_texto(_numero(0), 'Resposta do agente')
+    propria['data']['key']['fromMe'] = True
+    propria = json.dumps(propria).encode()
+
+    def validar(corpo):
+        return lambda _: motivo_descarte(validar_evento(corpo))
+
+    # Sem `with`: o lifespan (banco, ouvinte) não sobe
+    cliente = TestClient(app)
+
+    return {
+        # Referência: o que o webhook fazia antes (json.loads em dict)
+        'webhook.json_loads.texto': medir(
+            lambda _: json.loads(texto), repeticoes
+        ),
+        'webhook.validar.texto': medir(validar(texto), repeticoes),
+        'webhook.json_loads.audio_100kb': medir(
+            lambda _: json.loads(audio), repeticoes
+        ),
+        'webhook.validar.audio_100kb': medir(validar(audio), repeticoes),
+        'webhook.request.descartado': medir(
+            lambda _: cliente.post('/webhook', content=propria), repeticoes
+        ),
+    }
+
+
+# ============================================================================
+# BUFFER (webhook -> Redis)
+# ============================================================================
+
+
+def _limpar_buffer(numero: str):
+    # Apagar o gatilho antes de expirar: o ouvinte da API não dispara
+    redis_client.delete(
+        f'buffer:trigger:{numero}',
+        f'buffer:mensagens:{numero}',
+        f'buffer:meta:{numero}',
+        f'admissao:numero:{numero}',
+    )
+
+
+def bench_buffer(repeticoes: int) -> dict:
+    def rajada(tamanho):
+        def preparar(i):
+            numero = _numero(i)
+            for j in range(tamanho - 1):
+                adicionar_ao_buffer(numero, f'mensagem {j}')
+            return numero
+
+        return preparar
+
+    resultados = {
+        'buffer.adicionar.primeira': medir(
+            lambda numero: adicionar_ao_buffer(numero, 'mensagem'),
+            repeticoes,
+            preparar=_numero,
+            depois=_limpar_buffer,
+        ),
+        'buffer.adicionar.decima': medir(
+            lambda numero: adicionar_ao_buffer(numero, 'mensagem'),
+            repeticoes,
+            preparar=rajada(10),
+            depois=_limpar_buffer,
+        ),
+        # Reentrega: só o SET NX roda no Redis
+        'buffer.adicionar.duplicada': medir(
+            lambda numero: adicionar_ao_buffer(numero, 'mensagem', 'BENCH'),
+            repeticoes,
+            preparar=_numero,
+            depois=_limpar_buffer,
+        ),
+    }
+    redis_client.delete('webhook:msg:BENCH')
+
+    loop = asyncio.new_event_loop()
+
+    async def callback(numero, texto_final):
+        pass
+
+    resultados['buffer.flush.5_mensagens'] = medir(
+        lambda numero: loop.run_until_complete(
+            descarregar_buffer(numero, callback)
+        ),
+        repeticoes,
+        preparar=rajada(6),
+        depois=_limpar_buffer,
+    )
+
+    loop.close()
+    return resultados
+
+
+# ============================================================================
+# FILA (buffer -> RQ)
+# ============================================================================
+
+
+def bench_fila(repeticoes: int) -> dict:
+    # Filas separadas: os workers de verdade não pegam esses jobs
+    filas_originais = dict(fila.filas)
+    for nome in fila.filas:
+        fila.filas[nome] = Queue(f'bench:{nome}', connection=fila.redis_conn)
+
+    try:
+        return {
+            'fila.enqueue_agent_processing': medir(
+                lambda numero: fila.enqueue_agent_processing(
+                    numero, 'mensagem de benchmark'
+                ),
+                repeticoes,
+                preparar=_numero,
+            )
+        }
+    finally:
+        for nome, original in filas_originais.items():
+            fila.filas[nome].empty()
+            fila.filas[nome] = original
+
+
+# ============================================================================
+# BANCO (PostgreSQL)
+# ============================================================================
+
+
+def _limpar_banco():
+    conn = get_vector_conn()
+    with conn, conn.cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM chat_ia WHERE session_id LIKE %s', (f'{PREFIXO}%',)
+        )
+        cursor.execute(
+            'DELETE FROM users WHERE numero LIKE %s', (f'{PREFIXO}%',)
+        )
+        cursor.execute('DELETE FROM arquivos WHERE categoria = %s', (PREFIXO,))
+    conn.close()
+
+
+def bench_db(repeticoes: int) -> dict:
+    migrar()
+
+    existente = _numero(999_999)
+    PostgreSQL.create_user(existente, 'Bench', 'aluno')
+
+    mensagem = {'type': 'human', 'content': 'mensagem de benchmark'}
+    for _ in range(40):
+        PostgreSQL.save_message(existente, mensagem)
+
+    conn = get_vector_conn()
+    with conn, conn.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO arquivos (categoria, fileName, mediaType, caminho)
+            VALUES (%s, 'bench.pdf', 'document', '/tmp/bench.pdf')
+            """,
+            (PREFIXO,),
+        )
+    conn.close()
+
+    try:
+        return {
+            'db.verify_user': medir(
+                lambda _: PostgreSQL.verify_user(existente), repeticoes
+            ),
+            'db.create_user': medir(
+                lambda numero: PostgreSQL.create_user(
+                    numero, 'Bench', 'aluno'
+                ),
+                repeticoes,
+                preparar=_numero,
+            ),
+            'db.update_user': medir(
+                lambda _: PostgreSQL.update_user(
+                    existente, 'Bench', None, '3A'
+                ),
+                repeticoes,
+            ),
+            'db.save_message': medir(
+                lambda _: PostgreSQL.save_message(existente, mensagem),
+                repeticoes,
+            ),
+            'db.get_historico': medir(
+                lambda _: PostgreSQL.get_historico(existente), repeticoes
+            ),
+            'db.get_file': medir(
+                lambda _: PostgreSQL.get_file(PREFIXO), repeticoes
+            ),
+        }
+    finally:
+        _limpar_banco()
+
+
+GRUPOS = {
+    'webhook': bench_webhook,
+    'buffer': bench_buffer,
+    'fila': bench_fila,
+    'db': bench_db,
+}
+
+
+def _argumentos():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument(
+        '--grupos',
+        default=','.join(GRUPOS),
+        help=f'separados por vírgula ({", ".join(GRUPOS)})',
+    )
+    parser.add_argument('--repeticoes', type=int, default=200)
+    parser.add_argument('--saida', help='grava o relatório em JSON')
+    parser.add_argument('--comparar', help='relatório base para comparar')
+    parser.add_argument('--tolerancia', type=float, default=0.10)
+    return parser.parse_args()
+
+
+def main():
+    args = _argumentos()
+
+    resultados = {}
+    for grupo in args.grupos.split(','):
+        resultados.update(GRUPOS[grupo.strip()](args.repeticoes))
+
+    relatorio = montar_relatorio(resultados)
+    print(json.dumps(relatorio, indent=2, ensure_ascii=False))
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+
+    if args.comparar:
+        regressoes = comparar(
+            carregar(args.comparar), relatorio, args.tolerancia
+        )
+        if regressoes:
+            print(f'\nRegressões: {", ".join(regressoes)}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
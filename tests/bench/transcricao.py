@@ -0,0 +1,114 @@
+"""
+Latência da transcrição (parede) x duração do áudio: uma chamada só
+contra trechos em paralelo.
+
+COMO USAR (ffmpeg no PATH ou em FFMPEG; Redis local para o rate limit):
+    python -m tests.bench.transcricao
+    python -m tests.bench.transcricao --duracoes 60,300 --whisper-por-mb 8
+
+O Whisper é o stub de tests/load/stubs.py, com latência de
+`--latencia-whisper` segundos por chamada mais `--whisper-por-mb` por MB
+de áudio. Os áudios são sintéticos (tom com pausas de fala a cada 8 s),
+em mp3 32 kbps: o mesmo formato dos trechos, para que o custo por
+segundo de áudio seja igual nos dois modos. A divisão pelo ffmpeg entra
+no tempo do modo em trechos.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import threading
+import time
+
+from src.agent import audio_transcription as transcricao
+from src.agent.audio_segmentos import FFMPEG
+from tests.load.stubs import Latencia, criar_servidor_stub
+
+# 8 s de "fala" e 0,8 s de pausa, repetidos
+PADRAO_FALA = (
+    "aevalsrc='if(lt(mod(t,8.8),8),0.4*sin(2*PI*220*t)*sin(2*PI*3*t),0)'"
+    ':s=16000:d={duracao}'
+)
+
+
+def gerar_audio(duracao: float) -> bytes:
+    resultado = subprocess.run(
+        [
+            FFMPEG,
+            '-hide_banner',
+            '-nostdin',
+            '-f',
+            'lavfi',
+            '-i',
+            PADRAO_FALA.format(duracao=duracao),
+            '-ac',
+            '1',
+            '-c:a',
+            'libmp3lame',
+            '-b:a',
+            '32k',
+            '-f',
+            'mp3',
+            'pipe:1',
+        ],
+        capture_output=True,
+        check=True,
+    )
+    return resultado.stdout
+
+
+def cronometrar(funcao, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--duracoes', default='30,60,120,300,600')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--porta-stub', type=int, default=8091)
+    parser.add_argument('--latencia-whisper', type=float, default=0.4)
+    parser.add_argument('--whisper-por-mb', type=float, default=5.0)
+    args = parser.parse_args()
+
+    servidor, _ = criar_servidor_stub(
+        '127.0.0.1',
+        args.porta_stub,
+        latencia_whisper=Latencia(args.latencia_whisper),
+        whisper_por_mb=args.whisper_por_mb,
+    )
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    transcricao.url_transcricao = (
+        f'http://127.0.0.1:{args.porta_stub}/openai/v1/audio/transcriptions'
+    )
+
+    resultados = []
+    try:
+        for duracao in map(float, args.duracoes.split(',')):
+            audio = gerar_audio(duracao)
+            serial = cronometrar(
+                lambda: transcricao._transcrever(audio), args.repeticoes
+            )
+            paralelo = cronometrar(
+                lambda: transcricao.transcrever_em_trechos(audio),
+                args.repeticoes,
+            )
+            resultados.append({
+                'duracao_s': duracao,
+                'bytes': len(audio),
+                'serial_s': round(serial, 2),
+                'trechos_s': round(paralelo, 2),
+                'ganho': round(serial / paralelo, 2),
+            })
+            print(json.dumps(resultados[-1]), flush=True)
+    finally:
+        servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
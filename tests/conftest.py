@@ -0,0 +1,14 @@
+import os
+
+import fakeredis
+import pytest
+
+# Antes de importar o agente: base_agent monta o roteador no import, e o
+# provedor fake dispensa GROQ_API_KEY (e rede) nos testes
+os.environ.setdefault('LLM_PROVEDOR', 'fake')
+
+
+@pytest.fixture
+def redis_fake():
+    """Redis em memória com suporte a Lua (mesmas opções do client)."""
+    return fakeredis.FakeRedis(decode_responses=True)
@@ -0,0 +1,265 @@
+"""
+Teste de carga ponta a ponta do /webhook.
+
+COMO FUNCIONA:
+1. Sobe os stubs do Groq (chat + Whisper) e da Evolution (tests/load/stubs.py)
+2. Simula N conversas: cada número manda uma rajada de mensagens
+   (texto e/ou áudio) no formato do webhook da Evolution
+3. Espera a resposta de cada número chegar no stub do sendText
+4. Mostra latência ponta a ponta (p50/p95/p99), jobs por segundo e
+   respostas duplicadas
+
+COMO USAR:
+    # API e worker apontando para os stubs
+    GROQ_BASE_URL=http://localhost:8089 BASE_URL_EVO=http://localhost:8089 \\
+        fastapi run src/fast_api/app.py
+    GROQ_BASE_URL=http://localhost:8089 BASE_URL_EVO=http://localhost:8089 \\
+        python -m src.redis.worker
+
+    # Dispara a carga
+    python -m tests.load.run --conversas 200 --taxa 10 --concorrencia 50
+
+A latência ponta a ponta vai da última mensagem da rajada até a primeira
+parte da resposta chegar no sendText, então inclui a janela do debounce
+(ver BUFFER_JANELA_* e BUFFER_TIMEOUT em src/redis/buffer.py).
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import uuid
+
+import httpx
+
+from tests.load.stubs import Latencia, criar_servidor_stub
+
+
+def payload_texto(numero: str, texto: str) -> dict:
+    return {
+        'event': 'messages.upsert',
+        'instance': 'carga',
+        'data': {
+            'key': {
+                'remoteJid': f'{numero}@s.whatsapp.net',
+                'fromMe': False,
+                'id': uuid.uuid4().hex.upper()[:20],
+            },
+            'pushName': 'Carga',
+            'messageType': 'conversation',
+            'message': {'conversation': texto},
+            'messageTimestamp': int(time.time()),
+        },
+    }
+
+
+def payload_audio(numero: str, tamanho: int = 16_000) -> dict:
+    payload = payload_texto(numero, '')
+    payload['data']['messageType'] = 'audioMessage'
+    payload['data']['message'] = {
+        'audioMessage': {'mimetype': 'audio/ogg; codecs=opus', 'ptt': True},
+        'base64': base64.b64encode(os.urandom(tamanho)).decode(),
+    }
+    return payload
+
+
+def percentil(valores: list[float], p: float) -> float | None:
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, round(p / 100 * (len(ordenados) - 1)))
+    return ordenados[indice]
+
+
+class Carga:
+    """Gera as conversas e guarda os instantes de envio por número."""
+
+    def __init__(self, args):
+        self.args = args
+        # Números novos a cada execução (o verify_user cria os usuários)
+        self.prefixo = f'5500{int(time.time()) % 10**6:06d}'
+        self.ultimo_envio: dict[str, float] = {}
+        self.latencias_webhook: list[float] = []
+        self.erros_webhook = 0
+
+    def numero(self, i: int) -> str:
+        return f'{self.prefixo}{i:04d}'
+
+    async def _enviar(self, cliente, semaforo, numero: str, payload: dict):
+        async with semaforo:
+            inicio = time.perf_counter()
+            try:
+                response = await cliente.post(self.args.url, json=payload)
+                if response.is_error:
+                    self.erros_webhook += 1
+            except httpx.HTTPError:
+                self.erros_webhook += 1
+            self.latencias_webhook.append(time.perf_counter() - inicio)
+            self.ultimo_envio[numero] = time.time()
+
+    async def _conversa(self, cliente, semaforo, i: int):
+        numero = self.numero(i)
+        for j in range(self.args.mensagens):
+            if random.random() < self.args.fracao_audio:
+                payload = payload_audio(numero)
+            else:
+                payload = payload_texto(numero, f'Mensagem {j + 1} da carga')
+            await self._enviar(cliente, semaforo, numero, payload)
+            if j < self.args.mensagens - 1:
+                await asyncio.sleep(self.args.intervalo)
+
+    async def executar(self):
+        semaforo = asyncio.Semaphore(self.args.concorrencia)
+        limites = httpx.Limits(max_connections=self.args.concorrencia)
+
+        async with httpx.AsyncClient(timeout=30, limits=limites) as cliente:
+            tarefas = []
+            for i in range(self.args.conversas):
+                tarefas.append(
+                    asyncio.create_task(self._conversa(cliente, semaforo, i))
+                )
+                # Taxa aberta: novas conversas não esperam as anteriores
+                await asyncio.sleep(1 / self.args.taxa)
+            await asyncio.gather(*tarefas)
+
+
+def aguardar_respostas(carga: Carga, registro, timeout: float):
+    numeros = [carga.numero(i) for i in range(carga.args.conversas)]
+    limite = time.time() + timeout
+    while time.time() < limite:
+        with registro.lock:
+            faltando = [n for n in numeros if not registro.envios.get(n)]
+        if not faltando:
+            break
+        time.sleep(0.5)
+    # Margem para partes atrasadas/duplicadas chegarem
+    time.sleep(carga.args.margem)
+    return numeros
+
+
+def relatorio(carga: Carga, registro, numeros: list[str], inicio: float):
+    latencias = []
+    duplicadas = 0
+    sem_resposta = 0
+    ultima_resposta = None
+
+    with registro.lock:
+        for numero in numeros:
+            envios = registro.envios.get(numero, [])
+            if not envios:
+                sem_resposta += 1
+                continue
+            chegada = min(e.instante for e in envios)
+            latencias.append(chegada - carga.ultimo_envio[numero])
+            duplicadas += len(envios) - len({e.texto for e in envios})
+            ultima_resposta = max(ultima_resposta or 0, chegada)
+        chamadas = dict(registro.chamadas)
+
+    janela = (ultima_resposta or time.time()) - inicio
+    concluidas = len(numeros) - sem_resposta
+
+    def ms(valor):
+        return None if valor is None else round(valor * 1000, 1)
+
+    return {
+        'conversas': len(numeros),
+        'concluidas': concluidas,
+        'sem_resposta': sem_resposta,
+        'respostas_duplicadas': duplicadas,
+        'jobs_por_segundo': round(concluidas / janela, 2) if janela else 0,
+        'latencia_ms': {
+            'p50': ms(percentil(latencias, 50)),
+            'p95': ms(percentil(latencias, 95)),
+            'p99': ms(percentil(latencias, 99)),
+            'media': ms(statistics.fmean(latencias)) if latencias else None,
+        },
+        'webhook': {
+            'requisicoes': len(carga.latencias_webhook),
+            'erros': carga.erros_webhook,
+            'p50_ms': ms(percentil(carga.latencias_webhook, 50)),
+            'p99_ms': ms(percentil(carga.latencias_webhook, 99)),
+        },
+        'chamadas_stub': chamadas,
+    }
+
+
+def _argumentos():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--url', default='http://localhost:8000/webhook')
+    parser.add_argument('--conversas', type=int, default=50)
+    parser.add_argument(
+        '--taxa', type=float, default=5, help='conversas iniciadas por segundo'
+    )
+    parser.add_argument('--concorrencia', type=int, default=20)
+    parser.add_argument(
+        '--mensagens', type=int, default=2, help='mensagens por conversa'
+    )
+    parser.add_argument(
+        '--intervalo',
+        type=float,
+        default=1.0,
+        help='segundos entre mensagens da mesma conversa',
+    )
+    parser.add_argument('--fracao-audio', type=float, default=0.2)
+    parser.add_argument('--porta-stub', type=int, default=8089)
+    parser.add_argument('--latencia-groq', type=float, default=0.8)
+    parser.add_argument('--latencia-whisper', type=float, default=0.5)
+    parser.add_argument('--latencia-evolution', type=float, default=0.1)
+    parser.add_argument(
+        '--variacao', type=float, default=0.2, help='fração de jitter'
+    )
+    parser.add_argument('--timeout', type=float, default=180)
+    parser.add_argument(
+        '--margem',
+        type=float,
+        default=5,
+        help='segundos extras esperando respostas duplicadas',
+    )
+    parser.add_argument('--saida', help='grava o relatório em JSON')
+    parser.add_argument(
+        '--somente-stubs',
+        action='store_true',
+        help='só sobe os stubs (para rodar a carga de outro lugar)',
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = _argumentos()
+
+    def latencia(base):
+        return Latencia(base, base * args.variacao)
+
+    servidor, registro = criar_servidor_stub(
+        porta=args.porta_stub,
+        latencia_groq=latencia(args.latencia_groq),
+        latencia_whisper=latencia(args.latencia_whisper),
+        latencia_evolution=latencia(args.latencia_evolution),
+    )
+    if args.somente_stubs:
+        servidor.serve_forever()
+        return
+
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+    carga = Carga(args)
+    inicio = time.time()
+    asyncio.run(carga.executar())
+    numeros = aguardar_respostas(carga, registro, args.timeout)
+    servidor.shutdown()
+
+    resultado = relatorio(carga, registro, numeros, inicio)
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
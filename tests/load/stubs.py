@@ -0,0 +1,159 @@
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RESPOSTA_LLM = 'Resposta de teste do agente.'
+TEXTO_TRANSCRITO = 'Mensagem de áudio transcrita pelo stub.'
+
+
+@dataclass
+class Latencia:
+    """Latência simulada: `base` segundos +/- `variacao` (uniforme)."""
+
+    base: float = 0.0
+    variacao: float = 0.0
+
+    def aguardar(self):
+        atraso = self.base + random.uniform(-self.variacao, self.variacao)
+        if atraso > 0:
+            time.sleep(atraso)
+
+
+@dataclass
+class Envio:
+    numero: str
+    texto: str
+    instante: float
+
+
+@dataclass
+class Registro:
+    """Tudo o que os stubs receberam durante o teste."""
+
+    envios: dict[str, list[Envio]] = field(
+        default_factory=lambda: defaultdict(list)
+    )
+    chamadas: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def contar(self, rota: str):
+        with self.lock:
+            self.chamadas[rota] += 1
+
+    def registrar_envio(self, numero: str, texto: str):
+        with self.lock:
+            self.envios[numero].append(Envio(numero, texto, time.time()))
+
+
+def _resposta_chat(corpo: dict) -> dict:
+    return {
+        'id': f'chatcmpl-stub-{random.getrandbits(32):08x}',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': corpo.get('model', 'stub'),
+        'choices': [
+            {
+                'index': 0,
+                'message': {'role': 'assistant', 'content': RESPOSTA_LLM},
+                'finish_reason': 'stop',
+            }
+        ],
+        'usage': {
+            'prompt_tokens': 100,
+            'completion_tokens': 10,
+            'total_tokens': 110,
+        },
+    }
+
+
+def criar_servidor_stub(  # noqa: PLR0913
+    host: str = '0.0.0.0',
+    porta: int = 8089,
+    *,
+    latencia_groq: Latencia | None = None,
+    latencia_whisper: Latencia | None = None,
+    latencia_evolution: Latencia | None = None,
+    whisper_por_mb: float = 0.0,
+) -> tuple[ThreadingHTTPServer, Registro]:
+    """
+    Cria um servidor HTTP que imita as APIs externas usadas pelo projeto.
+
+    ROTAS:
+    - POST /openai/v1/chat/completions     -> Groq chat (ChatGroq)
+    - POST /openai/v1/audio/transcriptions -> Groq Whisper
+    - POST /message/sendText/<instancia>   -> Evolution (registra o envio)
+    - POST /message/sendMedia/<instancia>  -> Evolution
+
+    Para a API e o worker usarem o stub:
+        GROQ_BASE_URL=http://<host>:<porta>
+        BASE_URL_EVO=http://<host>:<porta>
+
+    `whisper_por_mb` soma segundos de latência por MB de áudio recebido
+    (a transcrição de verdade demora mais quanto maior o áudio).
+
+    Returns:
+        (servidor, registro): chame `servidor.serve_forever()` numa thread
+    """
+    registro = Registro()
+    latencias = {
+        'groq': latencia_groq or Latencia(),
+        'whisper': latencia_whisper or Latencia(),
+        'evolution': latencia_evolution or Latencia(),
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _responder(self, status: int, corpo: dict):
+            dados = json.dumps(corpo).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def do_POST(self):
+            tamanho = int(self.headers.get('Content-Length') or 0)
+            bruto = self.rfile.read(tamanho)
+
+            if self.path.endswith('/chat/completions'):
+                registro.contar('groq')
+                latencias['groq'].aguardar()
+                return self._responder(200, _resposta_chat(json.loads(bruto)))
+
+            if self.path.endswith('/audio/transcriptions'):
+                registro.contar('whisper')
+                latencias['whisper'].aguardar()
+                time.sleep(len(bruto) / 2**20 * whisper_por_mb)
+                return self._responder(200, {'text': TEXTO_TRANSCRITO})
+
+            if self.path.startswith('/message/'):
+                registro.contar('evolution')
+                latencias['evolution'].aguardar()
+                corpo = json.loads(bruto)
+                if self.path.startswith('/message/sendText'):
+                    registro.registrar_envio(corpo['number'], corpo['text'])
+                return self._responder(
+                    201,
+                    {
+                        'key': {
+                            'remoteJid': f'{corpo["number"]}@s.whatsapp.net',
+                            'fromMe': True,
+                            'id': f'STUB{random.getrandbits(48):012X}',
+                        },
+                        'status': 'PENDING',
+                    },
+                )
+
+            self._responder(404, {'erro': 'rota não simulada'})
+
+    servidor = ThreadingHTTPServer((host, porta), Handler)
+    servidor.daemon_threads = True
+    return servidor, registro
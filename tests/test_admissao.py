@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from redis.exceptions import RedisError
+from rq.utils import utcformat
+
+from src.redis import admissao
+from src.redis.admissao import DEBOUNCE, ControleAdmissao
+
+FILA = SimpleNamespace(key='rq:queue:interativa')
+
+
+def _enfileirar(client, job_id, idade=0):
+    enfileirado = datetime.now(timezone.utc) - timedelta(seconds=idade)
+    client.rpush(FILA.key, job_id)
+    client.hset(f'rq:job:{job_id}', 'enqueued_at', utcformat(enfileirado))
+
+
+@pytest.fixture
+def controle(redis_fake, monkeypatch):
+    monkeypatch.setattr(admissao, 'FILA_ELEVADA', 2)
+    monkeypatch.setattr(admissao, 'FILA_CRITICA', 5)
+    monkeypatch.setattr(admissao, 'LAG_ELEVADO', 30)
+    monkeypatch.setattr(admissao, 'LAG_CRITICO', 120)
+    return ControleAdmissao(filas=(FILA,), client=redis_fake)
+
+
+def test_fila_funda_eleva_o_nivel_e_o_piso_do_debounce(controle, redis_fake):
+    assert controle.atualizar(forcar=True).nivel == 'normal'
+
+    for i in range(3):
+        _enfileirar(redis_fake, f'job{i}')
+    estado = controle.atualizar(forcar=True)
+
+    assert (estado.nivel, estado.fila) == ('elevado', 3)
+    assert estado.debounce == DEBOUNCE['elevado']
+
+
+def test_job_antigo_na_fila_e_critico(controle, redis_fake):
+    _enfileirar(redis_fake, 'velho', idade=300)
+
+    estado = controle.atualizar(forcar=True)
+
+    assert estado.nivel == 'critico'
+    assert estado.lag_segundos >= 300  # noqa: PLR2004
+
+
+def test_estado_em_cache_ate_o_intervalo(controle, redis_fake, monkeypatch):
+    monkeypatch.setattr(admissao, 'INTERVALO', 60)
+    controle.atualizar(forcar=True)
+
+    for i in range(10):
+        _enfileirar(redis_fake, f'job{i}')
+
+    assert controle.atualizar().nivel == 'normal'
+    assert controle.atualizar(forcar=True).nivel == 'critico'
+
+
+def test_falha_no_redis_mantem_o_ultimo_estado(controle, redis_fake):
+    _enfileirar(redis_fake, 'velho', idade=300)
+    anterior = controle.atualizar(forcar=True)
+
+    def falhar(*args, **kwargs):
+        raise RedisError('sem conexão')
+
+    controle.client = SimpleNamespace(pipeline=falhar)
+
+    assert controle.atualizar(forcar=True).nivel == anterior.nivel
+
+
+def test_aviso_de_ocupado_sai_uma_vez_por_numero(controle, monkeypatch):
+    enviados = []
+    monkeypatch.setattr(
+        admissao,
+        'EvolutionAPI',
+        lambda: SimpleNamespace(
+            sender_text=lambda numero, texto: enviados.append(numero)
+        ),
+    )
+
+    controle.avisar_ocupado('5511')
+    controle.avisar_ocupado('5511')
+    controle.avisar_ocupado('5522')
+
+    assert enviados == ['5511', '5522']
+    assert controle.decisoes['aviso_ocupado'] == 2  # noqa: PLR2004
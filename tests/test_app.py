@@ -0,0 +1,61 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from src.fast_api import app as modulo_app
+
+TOKEN = 'segredo'
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    monkeypatch.setattr(
+        modulo_app, 'consultar', lambda *args, **kwargs: [{'chave': '5511'}]
+    )
+    # Sem o `with`: o lifespan (ouvinte do Redis, filas) não sobe
+    return TestClient(modulo_app.app)
+
+
+def test_consumo_sem_token_configurado_nao_existe(cliente, monkeypatch):
+    monkeypatch.setattr(modulo_app, 'TOKEN_CONSUMO', '')
+
+    assert cliente.get('/consumo').status_code == 404  # noqa: PLR2004
+
+
+@pytest.mark.parametrize(
+    'cabecalho', [None, 'Bearer errado', f'Bearer {TOKEN}x', TOKEN]
+)
+def test_consumo_recusa_token_errado(cliente, monkeypatch, cabecalho):
+    monkeypatch.setattr(modulo_app, 'TOKEN_CONSUMO', TOKEN)
+    headers = {'Authorization': cabecalho} if cabecalho else {}
+
+    resposta = cliente.get('/consumo', headers=headers)
+
+    assert resposta.status_code == 401  # noqa: PLR2004
+
+
+def test_consumo_com_token_certo(cliente, monkeypatch):
+    monkeypatch.setattr(modulo_app, 'TOKEN_CONSUMO', TOKEN)
+
+    resposta = cliente.get(
+        '/consumo', headers={'Authorization': f'Bearer {TOKEN}'}
+    )
+
+    assert resposta.status_code == 200  # noqa: PLR2004
+    assert resposta.json()['linhas'] == [{'chave': '5511'}]
+
+
+@pytest.mark.parametrize(
+    'parametros', [{'dias': 0}, {'dias': 367}, {'limite': 0}, {'limite': 501}]
+)
+def test_consumo_recusa_parametros_fora_dos_limites(
+    cliente, monkeypatch, parametros
+):
+    monkeypatch.setattr(modulo_app, 'TOKEN_CONSUMO', TOKEN)
+
+    resposta = cliente.get(
+        '/consumo',
+        params=parametros,
+        headers={'Authorization': f'Bearer {TOKEN}'},
+    )
+
+    assert resposta.status_code == 422  # noqa: PLR2004
@@ -0,0 +1,78 @@
+import pytest
+import requests
+
+from src.agent import audio_transcription
+from src.agent.audio_segmentos import escolher_cortes, interpretar_analise
+
+SAIDA_FFMPEG = """
+Input #0, ogg, from 'original':
+  Duration: 00:02:10.50, start: 0.000000, bitrate: 17 kb/s
+[silencedetect @ 0x1] silence_start: 58.2
+[silencedetect @ 0x1] silence_end: 59.0 | silence_duration: 0.8
+[silencedetect @ 0x1] silence_start: 129.9
+"""
+
+
+def test_interpreta_duracao_formato_e_silencios():
+    analise = interpretar_analise(SAIDA_FFMPEG)
+
+    assert analise.duracao == 2 * 60 + 10.5
+    assert analise.formato == 'ogg'
+    assert analise.silencios == [(58.2, 59.0), (129.9, 130.5)]
+
+
+def test_corta_no_silencio_mais_perto_do_alvo():
+    silencios = [(20.0, 21.0), (58.0, 59.0), (70.0, 71.0)]
+
+    assert escolher_cortes(100.0, silencios, alvo=60, maximo=75) == [58.5]
+
+
+def test_sem_silencio_corta_no_maximo():
+    assert escolher_cortes(200.0, [], alvo=60, maximo=75) == [75.0, 150.0]
+
+
+def test_audio_curto_nao_e_dividido():
+    assert escolher_cortes(70.0, [(30.0, 31.0)], alvo=60, maximo=75) == []
+
+
+@pytest.fixture
+def chamadas(monkeypatch):
+    enviados = []
+
+    def transcrever(audio, nome='audio.mp3'):
+        enviados.append(audio)
+        if audio == b'erro':
+            response = requests.Response()
+            response.status_code = 503
+            raise requests.HTTPError('503', response=response)
+        return {'text': audio.decode()}
+
+    monkeypatch.setattr(audio_transcription, '_transcrever', transcrever)
+    return enviados
+
+
+def test_erro_do_whisper_nao_vira_chamada_com_o_audio_inteiro(
+    chamadas, monkeypatch
+):
+    monkeypatch.setattr(
+        audio_transcription,
+        'dividir_audio',
+        lambda audio, partes: [b'ok', b'erro'],
+    )
+
+    with pytest.raises(requests.HTTPError):
+        audio_transcription.transcrever_em_trechos(b'okerro')
+
+    assert sorted(chamadas) == [b'erro', b'ok']
+
+
+def test_sem_ffmpeg_transcreve_inteiro(chamadas, monkeypatch):
+    def dividir(audio, partes):
+        raise FileNotFoundError('ffmpeg')
+
+    monkeypatch.setattr(audio_transcription, 'dividir_audio', dividir)
+
+    resultado = audio_transcription.transcrever_em_trechos(b'inteiro')
+
+    assert resultado == {'text': 'inteiro'}
+    assert chamadas == [b'inteiro']
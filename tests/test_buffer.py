@@ -0,0 +1,24 @@
+import pytest
+
+from src.redis.buffer import parece_completa
+
+
+@pytest.mark.parametrize(
+    'texto',
+    [
+        'Qual o horário da aula?',
+        'Preciso da segunda via do boleto.',
+        'Quero falar com a coordenação!',
+        'Quando?',
+    ],
+)
+def test_texto_completo_fecha_o_buffer_mais_cedo(texto):
+    assert parece_completa(texto)
+
+
+@pytest.mark.parametrize(
+    'texto',
+    ['oi', 'Bom dia!', 'queria saber', 'sobre a matrícula,', 'Ok.', '', None],
+)
+def test_texto_incompleto_ou_saudacao_espera_mais(texto):
+    assert not parece_completa(texto)
@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+import pytest
+
+from src.redis import buffer
+from src.redis.buffer import (
+    ENTRADA_LUA,
+    adicionar_ao_buffer,
+    descarregar_buffer,
+    reivindicar_mensagem,
+)
+
+
+@pytest.fixture(autouse=True)
+def redis_em_memoria(redis_fake, monkeypatch):
+    monkeypatch.setattr(buffer, 'redis_client', redis_fake)
+    monkeypatch.setattr(
+        buffer, '_entrada', redis_fake.register_script(ENTRADA_LUA)
+    )
+    return redis_fake
+
+
+def _descarregar(numero):
+    recebidos = []
+
+    async def callback(numero, texto):
+        recebidos.append(texto)
+
+    asyncio.run(descarregar_buffer(numero, callback))
+    return recebidos
+
+
+def test_reentrega_do_mesmo_id_e_descartada(redis_em_memoria):
+    assert adicionar_ao_buffer('5511', 'oi', 'ID1') is None
+    assert adicionar_ao_buffer('5511', 'oi', 'ID1') == 'duplicada'
+    assert reivindicar_mensagem('5511', 'ID1') == 'duplicada'
+
+    assert redis_em_memoria.llen('buffer:mensagens:5511') == 1
+
+
+def test_numero_acima_do_limite_e_descartado(monkeypatch):
+    monkeypatch.setattr(buffer, 'LIMITE_NUMERO', 2)
+
+    motivos = [
+        adicionar_ao_buffer('5511', f'msg {i}', f'ID{i}') for i in range(3)
+    ]
+
+    assert motivos == [None, None, 'excesso']
+    assert _descarregar('5511') == ['msg 0 msg 1']
+
+
+def test_flush_inclui_o_buffer_aberto_antes_do_deploy(redis_em_memoria):
+    redis_em_memoria.set('buffer:content:5511', json.dumps(['antiga']))
+    adicionar_ao_buffer('5511', 'nova', 'ID1')
+
+    assert _descarregar('5511') == ['antiga nova']
+    assert not redis_em_memoria.exists('buffer:content:5511')
+    assert _descarregar('5511') == []
+
+
+def test_piso_de_carga_nao_estende_o_buffer_alem_do_teto(
+    redis_em_memoria, monkeypatch
+):
+    monkeypatch.setattr(buffer, 'ESPERA_MAXIMA', 30)
+    adicionar_ao_buffer('5511', 'oi', janela_minima=40)
+    redis_em_memoria.hset(
+        'buffer:meta:5511', 'inicio', buffer.time.time() - 35
+    )
+
+    adicionar_ao_buffer('5511', 'e aí', janela_minima=40)
+
+    # Teto sob carga = piso (40 s) desde a primeira mensagem: sobram ~5 s
+    restante = redis_em_memoria.pttl('buffer:trigger:5511')
+    assert 0 < restante <= 5000  # noqa: PLR2004
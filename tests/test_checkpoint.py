@@ -0,0 +1,63 @@
+from typing import TypedDict
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+
+from src.redis.checkpoint import RedisCheckpointSaver
+
+
+class Estado(TypedDict):
+    passos: list[str]
+
+
+def _grafo(checkpointer, falhas):
+    chamadas = []
+
+    def primeiro(estado):
+        chamadas.append('primeiro')
+        return {'passos': [*estado['passos'], 'primeiro']}
+
+    def segundo(estado):
+        chamadas.append('segundo')
+        if falhas:
+            raise falhas.pop()
+        return {'passos': [*estado['passos'], 'segundo']}
+
+    grafo = StateGraph(Estado)
+    grafo.add_node('primeiro', primeiro)
+    grafo.add_node('segundo', segundo)
+    grafo.add_edge(START, 'primeiro')
+    grafo.add_edge('primeiro', 'segundo')
+    grafo.add_edge('segundo', END)
+    return grafo.compile(checkpointer=checkpointer), chamadas
+
+
+def test_nova_tentativa_retoma_da_etapa_que_falhou(redis_fake):
+    checkpointer = RedisCheckpointSaver(client=redis_fake)
+    grafo, chamadas = _grafo(checkpointer, [RuntimeError('Groq 500')])
+    config = {'configurable': {'thread_id': 'job-1'}}
+
+    with pytest.raises(RuntimeError):
+        grafo.invoke({'passos': []}, config)
+
+    # Mesmo thread_id e entrada None: continua do último checkpoint
+    resultado = grafo.invoke(None, config)
+
+    assert resultado['passos'] == ['primeiro', 'segundo']
+    assert chamadas == ['primeiro', 'segundo', 'segundo']
+    assert len(list(checkpointer.list(config))) > 1
+
+
+def test_delete_thread_remove_todas_as_chaves(redis_fake):
+    checkpointer = RedisCheckpointSaver(client=redis_fake)
+    grafo, _ = _grafo(checkpointer, [])
+    grafo.invoke({'passos': []}, {'configurable': {'thread_id': 'job-2'}})
+    assert redis_fake.keys('checkpoint*')
+
+    checkpointer.delete_thread('job-2')
+
+    assert not redis_fake.keys('checkpoint*')
+    assert (
+        checkpointer.get_tuple({'configurable': {'thread_id': 'job-2'}})
+        is None
+    )
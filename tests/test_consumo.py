@@ -0,0 +1,174 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from src.db import consumo as consumo_db
+from src.redis import consumo
+from src.redis.consumo import (
+    CHAVE_PENDENTES,
+    SUBTRAIR_LUA,
+    chave_consumo,
+    hoje,
+    ler_chave,
+    registrar_descartada,
+    registrar_turno,
+    resumir_turno,
+    tokens_hoje,
+)
+
+
+def _resposta(modelo, entrada, saida, **kwargs):
+    return AIMessage(
+        content='',
+        response_metadata={
+            'model_name': modelo,
+            'token_usage': {
+                'prompt_tokens': entrada,
+                'completion_tokens': saida,
+            },
+        },
+        **kwargs,
+    )
+
+
+def test_soma_o_turno_por_modelo_com_rodadas_de_ferramenta():
+    chamada = {'name': 'tool_funcionando', 'args': {}, 'id': '1'}
+    mensagens = [
+        HumanMessage(content='oi'),
+        _resposta('primario', 100, 10, tool_calls=[chamada]),
+        ToolMessage(content='ok', tool_call_id='1'),
+        _resposta('primario', 130, 20),
+        _resposta('secundario', 90, 5),
+    ]
+
+    assert resumir_turno(mensagens) == {
+        'primario': {
+            'chamadas': 2,
+            'tokens_entrada': 230,
+            'tokens_saida': 30,
+            'rodadas_ferramenta': 1,
+        },
+        'secundario': {
+            'chamadas': 1,
+            'tokens_entrada': 90,
+            'tokens_saida': 5,
+            'rodadas_ferramenta': 0,
+        },
+    }
+
+
+def test_chave_guarda_modelo_com_barra():
+    chave = chave_consumo('2026-10-19', '5511999', 'abc123', 'openai/gpt')
+
+    assert ler_chave(chave) == (
+        '2026-10-19',
+        '5511999',
+        'abc123',
+        'openai/gpt',
+    )
+
+
+def test_turno_conta_para_o_modelo_da_resposta_final(redis_fake):
+    mensagens = [
+        _resposta('primario', 100, 10),
+        _resposta('secundario', 90, 5),
+        _resposta('primario', 130, 20),
+    ]
+    registrar_turno('5511', 'v1', mensagens, 1.5, redis_fake)
+
+    primario = chave_consumo(hoje(), '5511', 'v1', 'primario')
+    secundario = chave_consumo(hoje(), '5511', 'v1', 'secundario')
+    assert redis_fake.hget(primario, 'turnos') == '1'
+    assert redis_fake.hget(primario, 'latencia_ms') == '1500'
+    assert redis_fake.hget(secundario, 'turnos') is None
+    assert redis_fake.hget(secundario, 'latencia_ms') is None
+
+
+class ConexaoFalsa:
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def gravadas(redis_fake, monkeypatch):
+    """Linhas que a descarga mandaria para o consumo_diario."""
+    linhas = []
+    monkeypatch.setattr(
+        consumo_db, 'subtrair', redis_fake.register_script(SUBTRAIR_LUA)
+    )
+    monkeypatch.setattr(consumo_db, 'get_vector_conn', ConexaoFalsa)
+    monkeypatch.setattr(
+        consumo_db.psycopg2.extras,
+        'execute_values',
+        lambda cursor, sql, valores: linhas.extend(valores),
+    )
+    return linhas
+
+
+def test_descartada_conta_tokens_sem_turno(redis_fake):
+    registrar_turno(
+        '5511', 'v1', [_resposta('secundario', 100, 10)], 1.5, redis_fake
+    )
+    registrar_descartada(
+        '5511', 'v1', _resposta('primario', 80, 0), redis_fake
+    )
+
+    chave = chave_consumo(hoje(), '5511', 'v1', 'primario')
+    assert redis_fake.hgetall(chave) == {
+        'chamadas': '1',
+        'tokens_entrada': '80',
+        'tokens_saida': '0',
+        'rodadas_ferramenta': '0',
+    }
+    assert tokens_hoje('5511', redis_fake) == 190  # noqa: PLR2004
+
+
+def test_descarga_grava_e_zera_os_contadores(redis_fake, gravadas):
+    registrar_turno(
+        '5511', 'v1', [_resposta('primario', 100, 10)], 1.5, redis_fake
+    )
+
+    assert consumo_db.descarregar(redis_fake) == 1
+
+    (linha,) = gravadas
+    assert linha == (hoje(), '5511', 'v1', 'primario', 1, 1, 100, 10, 0, 1500)
+    assert not redis_fake.smembers(CHAVE_PENDENTES)
+    assert not redis_fake.keys(f'{consumo.PREFIXO}:{hoje()}:*')
+
+
+def test_incremento_durante_a_descarga_fica_para_o_proximo_lote(
+    redis_fake, gravadas, monkeypatch
+):
+    registrar_turno(
+        '5511', 'v1', [_resposta('primario', 100, 10)], 1.5, redis_fake
+    )
+    escrever = consumo_db.psycopg2.extras.execute_values
+
+    def gravar_e_chegar_outro_turno(cursor, sql, valores):
+        escrever(cursor, sql, valores)
+        registrar_turno(
+            '5511', 'v1', [_resposta('primario', 7, 3)], 0.5, redis_fake
+        )
+
+    monkeypatch.setattr(
+        consumo_db.psycopg2.extras,
+        'execute_values',
+        gravar_e_chegar_outro_turno,
+    )
+
+    consumo_db.descarregar(redis_fake)
+
+    chave = chave_consumo(hoje(), '5511', 'v1', 'primario')
+    assert redis_fake.hgetall(chave)['tokens_entrada'] == '7'
+    assert redis_fake.smembers(CHAVE_PENDENTES) == {chave}
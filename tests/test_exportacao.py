@@ -0,0 +1,113 @@
+import gzip
+from datetime import UTC, datetime, timedelta
+
+import orjson
+import pytest
+import zstandard
+
+from src.db import exportacao
+from src.db.exportacao import EXTENSOES, escrever_jsonl, exportar_chat_ia
+
+TOTAL = 1000
+
+LEITORES = {
+    'zstd': lambda arquivo: zstandard.ZstdDecompressor().stream_reader(
+        arquivo
+    ),
+    'gzip': lambda arquivo: gzip.GzipFile(fileobj=arquivo),
+}
+
+
+@pytest.mark.parametrize('compressao', list(EXTENSOES))
+def test_grava_jsonl_comprimido_linha_a_linha(tmp_path, compressao):
+    caminho = tmp_path / f'saida{EXTENSOES[compressao]}'
+    linhas = ({'id': i, 'message': {'content': 'oi'}} for i in range(TOTAL))
+
+    assert escrever_jsonl(linhas, caminho, compressao) == TOTAL
+
+    with caminho.open('rb') as arquivo:
+        lidas = LEITORES[compressao](arquivo).read().splitlines()
+
+    assert [orjson.loads(linha)['id'] for linha in lidas] == list(range(TOTAL))
+    assert list(tmp_path.iterdir()) == [caminho]
+
+
+def test_falha_no_meio_nao_deixa_arquivo(tmp_path):
+    def linhas():
+        yield {'id': 1}
+        raise RuntimeError('conexão caiu')
+
+    with pytest.raises(RuntimeError):
+        escrever_jsonl(linhas(), tmp_path / 'saida.jsonl.zst')
+
+    assert not list(tmp_path.iterdir())
+
+
+CORTE = datetime(2026, 10, 19, 12, tzinfo=UTC)
+
+
+class ConexaoFalsa:
+    """Devolve o corte (timestamptz) e as linhas do chat_ia em ordem."""
+
+    def __init__(self, linhas):
+        self.linhas = linhas
+        self.corte = CORTE
+        self.itersize = None
+
+    def set_session(self, **kwargs):
+        pass
+
+    def cursor(self, name=None):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def __iter__(self):
+        return iter(self.linhas)
+
+    def execute(self, sql, parametros=()):
+        pass
+
+    def fetchone(self):
+        return {'corte': self.corte}
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _mensagem(id_, antes_do_corte):
+    return {
+        'id': id_,
+        'session_id': '5511',
+        'message': {'content': 'oi'},
+        'created_at': CORTE - timedelta(seconds=antes_do_corte),
+    }
+
+
+def test_chat_ia_para_na_primeira_mensagem_recente(tmp_path, monkeypatch):
+    # A 3 está dentro da margem: ela e o que vem depois ficam para a
+    # próxima execução
+    linhas = [
+        _mensagem(1, 300),
+        _mensagem(2, 10),
+        _mensagem(3, -5),
+        _mensagem(4, 120),
+    ]
+    monkeypatch.setattr(
+        exportacao, 'get_vector_conn', lambda: ConexaoFalsa(linhas)
+    )
+
+    resultado = exportar_chat_ia(tmp_path, desde_id=0)
+
+    assert resultado['linhas'] == 2  # noqa: PLR2004
+    assert resultado['ultimo_id'] == 2  # noqa: PLR2004
+    assert orjson.loads((tmp_path / 'chat_ia.watermark').read_text()) == {
+        'ultimo_id': 2
+    }
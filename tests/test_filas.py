@@ -0,0 +1,118 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.redis import rq, tasks, worker
+from src.redis.rq import FILA_INTERATIVA, FILA_LOTE, classificar_job
+from src.redis.worker import WorkerPonderado, ordenar_filas
+
+
+class SorteioFixo:
+    """Substitui o random: sempre escolhe a fila informada."""
+
+    def __init__(self, escolhida):
+        self.escolhida = escolhida
+        self.pesos = None
+
+    def choices(self, nomes, weights):
+        self.pesos = dict(zip(nomes, weights, strict=True))
+        return [self.escolhida]
+
+
+def test_ordenar_filas_poe_a_sorteada_na_frente():
+    sorteio = SorteioFixo(FILA_LOTE)
+    pesos = {FILA_INTERATIVA: 4, FILA_LOTE: 1}
+
+    ordem = ordenar_filas([FILA_INTERATIVA, FILA_LOTE], pesos, sorteio)
+
+    assert ordem == [FILA_LOTE, FILA_INTERATIVA]
+    assert sorteio.pesos == pesos
+
+
+@pytest.fixture
+def worker_ponderado():
+    # Sem __init__: só a lista de filas importa para reorder_queues
+    instancia = WorkerPonderado.__new__(WorkerPonderado)
+    instancia._ordered_queues = [
+        SimpleNamespace(name=nome)
+        for nome in (FILA_INTERATIVA, FILA_LOTE, 'default')
+    ]
+    return instancia
+
+
+def _nomes(instancia):
+    return [fila.name for fila in instancia._ordered_queues]
+
+
+def test_reorder_queues_mantem_filas_sem_peso_no_fim(
+    worker_ponderado, monkeypatch
+):
+    monkeypatch.setattr(
+        worker.random, 'choices', SorteioFixo(FILA_LOTE).choices
+    )
+
+    worker_ponderado.reorder_queues(None)
+
+    assert _nomes(worker_ponderado) == [FILA_LOTE, FILA_INTERATIVA, 'default']
+
+
+def test_reorder_queues_estrita_nao_mexe(worker_ponderado, monkeypatch):
+    monkeypatch.setattr(worker, 'ESTRATEGIA', 'estrita')
+    monkeypatch.setattr(
+        worker.random, 'choices', SorteioFixo(FILA_LOTE).choices
+    )
+
+    worker_ponderado.reorder_queues(None)
+
+    assert _nomes(worker_ponderado) == [FILA_INTERATIVA, FILA_LOTE, 'default']
+
+
+def test_classificar_job_sem_consultar_o_banco(redis_fake, monkeypatch):
+    monkeypatch.setattr(rq, 'redis_conn', redis_fake)
+
+    assert classificar_job('5511', 'oi') == FILA_LOTE
+
+    rq.marcar_conhecido('5511')
+    assert classificar_job('5511', 'oi') == FILA_INTERATIVA
+    assert redis_fake.ttl('fila:conhecido:5511') > 0
+
+    longo = 'x' * (rq.LIMITE_INTERATIVO + 1)
+    assert classificar_job('5511', longo) == FILA_LOTE
+
+
+def test_caminho_antigo_do_job_ainda_resolve():
+    assert rq.processar_agente is tasks.processar_agente
+
+
+def test_prompt_e_renovado_no_pai_antes_do_fork(monkeypatch):
+    eventos = []
+    monkeypatch.setattr(
+        WorkerPonderado,
+        'fork_work_horse',
+        lambda self, job, queue: eventos.append('fork'),
+    )
+    instancia = worker.WorkerAgente.__new__(worker.WorkerAgente)
+    instancia.antes_do_fork = lambda: eventos.append('renovar')
+
+    instancia.fork_work_horse(None, None)
+
+    assert eventos == ['renovar', 'fork']
+
+
+def test_falha_ao_renovar_nao_impede_o_job(monkeypatch):
+    eventos = []
+    monkeypatch.setattr(
+        WorkerPonderado,
+        'fork_work_horse',
+        lambda self, job, queue: eventos.append('fork'),
+    )
+    instancia = worker.WorkerAgente.__new__(worker.WorkerAgente)
+
+    def renovar():
+        raise FileNotFoundError('prompt_01.txt')
+
+    instancia.antes_do_fork = renovar
+
+    instancia.fork_work_horse(None, None)
+
+    assert eventos == ['fork']
@@ -0,0 +1,51 @@
+import threading
+import time
+
+import pytest
+
+from src.redis import idempotencia
+from src.redis.idempotencia import executar_uma_vez
+
+
+@pytest.fixture(autouse=True)
+def redis_em_memoria(redis_fake, monkeypatch):
+    monkeypatch.setattr(idempotencia, 'redis_client', redis_fake)
+    return redis_fake
+
+
+def test_execucoes_simultaneas_fazem_o_efeito_uma_vez():
+    chamadas = []
+
+    def enviar():
+        time.sleep(0.1)
+        chamadas.append(1)
+        return 'enviado'
+
+    resultados = []
+    threads = [
+        threading.Thread(
+            target=lambda: resultados.append(
+                executar_uma_vez('job:enviar', enviar)
+            )
+        )
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert chamadas == [1]
+    assert sorted(resultados, key=str) == [None, None, 'enviado']
+
+
+def test_falha_libera_a_etapa_para_a_proxima_tentativa(redis_em_memoria):
+    def salvar():
+        raise RuntimeError('banco fora do ar')
+
+    with pytest.raises(RuntimeError):
+        executar_uma_vez('job:salvar', salvar)
+
+    assert not redis_em_memoria.exists('idem:job:salvar')
+    assert executar_uma_vez('job:salvar', lambda: 'salvo') == 'salvo'
+    assert executar_uma_vez('job:salvar', lambda: 'de novo') is None
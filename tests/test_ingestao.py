@@ -0,0 +1,85 @@
+import pytest
+
+from src.redis import buffer, idempotencia, ingestao
+from src.redis.buffer import ENTRADA_LUA, aplicar_evento
+from src.redis.ingestao import PRAZOS, ConsumidorIngestao
+
+NUMERO = '5511'
+
+
+@pytest.fixture
+def enfileirados(redis_fake, monkeypatch):
+    monkeypatch.setattr(buffer, 'redis_client', redis_fake)
+    monkeypatch.setattr(
+        buffer, '_entrada', redis_fake.register_script(ENTRADA_LUA)
+    )
+    monkeypatch.setattr(idempotencia, 'redis_client', redis_fake)
+
+    textos = []
+    monkeypatch.setattr(
+        ingestao,
+        'enqueue_agent_processing',
+        lambda numero, texto: textos.append(texto),
+    )
+    return textos
+
+
+def _chegou(redis_fake, id_evento, mensagem):
+    aplicar_evento(NUMERO, mensagem, id_evento, 0, PRAZOS)
+    # Prazo já vencido: o próximo despachar pega o número
+    redis_fake.zadd(PRAZOS, {NUMERO: 0})
+
+
+def test_despacha_o_buffer_e_limpa(redis_fake, enfileirados):
+    _chegou(redis_fake, '1-0', 'oi')
+    _chegou(redis_fake, '2-0', 'tudo bem?')
+
+    assert ConsumidorIngestao('a', redis_fake).despachar(NUMERO)
+
+    assert enfileirados == ['oi tudo bem?']
+    assert not redis_fake.exists(f'buffer:mensagens:{NUMERO}')
+    assert not redis_fake.zcard(PRAZOS)
+
+
+def test_mensagem_no_meio_do_despacho_vai_no_proximo_lote(
+    redis_fake, enfileirados, monkeypatch
+):
+    outro = ConsumidorIngestao('b', redis_fake)
+    disputas = []
+
+    def enfileirar(numero, texto):
+        enfileirados.append(texto)
+        if len(enfileirados) == 1:
+            # Chega uma mensagem e outro consumidor vê o prazo vencido
+            _chegou(redis_fake, '2-0', 'segunda')
+            disputas.append(outro.despachar(NUMERO))
+
+    monkeypatch.setattr(ingestao, 'enqueue_agent_processing', enfileirar)
+    _chegou(redis_fake, '1-0', 'primeira')
+
+    assert ConsumidorIngestao('a', redis_fake).despachar(NUMERO)
+    assert disputas == [False]
+    assert outro.despachar(NUMERO)
+
+    assert enfileirados == ['primeira', 'segunda']
+    assert not redis_fake.exists(f'buffer:mensagens:{NUMERO}')
+
+
+def test_queda_depois_de_enfileirar_nao_perde_nem_duplica(
+    redis_fake, enfileirados, monkeypatch
+):
+    _chegou(redis_fake, '1-0', 'primeira')
+
+    # Consumidor cai entre o enfileiramento e a finalização
+    with monkeypatch.context() as m:
+        m.setattr(ingestao, '_finalizar', lambda **kwargs: 0)
+        ConsumidorIngestao('a', redis_fake).despachar(NUMERO)
+    redis_fake.delete(f'ingestao:lease:{NUMERO}')  # lease expirou
+    _chegou(redis_fake, '2-0', 'segunda')
+
+    consumidor = ConsumidorIngestao('b', redis_fake)
+    assert consumidor.despachar(NUMERO)
+    assert consumidor.despachar(NUMERO)
+
+    assert enfileirados == ['primeira', 'segunda']
+    assert not redis_fake.exists(f'buffer:mensagens:{NUMERO}')
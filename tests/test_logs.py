@@ -0,0 +1,33 @@
+import json
+import logging
+
+from src.observability.logs import FiltroAmostragem, JsonFormatter
+
+
+def _registro(nivel=logging.INFO, **extra):
+    registro = logging.LogRecord(
+        'projeto_base.webhook', nivel, __file__, 1, 'Mensagem', (), None
+    )
+    registro.__dict__.update(extra)
+    return registro
+
+
+def test_formatter_gera_json_e_redige_texto_da_conversa():
+    linha = JsonFormatter('api').format(
+        _registro(numero='5585999999999', texto='meu segredo')
+    )
+
+    evento = json.loads(linha)
+
+    assert evento['logger'] == 'webhook'
+    assert evento['servico'] == 'api'
+    assert evento['numero'] == '5585999999999'
+    assert evento['texto'] == '[redigido 11 chars]'
+
+
+def test_amostragem_nunca_descarta_avisos():
+    filtro = FiltroAmostragem()
+
+    assert not filtro.filter(_registro(amostra=0))
+    assert filtro.filter(_registro(nivel=logging.WARNING, amostra=0))
+    assert filtro.filter(_registro())
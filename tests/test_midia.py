@@ -0,0 +1,93 @@
+import base64
+
+import pytest
+
+from src.evolution import midia
+from src.evolution.midia import (
+    BLOCO,
+    CHAVE_LRU,
+    CHAVE_TAMANHOS,
+    CHAVE_TOTAL,
+    GRAVAR_LUA,
+    CacheLRU,
+    carregar_midia,
+    codificar_arquivo,
+)
+
+
+def test_base64_em_blocos_igual_ao_do_arquivo_inteiro(tmp_path):
+    conteudo = bytes(range(256)) * (BLOCO // 256 * 2 + 7)
+    caminho = tmp_path / 'documento.pdf'
+    caminho.write_bytes(conteudo)
+
+    assert codificar_arquivo(str(caminho)) == base64.b64encode(
+        conteudo
+    ).decode('ascii')
+
+
+def test_cache_despeja_o_menos_usado_pelo_tamanho():
+    cache = CacheLRU(max_bytes=10)
+    cache.put('a', 'x' * 4)
+    cache.put('b', 'y' * 4)
+    cache.get('a')
+    cache.put('c', 'z' * 4)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'x' * 4
+    assert cache.total == 8  # noqa: PLR2004
+
+
+def test_valor_maior_que_o_cache_nao_entra():
+    cache = CacheLRU(max_bytes=3)
+    cache.put('a', 'x' * 4)
+
+    assert cache.get('a') is None
+    assert cache.total == 0
+
+
+@pytest.fixture
+def cache_redis(redis_fake, monkeypatch, tmp_path):
+    """Só a camada do Redis (com 8 bytes de base64 por arquivo)."""
+    monkeypatch.setattr(midia, 'redis_client', redis_fake)
+    monkeypatch.setattr(
+        midia, '_gravar', redis_fake.register_script(GRAVAR_LUA)
+    )
+    monkeypatch.setattr(midia, 'cache_local', CacheLRU(0))
+    monkeypatch.setattr(midia, 'CACHE_REDIS_BYTES', 20)
+
+    def arquivo(nome):
+        caminho = tmp_path / nome
+        caminho.write_bytes(nome.encode()[:6].ljust(6, b'_'))
+        return str(caminho)
+
+    return arquivo
+
+
+def test_redis_despeja_o_menos_usado_e_desconta_o_tamanho(
+    redis_fake, cache_redis
+):
+    for nome in ('a', 'b', 'c'):
+        carregar_midia(cache_redis(nome))
+
+    assert redis_fake.zcard(CHAVE_LRU) == 2  # noqa: PLR2004
+    assert redis_fake.hlen(CHAVE_TAMANHOS) == 2  # noqa: PLR2004
+    assert redis_fake.get(CHAVE_TOTAL) == '16'
+    assert len(redis_fake.keys('midia:payload:*')) == 2  # noqa: PLR2004
+    assert all(
+        0 < redis_fake.ttl(chave) <= midia.CACHE_REDIS_TTL
+        for chave in redis_fake.keys('midia:payload:*')
+    )
+
+
+def test_payload_expirado_nao_faz_o_total_desandar(redis_fake, cache_redis):
+    caminho = cache_redis('a')
+    carregar_midia(caminho)
+    # Expirou (ou foi despejado) fora do script
+    redis_fake.delete(*redis_fake.keys('midia:payload:*'))
+
+    carregar_midia(caminho)
+    for nome in ('b', 'c', 'd'):
+        carregar_midia(cache_redis(nome))
+
+    assert redis_fake.get(CHAVE_TOTAL) == '16'
+    assert redis_fake.zcard(CHAVE_LRU) == 2  # noqa: PLR2004
@@ -0,0 +1,107 @@
+import pytest
+
+from src.db import migracoes
+from src.db.migracoes import carregar_migracoes
+
+
+def test_migracoes_do_repositorio_estao_em_ordem_e_sem_buracos():
+    versoes = [m.versao for m in carregar_migracoes()]
+
+    assert versoes == list(range(1, len(versoes) + 1))
+
+
+def test_migracao_sem_transacao_e_dividida_em_comandos(tmp_path):
+    (tmp_path / '0001_tabela.sql').write_text('CREATE TABLE t (id INT);')
+    (tmp_path / '0002_indice.sql').write_text(
+        '-- migracao: sem-transacao\n'
+        '-- comentário; com ponto e vírgula\n'
+        'CREATE INDEX CONCURRENTLY a ON t (id);\n'
+        'CREATE INDEX CONCURRENTLY b\nON t (id);\n'
+    )
+
+    tabela, indice = carregar_migracoes(tmp_path)
+
+    assert tabela.transacional
+    assert not indice.transacional
+    assert indice.comandos() == [
+        'CREATE INDEX CONCURRENTLY a ON t (id)',
+        'CREATE INDEX CONCURRENTLY b\nON t (id)',
+    ]
+
+
+def test_nome_fora_do_padrao_e_rejeitado(tmp_path):
+    (tmp_path / 'tabelas.sql').write_text('SELECT 1;')
+
+    with pytest.raises(ValueError, match='inválido'):
+        carregar_migracoes(tmp_path)
+
+
+class CursorFalso:
+    def __init__(self, invalidos):
+        self.invalidos = invalidos
+        self.comandos = []
+
+    def execute(self, sql, params=None):
+        self.comandos.append((sql, params))
+
+    def fetchall(self):
+        nomes = self.comandos[-1][1][0]
+        return [{'nome': n} for n in self.invalidos if n in nomes]
+
+
+def test_so_remove_indices_invalidos_da_propria_migracao(tmp_path):
+    (tmp_path / '0001_indices.sql').write_text(
+        '-- migracao: sem-transacao\n'
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS arquivos_mediaType_idx\n'
+        'ON arquivos (mediaType);\n'
+        'CREATE UNIQUE INDEX CONCURRENTLY "Chave_idx" ON t (id);\n'
+    )
+    (migracao,) = carregar_migracoes(tmp_path)
+    cursor = CursorFalso(['arquivos_mediatype_idx', 'rag_idx_ccnew'])
+
+    migracoes._remover_indices_invalidos(cursor, migracao.indices())
+
+    assert migracao.indices() == ['arquivos_mediatype_idx', 'Chave_idx']
+    assert cursor.comandos[-1] == (
+        'DROP INDEX CONCURRENTLY IF EXISTS "arquivos_mediatype_idx"',
+        None,
+    )
+    assert not any('ccnew' in sql for sql, _ in cursor.comandos)
+
+
+def test_bloco_entre_cifroes_nao_e_dividido(tmp_path):
+    (tmp_path / '0001_lotes.sql').write_text(
+        '-- migracao: sem-transacao\n'
+        'DO $$\nBEGIN\n    INSERT INTO t VALUES (1);\n    COMMIT;\nEND;\n$$;\n'
+        'CREATE FUNCTION f() RETURNS INT AS $corpo$ SELECT 1; $corpo$ '
+        'LANGUAGE sql;\n'
+        'DROP TABLE IF EXISTS velha;\n'
+    )
+
+    (migracao,) = carregar_migracoes(tmp_path)
+
+    assert migracao.comandos() == [
+        'DO $$\nBEGIN\n    INSERT INTO t VALUES (1);\n    COMMIT;\nEND;\n$$',
+        'CREATE FUNCTION f() RETURNS INT AS $corpo$ SELECT 1; $corpo$ '
+        'LANGUAGE sql',
+        'DROP TABLE IF EXISTS velha',
+    ]
+
+
+def test_particionamento_copia_em_lotes_antes_da_troca():
+    migracao = next(
+        m for m in carregar_migracoes() if m.nome == 'chat_ia_particionada'
+    )
+    comandos = migracao.comandos()
+
+    assert not migracao.transacional
+    copia = next(i for i, c in enumerate(comandos) if 'COMMIT;' in c)
+    troca = next(i for i, c in enumerate(comandos) if 'RENAME TO' in c)
+    assert copia < troca
+    # Só a troca trava o chat_ia antigo
+    assert [c for c in comandos if 'LOCK TABLE chat_ia ' in c] == [
+        comandos[troca]
+    ]
+    # A cópia final não tem janela de ids: só o anti-join
+    assert 'MAX(id)' not in comandos[troca]
+    assert 'NOT EXISTS' in comandos[troca]
@@ -0,0 +1,145 @@
+import time
+from contextlib import contextmanager
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from src.agent import model_router
+from src.agent.fake_llm import FakeChatModel
+from src.agent.model_router import ModelRouter, Rota
+
+MENSAGENS = [HumanMessage(content='oi')]
+
+
+def _roteador(primario, secundario, hedge_apos=0.05):
+    return ModelRouter(
+        rotas=[Rota('primario', primario), Rota('secundario', secundario)],
+        hedge_apos=hedge_apos,
+    )
+
+
+def test_primario_rapido_nao_dispara_hedge():
+    secundario = FakeChatModel('secundario', resposta='B')
+    roteador = _roteador(FakeChatModel('primario', resposta='A'), secundario)
+
+    response = roteador.invoke(MENSAGENS)
+
+    assert response.content == 'A'
+    assert response.response_metadata['roteador'] == {
+        'modelo': 'primario',
+        'hedge': False,
+    }
+    assert secundario.chamadas == 0
+
+
+def test_primario_lento_dispara_hedge_e_usa_o_mais_rapido():
+    roteador = _roteador(
+        FakeChatModel('primario', latencia=1, resposta='A'),
+        FakeChatModel('secundario', resposta='B'),
+    )
+
+    response = roteador.invoke(MENSAGENS)
+
+    assert response.content == 'B'
+    assert response.response_metadata['roteador'] == {
+        'modelo': 'secundario',
+        'hedge': True,
+    }
+
+
+def test_erro_no_primario_faz_fallback_imediato():
+    roteador = _roteador(
+        FakeChatModel('primario', falha=RuntimeError('429')),
+        FakeChatModel('secundario', resposta='B'),
+        hedge_apos=None,
+    )
+
+    assert roteador.invoke(MENSAGENS).content == 'B'
+
+
+def test_todos_falham_levanta_ultimo_erro():
+    roteador = _roteador(
+        FakeChatModel('primario', falha=RuntimeError('primario')),
+        FakeChatModel('secundario', falha=RuntimeError('secundario')),
+    )
+
+    with pytest.raises(RuntimeError, match='secundario'):
+        roteador.invoke(MENSAGENS)
+
+
+def test_bind_tools_mantem_rotas():
+    roteador = _roteador(FakeChatModel('primario'), FakeChatModel('b'))
+
+    vinculado = roteador.bind_tools([])
+
+    assert [r.nome for r in vinculado.rotas] == ['primario', 'secundario']
+    assert vinculado.hedge_apos == roteador.hedge_apos
+
+
+@pytest.fixture
+def limitador_lento(monkeypatch):
+    """Rotas com limite 'lento' esperam 0,2 s na fila do rate limiter."""
+
+    @contextmanager
+    def limitar(provedor):
+        if provedor == 'lento':
+            time.sleep(0.2)
+        yield
+
+    monkeypatch.setattr(model_router, 'limitar', limitar)
+
+
+def test_espera_no_rate_limiter_nao_conta_para_o_hedge(limitador_lento):
+    secundario = FakeChatModel('secundario', resposta='B')
+    roteador = ModelRouter(
+        rotas=[
+            Rota('primario', FakeChatModel('primario'), 'lento'),
+            Rota('secundario', secundario),
+        ],
+        hedge_apos=0.05,
+    )
+
+    response = roteador.invoke(MENSAGENS)
+
+    assert response.response_metadata['roteador']['hedge'] is False
+    assert secundario.chamadas == 0
+
+
+def test_hedge_ainda_no_rate_limiter_desiste_quando_outro_vence(
+    limitador_lento,
+):
+    secundario = FakeChatModel('secundario', resposta='B')
+    roteador = ModelRouter(
+        rotas=[
+            Rota('primario', FakeChatModel('primario', latencia=0.1)),
+            Rota('secundario', secundario, 'lento'),
+        ],
+        hedge_apos=0.02,
+    )
+
+    response = roteador.invoke(MENSAGENS)
+    time.sleep(0.3)
+
+    assert response.response_metadata['roteador'] == {
+        'modelo': 'primario',
+        'hedge': True,
+    }
+    assert secundario.chamadas == 0
+
+
+def test_resposta_do_hedge_perdedor_vai_para_ao_descartar():
+    descartadas = []
+    roteador = _roteador(
+        FakeChatModel('primario', latencia=0.2, resposta='A'),
+        FakeChatModel('secundario', resposta='B'),
+    )
+
+    token = model_router.ao_descartar.set(descartadas.append)
+    try:
+        response = roteador.invoke(MENSAGENS)
+    finally:
+        model_router.ao_descartar.reset(token)
+    time.sleep(0.4)
+
+    assert response.content == 'B'
+    assert [m.content for m in descartadas] == ['A']
@@ -0,0 +1,103 @@
+from datetime import date
+
+import pytest
+
+from src.db.particoes import (
+    arquivar_particao,
+    garantir_particoes,
+    particoes_vencidas,
+)
+
+PARTICOES = [
+    'chat_ia_2025_09',
+    'chat_ia_2025_10',
+    'chat_ia_2025_11',
+    'chat_ia_2026_10',
+    'chat_ia_padrao',
+]
+
+
+class ConexaoFalsa:
+    """Conexão psycopg2 de mentira: registra os comandos executados."""
+
+    def __init__(self, linhas=(), total=None, existentes=()):
+        self.linhas = list(linhas)
+        self.total = len(self.linhas) if total is None else total
+        self.existentes = set(existentes)
+        self.comandos = []
+        self.commits = 0
+        self._resultado = None
+
+    def cursor(self, name=None):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def __iter__(self):
+        return iter(self.linhas)
+
+    def execute(self, sql, parametros=None):
+        self.comandos.append((sql, parametros))
+        if 'criar_particao_chat_ia' in sql:
+            nome = f'chat_ia_{parametros[0]:%Y_%m}'
+            novo = nome not in self.existentes
+            self._resultado = {'nome': nome if novo else None}
+        elif 'COUNT(*)' in sql:
+            self._resultado = {'total': self.total}
+
+    def fetchone(self):
+        return self._resultado
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_arquiva_so_meses_inteiros_fora_da_retencao():
+    vencidas = particoes_vencidas(PARTICOES, date(2026, 10, 19), 12)
+
+    assert vencidas == ['chat_ia_2025_09']
+
+
+def test_retencao_zero_nao_arquiva_nada():
+    assert particoes_vencidas(PARTICOES, date(2026, 10, 19), 0) == []
+
+
+def test_garante_particoes_virando_o_ano():
+    conn = ConexaoFalsa(existentes={'chat_ia_2026_12'})
+
+    criadas = garantir_particoes(conn, date(2026, 12, 19))
+
+    assert criadas == ['chat_ia_2027_01', 'chat_ia_2027_02']
+    assert conn.commits == 1
+
+
+def test_arquivar_grava_e_desanexa(tmp_path):
+    conn = ConexaoFalsa(linhas=[{'id': 1}, {'id': 2}])
+
+    destino = arquivar_particao(conn, 'chat_ia_2025_09', tmp_path)
+
+    assert destino == tmp_path / 'chat_ia_2025_09.jsonl.zst'
+    assert destino.exists()
+    assert any('DETACH PARTITION' in sql for sql, _ in conn.comandos)
+
+
+def test_contagem_divergente_nao_apaga_a_particao(tmp_path):
+    conn = ConexaoFalsa(linhas=[{'id': 1}], total=2)
+
+    with pytest.raises(RuntimeError, match='divergente'):
+        arquivar_particao(conn, 'chat_ia_2025_09', tmp_path)
+
+    assert not list(tmp_path.iterdir())
+    assert not any('DETACH' in sql for sql, _ in conn.comandos)
+
+
+def test_arquivo_existente_nao_e_sobrescrito(tmp_path):
+    (tmp_path / 'chat_ia_2025_09.jsonl.zst').write_bytes(b'antigo')
+    conn = ConexaoFalsa(linhas=[{'id': 1}])
+
+    assert arquivar_particao(conn, 'chat_ia_2025_09', tmp_path) is None
+    assert not conn.comandos
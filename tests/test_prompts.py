@@ -0,0 +1,73 @@
+import os
+
+from redis.exceptions import RedisError
+
+from src.prompts.registro import (
+    CHAVE_ATIVA,
+    CHAVE_VERSOES,
+    RegistroPrompts,
+    versao_do_texto,
+)
+
+
+class RedisEmMemoria:
+    def __init__(self):
+        self.valores = {}
+        self.hashes = {}
+
+    def get(self, chave):
+        return self.valores.get(chave)
+
+    def hget(self, chave, campo):
+        return self.hashes.get(chave, {}).get(campo)
+
+
+class RedisForaDoAr:
+    @staticmethod
+    def get(chave):
+        raise RedisError('sem conexão')
+
+
+def test_variaveis_ficam_depois_do_prefixo_fixo(tmp_path):
+    (tmp_path / 'p.txt').write_text('Você é um assistente.')
+    registro = RegistroPrompts(tmp_path, RedisEmMemoria(), recarga=0)
+
+    prompt = registro.obter('p')
+    texto = prompt.montar({'Número do usuário': '5511999'})
+
+    assert texto.startswith(prompt.prefixo)
+    assert texto.endswith('- Número do usuário: 5511999')
+    assert prompt.versao == versao_do_texto('Você é um assistente.')
+
+
+def test_recarrega_o_arquivo_alterado(tmp_path):
+    arquivo = tmp_path / 'p.txt'
+    arquivo.write_text('v1')
+    registro = RegistroPrompts(tmp_path, RedisEmMemoria(), recarga=0)
+    primeiro = registro.obter('p')
+
+    arquivo.write_text('v2 maior')
+    os.utime(arquivo, ns=(0, arquivo.stat().st_mtime_ns + 1))
+
+    assert registro.obter('p').versao != primeiro.versao
+    assert registro.obter('p') is registro.obter('p')
+
+
+def test_versao_publicada_no_redis_tem_prioridade(tmp_path):
+    (tmp_path / 'p.txt').write_text('do disco')
+    client = RedisEmMemoria()
+    versao = versao_do_texto('do redis')
+    client.hashes[CHAVE_VERSOES.format(nome='p')] = {versao: 'do redis'}
+    client.valores[CHAVE_ATIVA.format(nome='p')] = versao
+
+    prompt = RegistroPrompts(tmp_path, client, recarga=0).obter('p')
+
+    assert (prompt.versao, prompt.origem) == (versao, 'redis')
+
+
+def test_redis_fora_do_ar_usa_o_disco(tmp_path):
+    (tmp_path / 'p.txt').write_text('do disco')
+
+    prompt = RegistroPrompts(tmp_path, RedisForaDoAr()).obter('p')
+
+    assert prompt.origem == 'disco'
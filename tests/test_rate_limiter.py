@@ -0,0 +1,85 @@
+import pytest
+import requests
+from redis.exceptions import RedisError
+
+from src.redis import rate_limiter
+from src.redis.rate_limiter import RateLimiter, penalizar_se_429
+
+
+@pytest.fixture
+def esperas(monkeypatch):
+    dormidas = []
+    monkeypatch.setattr(rate_limiter.time, 'sleep', dormidas.append)
+    return dormidas
+
+
+class RedisForaDoAr:
+    @staticmethod
+    def register_script(script):
+        def falhar(**kwargs):
+            raise RedisError('sem conexão')
+
+        return falhar
+
+    @staticmethod
+    def zrem(*args):
+        raise RedisError('sem conexão')
+
+
+def test_balde_vazio_devolve_a_espera_do_token(redis_fake, esperas):
+    limitador = RateLimiter('teste', rpm=60, concorrencia=2, client=redis_fake)
+
+    esperas_token = [limitador.aguardar_token() for _ in range(3)]
+
+    # Capacidade 2 sai na hora; o terceiro espera ~1 s (1 token/s)
+    assert esperas_token[:2] == [0, 0]
+    assert esperas_token[2] == pytest.approx(1, abs=0.1)
+    assert esperas == esperas_token[2:]
+
+
+def test_vaga_so_volta_depois_de_liberada(redis_fake):
+    limitador = RateLimiter(
+        'teste', rpm=600, concorrencia=1, client=redis_fake
+    )
+
+    with limitador.reservar():
+        assert redis_fake.zcard(limitador.chave_vagas) == 1
+        assert not limitador._concorrencia(
+            keys=[limitador.chave_vagas], args=[1, 'outro', 60000]
+        )
+
+    assert redis_fake.zcard(limitador.chave_vagas) == 0
+
+
+def test_vaga_de_worker_morto_expira(redis_fake):
+    limitador = RateLimiter(
+        'teste', rpm=600, concorrencia=1, lease_ttl=0.001, client=redis_fake
+    )
+    limitador.aguardar_vaga()
+    redis_fake.zadd(limitador.chave_vagas, {'morto': 0})
+
+    assert limitador.aguardar_vaga()
+
+
+def test_redis_fora_do_ar_deixa_a_chamada_passar():
+    limitador = RateLimiter(
+        'teste', rpm=60, concorrencia=1, client=RedisForaDoAr()
+    )
+    chamadas = []
+
+    with limitador.reservar():
+        chamadas.append(1)
+
+    assert chamadas == [1]
+
+
+def test_429_penaliza_o_balde_do_provedor(redis_fake, monkeypatch, esperas):
+    limitador = RateLimiter('teste', rpm=60, concorrencia=1, client=redis_fake)
+    monkeypatch.setitem(rate_limiter.limitadores, 'teste', limitador)
+    resposta = requests.Response()
+    resposta.status_code = 429
+    resposta.headers['Retry-After'] = '10'
+
+    assert penalizar_se_429('teste', requests.HTTPError(response=resposta))
+    assert not penalizar_se_429('teste', RuntimeError('outro erro'))
+    assert limitador.aguardar_token() >= 10  # noqa: PLR2004
@@ -0,0 +1,72 @@
+import pytest
+from langchain_core.messages import AIMessage
+from langgraph.graph import END, START, StateGraph
+
+from src.graph import tools
+from src.graph.nodes import Nodes
+from src.graph.state import State
+from src.redis import idempotencia
+
+
+@pytest.fixture
+def enviados(redis_fake, monkeypatch):
+    registro = []
+    monkeypatch.setattr(idempotencia, 'redis_client', redis_fake)
+    monkeypatch.setattr(
+        tools,
+        'enviar_arquivo',
+        lambda numero, categoria: (
+            registro.append((numero, categoria))
+            or {'enviado': True, 'arquivo': 'calendario.pdf'}
+        ),
+    )
+    return registro
+
+
+@pytest.fixture
+def grafo():
+    construtor = StateGraph(State)
+    construtor.add_node('ferramentas', Nodes.node_execute_tools)
+    construtor.add_edge(START, 'ferramentas')
+    construtor.add_edge('ferramentas', END)
+    return construtor.compile()
+
+
+def _chamada(**args):
+    return AIMessage(
+        '',
+        tool_calls=[
+            {
+                'name': 'enviar_documento',
+                'args': {'categoria': 'calendario', **args},
+                'id': 'chamada-1',
+            }
+        ],
+    )
+
+
+def test_documento_vai_para_o_numero_da_conversa(enviados, grafo):
+    # Mesmo que o modelo invente um número, vale o do estado
+    entrada = {'messages': [_chamada(numero='999')], 'number': '5511'}
+
+    saida = grafo.invoke(entrada)
+
+    assert enviados == [('5511', 'calendario')]
+    assert 'calendario.pdf' in saida['messages'][-1].content
+
+
+def test_mesma_chamada_no_mesmo_job_envia_uma_vez(enviados, grafo):
+    entrada = {'messages': [_chamada()], 'number': '5511'}
+    config = {'configurable': {'thread_id': 'job:1'}}
+
+    grafo.invoke(entrada, config)
+    saida = grafo.invoke(entrada, config)
+
+    assert enviados == [('5511', 'calendario')]
+    assert saida['messages'][-1].content == 'Documento já enviado ao usuário.'
+
+
+def test_numero_fica_fora_do_schema_do_modelo():
+    schema = tools.Tools.enviar_documento.tool_call_schema.model_json_schema()
+
+    assert list(schema['properties']) == ['categoria']
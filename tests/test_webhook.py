@@ -0,0 +1,54 @@
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from src.fast_api.schemas import motivo_descarte, validar_evento
+
+
+def _evento(remote_jid='5585999999999@s.whatsapp.net', **dados):
+    payload = {
+        'event': 'messages.upsert',
+        'data': {
+            'key': {'remoteJid': remote_jid, 'fromMe': False, 'id': 'ABC'},
+            'messageType': 'conversation',
+            'message': {'conversation': 'Oi'},
+            **dados,
+        },
+    }
+    return json.dumps(payload).encode()
+
+
+def test_mensagem_de_texto_e_aceita():
+    evento = validar_evento(_evento())
+
+    assert motivo_descarte(evento) is None
+    assert evento.numero == '5585999999999'
+    assert evento.data.message.conversation == 'Oi'
+
+
+@pytest.mark.parametrize(
+    ('corpo', 'motivo'),
+    [
+        (
+            _evento(key={'remoteJid': '5585@s.whatsapp.net', 'fromMe': True}),
+            'propria',
+        ),
+        (_evento('1203630@g.us'), 'grupo'),
+        (_evento('status@broadcast'), 'broadcast'),
+        (_evento(messageType='stickerMessage'), 'tipo'),
+        (_evento(message={'conversation': None}), 'vazia'),
+        (_evento(message=None), 'vazia'),
+        (
+            b'{"event": "connection.update", "data": {"state": "open"}}',
+            'evento',
+        ),
+    ],
+)
+def test_eventos_irrelevantes_sao_descartados(corpo, motivo):
+    assert motivo_descarte(validar_evento(corpo)) == motivo
+
+
+def test_payload_invalido_levanta_erro_de_validacao():
+    with pytest.raises(ValidationError):
+        validar_evento(b'{"data": ')